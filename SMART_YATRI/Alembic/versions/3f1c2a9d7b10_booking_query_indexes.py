@@ -0,0 +1,79 @@
+"""add bookings.created_at and indexes for the hot booking queries
+
+This is the root revision. The baseline bookings table is normally made by
+Base.metadata.create_all in app/main.py when the API first starts; if
+`alembic upgrade head` runs on a fresh database before that, the baseline
+table is created here so the rest of the chain can apply.
+
+Revision ID: 3f1c2a9d7b10
+Revises:
+Create Date: 2026-10-17 10:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_bookings_user_travel_date", ["user_id", "travel_date"]),
+    ("ix_bookings_user_booking_date", ["user_id", "booking_date"]),
+    ("ix_bookings_train_run", ["train_id", "travel_date", "class_name"]),
+    ("ix_bookings_created_at", ["created_at"]),
+]
+
+
+def create_baseline_bookings() -> None:
+    """bookings as create_all made it before this revision."""
+    op.create_table(
+        "bookings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("train_id", sa.String(), nullable=False),
+        sa.Column("origin", sa.String(), nullable=False),
+        sa.Column("destination", sa.String(), nullable=False),
+        sa.Column("travel_date", sa.Date(), nullable=False),
+        sa.Column("booking_date", sa.Date(), nullable=False),
+        sa.Column("class_name", sa.String(), nullable=False),
+        sa.Column("seats_booked", sa.Integer(), nullable=False),
+        sa.Column("fare", sa.Float(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("cancellation_time", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_bookings_id", "bookings", ["id"])
+
+
+def upgrade() -> None:
+    # app/main.py runs Base.metadata.create_all at import, so on a database the
+    # app has already started against the column and indexes may exist
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("bookings"):
+        create_baseline_bookings()
+        inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("bookings")}
+    existing = {index["name"] for index in inspector.get_indexes("bookings")}
+
+    if "created_at" not in columns:
+        # Existing rows get the migration time as created_at
+        op.add_column(
+            "bookings",
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        )
+    # CONCURRENTLY keeps bookings writable while the indexes build; it cannot
+    # run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            if name not in existing:
+                op.create_index(name, "bookings", columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name="bookings", postgresql_concurrently=True, if_exists=True)
+    op.drop_column("bookings", "created_at")
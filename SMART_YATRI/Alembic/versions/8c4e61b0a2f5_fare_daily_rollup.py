@@ -0,0 +1,72 @@
+"""add fare_daily_rollup and backfill it from bookings
+
+Revision ID: 8c4e61b0a2f5
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-17 11:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e61b0a2f5'
+down_revision = '3f1c2a9d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # create_all in app/main.py may already have made the table
+    if not sa.inspect(op.get_bind()).has_table("fare_daily_rollup"):
+        op.create_table(
+            "fare_daily_rollup",
+            sa.Column("train_id", sa.String(), nullable=False),
+            sa.Column("class_name", sa.String(), nullable=False),
+            sa.Column("booking_date", sa.Date(), nullable=False),
+            sa.Column("origin", sa.String(), nullable=False),
+            sa.Column("destination", sa.String(), nullable=False),
+            sa.Column("fare_sum", sa.Numeric(14, 2), nullable=False),
+            sa.Column("fare_count", sa.Integer(), nullable=False),
+            sa.Column("fare_min", sa.Float(), nullable=True),
+            sa.Column("fare_max", sa.Float(), nullable=True),
+            sa.PrimaryKeyConstraint("train_id", "class_name", "booking_date", "origin", "destination"),
+        )
+    # Recomputed from bookings and written over any existing rows, so the
+    # backfill is correct whether the table is new, partly filled by a
+    # running app, or left over from an earlier attempt
+    op.execute(
+        """
+        INSERT INTO fare_daily_rollup
+            (train_id, class_name, booking_date, origin, destination, fare_sum, fare_count, fare_min, fare_max)
+        SELECT train_id, class_name, booking_date, origin, destination, SUM(fare), COUNT(*), MIN(fare), MAX(fare)
+        FROM bookings
+        WHERE status NOT IN ('CANCELLED', 'cancelled', 'canceled')
+        GROUP BY train_id, class_name, booking_date, origin, destination
+        ON CONFLICT (train_id, class_name, booking_date, origin, destination) DO UPDATE SET
+            fare_sum = EXCLUDED.fare_sum,
+            fare_count = EXCLUDED.fare_count,
+            fare_min = EXCLUDED.fare_min,
+            fare_max = EXCLUDED.fare_max
+        """
+    )
+    # Groups whose bookings are all cancelled by now hold nothing
+    op.execute(
+        """
+        UPDATE fare_daily_rollup
+        SET fare_sum = 0, fare_count = 0, fare_min = NULL, fare_max = NULL
+        WHERE fare_count > 0 AND NOT EXISTS (
+            SELECT 1 FROM bookings b
+            WHERE b.train_id = fare_daily_rollup.train_id
+              AND b.class_name = fare_daily_rollup.class_name
+              AND b.booking_date = fare_daily_rollup.booking_date
+              AND b.origin = fare_daily_rollup.origin
+              AND b.destination = fare_daily_rollup.destination
+              AND b.status NOT IN ('CANCELLED', 'cancelled', 'canceled')
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("fare_daily_rollup")
@@ -0,0 +1,27 @@
+"""normalize bookings.status to CONFIRMED / CANCELLED
+
+Revision ID: d27a5e93c4b8
+Revises: 8c4e61b0a2f5
+Create Date: 2026-10-17 12:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd27a5e93c4b8'
+down_revision = '8c4e61b0a2f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Older code paths wrote "confirmed", "canceled" and "cancelled"
+    op.execute("UPDATE bookings SET status = 'CANCELLED' WHERE upper(status) IN ('CANCELLED', 'CANCELED') AND status <> 'CANCELLED'")
+    op.execute("UPDATE bookings SET status = 'CONFIRMED' WHERE upper(status) = 'CONFIRMED' AND status <> 'CONFIRMED'")
+    op.alter_column("bookings", "status", type_=sa.String(16), existing_nullable=False)
+
+
+def downgrade() -> None:
+    op.alter_column("bookings", "status", type_=sa.String(), existing_nullable=False)
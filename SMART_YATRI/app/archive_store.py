@@ -0,0 +1,357 @@
+"""
+Columnar archive for bookings that left the live store.
+
+Archived rows are written as zstd-compressed Parquet, partitioned by the
+month they were archived in:
+
+    data/archive/month=YYYYMM/part-<archived_on>-<seq>.parquet
+    data/archive/_manifest.json
+
+Every archive batch adds one part file; a partition with more than
+ARCHIVE_MAX_PARTS parts is merged back into a single file. The manifest
+records each part's row count and min/max travel_date, train_id and
+archived_on, so a query opens only the parts whose ranges can match. It
+then reads only the requested columns, memory-mapped, and skips row
+groups whose statistics rule the filters out.
+
+Each part also records the ordinal of its first row within its month.
+Merges concatenate parts in that order, so (month, ordinal) is a stable
+position and page() can hand out cursors that survive merges.
+
+Legacy archive_YYYYMMDD.csv files are migrated into the partitions the
+first time the store opens.
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from app.booking_store import BOOKING_FIELDS
+
+ARCHIVE_DIR = Path("data/archive")
+ARCHIVE_MAX_PARTS = int(os.getenv("ARCHIVE_MAX_PARTS", "32"))
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd")
+ARCHIVE_ROW_GROUP_ROWS = int(os.getenv("ARCHIVE_ROW_GROUP_ROWS", "65536"))
+
+MANIFEST_FILE = "_manifest.json"
+LEGACY_ARCHIVE = re.compile(r"archive_(\d{8})\.csv$")
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("booking_id", pa.int64()),
+    ("train_id", pa.string()),
+    ("origin", pa.string()),
+    ("destination", pa.string()),
+    ("travel_date", pa.string()),
+    ("booking_date", pa.string()),
+    ("class", pa.string()),
+    ("seats_requested", pa.int32()),
+    ("fare", pa.float64()),
+    ("status", pa.string()),
+    ("timestamp", pa.string()),
+    ("archived_on", pa.string()),
+])
+ARCHIVE_COLUMNS = ARCHIVE_SCHEMA.names
+
+
+def _fsync_file(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class ArchiveStore:
+    def __init__(self, root=ARCHIVE_DIR, max_parts=ARCHIVE_MAX_PARTS, compression=ARCHIVE_COMPRESSION):
+        self.root = Path(root)
+        self.max_parts = max_parts
+        self.compression = compression
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._opened = False
+        self._parts = []     # manifest entries, one per part file
+        self._seq = 0
+        self._retired = []   # parts replaced by the last merge; in-flight scans may still open them
+
+    # ---------- Open / manifest ---------- #
+    def open(self):
+        """Load the manifest and migrate legacy CSV archives. Idempotent."""
+        if self._opened:
+            return self
+        with self._open_lock:
+            if self._opened:
+                return self
+            self.root.mkdir(parents=True, exist_ok=True)
+            manifest = self.root / MANIFEST_FILE
+            if manifest.exists():
+                with open(manifest) as f:
+                    data = json.load(f)
+                self._parts, self._seq = data["parts"], data["seq"]
+                month_rows = {}
+                for p in self._parts:
+                    if "first_row" not in p:   # manifests written before page cursors existed
+                        p["first_row"] = month_rows.get(p["month"], 0)
+                    month_rows[p["month"]] = max(month_rows.get(p["month"], 0), p["first_row"] + p["rows"])
+            # Parts written by a run that crashed before its manifest update, or retired by a merge
+            known = {p["path"] for p in self._parts}
+            for path in self.root.glob("month=*/*.parquet"):
+                if path.relative_to(self.root).as_posix() not in known:
+                    path.unlink()
+            self._opened = True
+            self._migrate_legacy_csv()
+        return self
+
+    def _save_manifest(self):
+        """Called with the lock held, after the part files it names are durable."""
+        path = self.root / MANIFEST_FILE
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"seq": self._seq, "parts": self._parts}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _migrate_legacy_csv(self):
+        for path in sorted(self.root.glob("archive_*.csv")):
+            match = LEGACY_ARCHIVE.search(path.name)
+            if not match:
+                continue
+            convert = pacsv.ConvertOptions(column_types={
+                name: ARCHIVE_SCHEMA.field(name).type for name in BOOKING_FIELDS
+            })
+            table = pacsv.read_csv(path, convert_options=convert)
+            self._write(self._conform(table, archived_on=match.group(1)))
+            path.unlink()
+
+    # ---------- Writes ---------- #
+    def _conform(self, table, archived_on):
+        n = table.num_rows
+        columns = []
+        for field in ARCHIVE_SCHEMA:
+            if field.name in table.column_names:
+                columns.append(table[field.name].cast(field.type))
+            elif field.name == "archived_on":
+                columns.append(pa.array([archived_on] * n, pa.string()))
+            else:
+                columns.append(pa.nulls(n, field.type))
+        return pa.Table.from_arrays(columns, schema=ARCHIVE_SCHEMA)
+
+    def _write(self, table):
+        """Write one part per archive month present in `table` and record it in the manifest."""
+        if table.num_rows == 0:
+            return
+        months = sorted(set(value[:6] for value in table["archived_on"].to_pylist()))
+        with self._lock:
+            for month in months:
+                part = table.filter(pc.starts_with(table["archived_on"], month)) if len(months) > 1 else table
+                part = part.sort_by([("travel_date", "ascending"), ("train_id", "ascending")])
+                self._seq += 1
+                rel = f"month={month}/part-{part['archived_on'][0].as_py()}-{self._seq:06d}.parquet"
+                full = self.root / rel
+                full.parent.mkdir(parents=True, exist_ok=True)
+                pq.write_table(part, full, compression=self.compression, row_group_size=ARCHIVE_ROW_GROUP_ROWS)
+                _fsync_file(full)
+                self._parts.append(self._part_entry(part, rel, month, first_row=self._month_rows(month)))
+            self._save_manifest()
+            for month in months:
+                if sum(1 for p in self._parts if p["month"] == month) > self.max_parts:
+                    self._merge_month(month)
+
+    def _month_rows(self, month):
+        return sum(p["rows"] for p in self._parts if p["month"] == month)
+
+    def _part_entry(self, table, rel, month, first_row):
+        def bounds(column):
+            minmax = pc.min_max(table[column])
+            return minmax["min"].as_py(), minmax["max"].as_py()
+
+        entry = {"path": rel, "month": month, "first_row": first_row, "rows": table.num_rows,
+                 "bytes": (self.root / rel).stat().st_size}
+        for column in ("travel_date", "train_id", "archived_on"):
+            entry[f"min_{column}"], entry[f"max_{column}"] = bounds(column)
+        return entry
+
+    def _merge_month(self, month):
+        """
+        Called with the lock held: rewrite a month's parts as one file. Rows keep
+        their order, so page cursors (month, row ordinal) stay valid across merges.
+        """
+        parts = sorted((p for p in self._parts if p["month"] == month), key=lambda p: p["first_row"])
+        table = pa.concat_tables(pq.read_table(self.root / p["path"], memory_map=True) for p in parts)
+        self._seq += 1
+        rel = f"month={month}/part-merged-{self._seq:06d}.parquet"
+        pq.write_table(table, self.root / rel, compression=self.compression, row_group_size=ARCHIVE_ROW_GROUP_ROWS)
+        _fsync_file(self.root / rel)
+        merged = self._part_entry(table, rel, month, first_row=parts[0]["first_row"])
+        self._parts = [p for p in self._parts if p["month"] != month] + [merged]
+        self._save_manifest()
+        for path in self._retired:
+            (self.root / path).unlink(missing_ok=True)
+        self._retired = [p["path"] for p in parts]
+
+    def append(self, records, archived_on=None):
+        """Archive booking dicts (with booking_id) under `archived_on` (YYYYMMDD, default today)."""
+        self.open()
+        if not records:
+            return
+        archived_on = archived_on or datetime.now().strftime("%Y%m%d")
+        table = pa.Table.from_pylist(
+            [{**record, "archived_on": archived_on} for record in records], schema=ARCHIVE_SCHEMA
+        )
+        self._write(table)
+
+    # ---------- Queries ---------- #
+    def _candidate_parts(self, archived_on, travel_date_from, travel_date_to, train_id):
+        """Parts whose manifest ranges can match, in (month, row ordinal) order."""
+        with self._lock:
+            parts = sorted(self._parts, key=lambda p: (p["month"], p["first_row"]))
+        return [
+            p for p in parts
+            if (not archived_on or p["min_archived_on"] <= archived_on <= p["max_archived_on"])
+            and (not travel_date_from or p["max_travel_date"] >= travel_date_from)
+            and (not travel_date_to or p["min_travel_date"] <= travel_date_to)
+            and (not train_id or p["min_train_id"] <= train_id <= p["max_train_id"])
+        ]
+
+    def _read_part(self, part, columns, filters, start=0):
+        """
+        Yield the matching rows of each row group of `part` from ordinal `start` on,
+        with a "_row" column holding each row's ordinal within the part. Row groups
+        whose min/max statistics rule the filters out are never decompressed.
+        """
+        parquet = pq.ParquetFile(self.root / part["path"], memory_map=True)
+        names = parquet.schema_arrow.names
+        read_columns = list(dict.fromkeys(list(columns) + [column for column, _, _ in filters]))
+        base = 0
+        for i in range(parquet.num_row_groups):
+            meta = parquet.metadata.row_group(i)
+            n = meta.num_rows
+            if base + n <= start or not _row_group_may_match(meta, names, filters):
+                base += n
+                continue
+            table = parquet.read_row_group(i, columns=read_columns)
+            table = table.append_column("_row", pa.array(range(base, base + n), pa.int64()))
+            if base < start:
+                table = table.slice(start - base)
+            if filters:
+                table = table.filter(_filter_expression(filters))
+            base += n
+            if table.num_rows:
+                yield table.select(list(columns) + ["_row"])
+
+    def scan(self, archived_on=None, travel_date_from=None, travel_date_to=None, train_id=None,
+             status=None, columns=None, batch_size=10_000):
+        """
+        Yield pyarrow RecordBatches of archived rows matching the filters, reading
+        only the pruned partitions, row groups and requested columns.
+        """
+        self.open()
+        columns = list(columns or ARCHIVE_COLUMNS)
+        filters = _filters(archived_on, travel_date_from, travel_date_to, train_id, status)
+        for part in self._candidate_parts(archived_on, travel_date_from, travel_date_to, train_id):
+            for table in self._read_part(part, columns, filters):
+                yield from table.drop_columns(["_row"]).to_batches(max_chunksize=batch_size)
+
+    def page(self, cursor=None, limit=100, archived_on=None, travel_date_from=None, travel_date_to=None,
+             train_id=None, status=None, columns=None):
+        """
+        Up to `limit` matching rows after `cursor`, plus the cursor for the next page
+        (None on the last page). Cursors are "YYYYMM:ordinal" positions in a month's
+        rows, which appends and merges never reorder. Raises ValueError on a bad cursor.
+        """
+        self.open()
+        month_from, start = "", 0
+        if cursor:
+            month_from, _, ordinal = cursor.partition(":")
+            if len(month_from) != 6 or not month_from.isdigit() or not ordinal.isdigit():
+                raise ValueError(f"Invalid archive cursor: {cursor!r}")
+            start = int(ordinal)
+
+        columns = list(columns or ARCHIVE_COLUMNS)
+        filters = _filters(archived_on, travel_date_from, travel_date_to, train_id, status)
+        rows, positions = [], []
+        for part in self._candidate_parts(archived_on, travel_date_from, travel_date_to, train_id):
+            month, first = part["month"], part["first_row"]
+            if month < month_from or (month == month_from and first + part["rows"] <= start):
+                continue
+            offset = start - first if month == month_from and start > first else 0
+            for table in self._read_part(part, columns, filters, offset):
+                take = table.slice(0, limit + 1 - len(rows))
+                positions.extend((month, first + ordinal) for ordinal in take["_row"].to_pylist())
+                rows.extend(take.drop_columns(["_row"]).to_pylist())
+                if len(rows) > limit:
+                    break
+            if len(rows) > limit:
+                break
+
+        if len(rows) <= limit:
+            return rows, None
+        # The cursor points just past the last row returned
+        month, position = positions[limit - 1]
+        return rows[:limit], f"{month}:{position + 1}"
+
+    def records(self, **filters):
+        return [row for batch in self.scan(**filters) for row in batch.to_pylist()]
+
+    def has_data(self):
+        self.open()
+        with self._lock:
+            return bool(self._parts)
+
+    def stats(self):
+        self.open()
+        with self._lock:
+            months = {}
+            for p in self._parts:
+                month = months.setdefault(p["month"], {"parts": 0, "rows": 0, "bytes": 0})
+                month["parts"] += 1
+                month["rows"] += p["rows"]
+                month["bytes"] += p["bytes"]
+            return {"root": str(self.root), "partitions": months}
+
+
+def _filters(archived_on, travel_date_from, travel_date_to, train_id, status):
+    filters = []
+    if archived_on:
+        filters.append(("archived_on", "=", archived_on))
+    if travel_date_from:
+        filters.append(("travel_date", ">=", travel_date_from))
+    if travel_date_to:
+        filters.append(("travel_date", "<=", travel_date_to))
+    if train_id:
+        filters.append(("train_id", "=", train_id))
+    if status:
+        filters.append(("status", "=", status.lower()))
+    return filters
+
+
+def _filter_expression(filters):
+    expression = None
+    for column, op, value in filters:
+        field = pc.field(column)
+        term = field == value if op == "=" else field >= value if op == ">=" else field <= value
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def _row_group_may_match(meta, names, filters):
+    for column, op, value in filters:
+        stats = meta.column(names.index(column)).statistics
+        if stats is None or not stats.has_min_max:
+            continue
+        if op in ("=", ">=") and stats.max < value:
+            return False
+        if op in ("=", "<=") and stats.min > value:
+            return False
+    return True
+
+
+archive_store = ArchiveStore()
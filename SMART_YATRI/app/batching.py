@@ -0,0 +1,110 @@
+"""
+Async micro-batching for prediction requests.
+
+Concurrent POST /predict/ calls are parked on futures and merged into one
+vectorized predict_records call on the inference pool when either the
+batching window expires (PREDICT_BATCH_WINDOW_MS, default 2 ms) or
+PREDICT_MAX_BATCH requests are waiting. Each handler then gets back its own row. Batch-size and
+queue-wait histograms are kept so the window can be tuned against p99.
+
+The coalescer holds a reference to every batch task until it finishes,
+so the event loop cannot garbage-collect one mid-flight, and a batch that
+fails in an unexpected way fails its waiting requests and is logged
+instead of leaving them hanging.
+"""
+
+import asyncio
+import os
+
+from app.executors import inference_executor, predict_in_worker
+from app.metrics import Histogram, BATCH_SIZE_BUCKETS, QUEUE_WAIT_MS_BUCKETS
+
+PREDICT_BATCH_WINDOW_MS = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "2"))
+PREDICT_MAX_BATCH = int(os.getenv("PREDICT_MAX_BATCH", "64"))
+
+
+class PredictionCoalescer:
+    """
+    Merges concurrently submitted records into batches for `predict_fn(records) -> results`.
+    Must be used from a single event loop (one per uvicorn worker).
+    """
+
+    def __init__(self, predict_fn, window_ms=PREDICT_BATCH_WINDOW_MS, max_batch=PREDICT_MAX_BATCH):
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        self.task_errors = 0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+
+    async def submit(self, record):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((record, future, loop.time()))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self.batch_sizes.observe(len(batch))
+        for _, _, enqueued_at in batch:
+            self.queue_wait_ms.observe((now - enqueued_at) * 1000.0)
+        task = loop.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.task_errors += 1
+            print(f"⚠️ Prediction batch failed: {task.exception()!r}")
+
+    async def _run(self, batch):
+        records = [record for record, _, _ in batch]
+        try:
+            # Inference is CPU-bound; keep it off the event loop
+            results = await inference_executor.run(self.predict_fn, records)
+            if len(results) != len(batch):
+                raise RuntimeError(f"Prediction batch returned {len(results)} results for {len(batch)} records")
+        except asyncio.CancelledError:
+            for _, future, _ in batch:
+                future.cancel()
+            raise
+        except Exception as exc:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            raise
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():  # the client may have gone away
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch": self.max_batch,
+            "pending": len(self._pending),
+            "in_flight": len(self._tasks),
+            "task_errors": self.task_errors,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
+
+
+# Shared by every router that serves single-row predictions
+prediction_coalescer = PredictionCoalescer(predict_in_worker)
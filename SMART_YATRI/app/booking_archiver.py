@@ -0,0 +1,180 @@
+"""
+Background archiving for the booking store.
+
+Bookings whose travel date has passed are moved to data/archive by a
+daemon thread every ARCHIVE_INTERVAL_SECONDS, not by the request path.
+The archiver keeps a min-heap of (travel_date, booking_id) that the
+store's listener feeds as bookings are made. Each run therefore pops
+only the bookings that crossed the travel-date watermark since the last
+run. Entries for bookings that were cancelled or already archived are
+skipped when popped. The heap is saved with the booking store's
+checkpoint, so on start it is loaded and only bookings made since are
+pushed. The full scan, which seeds the heap and picks up cancelled rows
+left by older versions, runs only when there is no saved heap or the
+saved one predates that sweep.
+
+Archived rows go to the columnar archive store (app/archive_store.py) as
+one new part per batch; existing archive files are never re-read or
+rewritten. Bookings are taken out of the store with remove_many_if_live
+before they are written, so a booking that is cancelled, swept by a run
+and cancelled with its train at the same moment is archived exactly once.
+If the archive write fails the bookings are put back. Listeners added
+with subscribe() receive the records of every archived batch.
+"""
+
+import heapq
+import os
+import threading
+from datetime import datetime
+
+from app.archive_store import archive_store
+from app.booking_store import booking_store
+
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "60"))
+
+
+class BookingArchiver:
+    def __init__(self, store=booking_store, archive=archive_store, interval=ARCHIVE_INTERVAL_SECONDS):
+        self.store = store
+        self.archive_store = archive
+        self.interval = interval
+        self._heap = []              # (travel_date, booking_id) of bookings not yet archived
+        self._heap_lock = threading.Lock()
+        self._due = []               # entries popped by the current run, until it has archived them
+        self._swept = False          # the start-up sweep of leftover cancelled rows has completed
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._listeners = []
+        self.watermark = None        # travel dates before this have been archived
+        self.runs = 0
+        self.archived = 0
+        self.errors = 0
+        self.last_run_at = None
+
+    def _on_change(self, op, booking_id, record, old_record):
+        if op == "put" and old_record is None:
+            with self._heap_lock:
+                heapq.heappush(self._heap, (record["travel_date"], booking_id))
+
+    # ---------- Checkpoint ---------- #
+    def _dump(self):
+        """Copy of the heap (plus entries a run is still archiving); called under the store lock."""
+        with self._heap_lock:
+            return {"heap": self._heap + self._due, "swept": self._swept}
+
+    def _load(self, state):
+        if not state["swept"]:
+            return False
+        heap = list(state["heap"])
+        heapq.heapify(heap)
+        with self._heap_lock:
+            self._heap = heap
+            self._swept = True
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def start(self):
+        """Seed the watermark heap from the store and start the background thread. Idempotent."""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self.archive_store.open()
+            restored = self.store.subscribe(self._on_change, snapshot=("booking_archiver", self._dump, self._load))
+            if not restored:
+                self._sweep()
+            self.run_once()
+            self._thread = threading.Thread(target=self._loop, name="booking-archiver", daemon=True)
+            self._thread.start()
+
+    def _sweep(self):
+        leftovers = []
+        for booking_id, record in self.store.scan():
+            if record["status"] == "cancelled":
+                leftovers.append(booking_id)
+            else:
+                with self._heap_lock:
+                    self._heap.append((record["travel_date"], booking_id))
+        with self._heap_lock:
+            heapq.heapify(self._heap)
+        self.archive(leftovers)
+        self._swept = True
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as exc:
+                self.errors += 1
+                print(f"⚠️ Booking archiver run failed: {exc}")
+
+    def run_once(self, today=None):
+        """Archive every booking whose travel date is before `today`. Returns how many were moved."""
+        # travel_date is validated as YYYY-MM-DD, so string order is date order
+        cutoff = (today or datetime.now().date()).isoformat()
+        with self._heap_lock:
+            while self._heap and self._heap[0][0] < cutoff:
+                self._due.append(heapq.heappop(self._heap))
+            due = list(self._due)
+        try:
+            booking_ids = [
+                booking_id
+                for booking_id, record in self.store.get_many(sorted({booking_id for _, booking_id in due}))
+                if record["travel_date"] < cutoff
+            ]
+            archived = self.archive(booking_ids)
+        except Exception:
+            # Archive write failed and the bookings were restored; retry them next run
+            with self._heap_lock:
+                for entry in self._due:
+                    heapq.heappush(self._heap, entry)
+                self._due = []
+            raise
+        with self._heap_lock:
+            self._due = []
+        self.watermark = cutoff
+        self.runs += 1
+        self.last_run_at = datetime.now()
+        return len(archived)
+
+    def archive(self, booking_ids, status=None):
+        """
+        Move the bookings that are still live to the archive store, optionally
+        setting their status. Returns the (booking_id, record) pairs this call
+        archived; ids that another caller already removed are skipped.
+        """
+        removed = self.store.remove_many_if_live(booking_ids)
+        if not removed:
+            return []
+        bookings = [(booking_id, {**record, "status": status or record["status"]}) for booking_id, record in removed]
+        try:
+            self.archive_store.append([{"booking_id": booking_id, **record} for booking_id, record in bookings])
+        except Exception:
+            self.store.restore(removed)
+            raise
+        self.archived += len(bookings)
+        for listener in self._listeners:
+            listener([record for _, record in bookings])
+        return bookings
+
+    def stats(self):
+        with self._heap_lock:
+            pending = len(self._heap)
+            next_due = self._heap[0][0] if self._heap else None
+        return {
+            "interval_seconds": self.interval,
+            "watermark": self.watermark,
+            "tracked": pending,
+            "next_travel_date": next_due,
+            "runs": self.runs,
+            "archived": self.archived,
+            "errors": self.errors,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+        }
+
+
+booking_archiver = BookingArchiver()
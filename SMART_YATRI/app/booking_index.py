@@ -0,0 +1,151 @@
+"""
+In-memory secondary indexes over the live bookings in the booking store.
+
+Hash indexes map each normalized value to the set of booking_ids that
+carry it:
+  origin, destination, class  - upper-cased
+  status                      - lower-cased
+  travel_date                 - exact YYYY-MM-DD, plus a sorted list of the
+                                distinct dates for range queries
+
+A query intersects the posting sets of its filters, smallest first, so its
+cost follows the size of the smallest posting list and of the result, not
+the number of bookings. The index subscribes to the store and is updated
+in place on every book, cancel and archive. Its postings are saved with
+the store's checkpoint, so a restart loads them and indexes only the
+bookings written since, instead of reading every booking.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+from app.booking_store import booking_store
+
+HASH_FIELDS = {
+    "origin": str.upper,
+    "destination": str.upper,
+    "class": str.upper,
+    "status": str.lower,
+}
+
+
+class BookingIndex:
+    def __init__(self, store=booking_store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._built = False
+        self._postings = {field: {} for field in HASH_FIELDS}
+        self._by_date = {}        # travel_date -> set of booking_ids
+        self._dates = []          # sorted distinct travel dates
+
+    def build(self):
+        """Index every live booking and follow the store from then on. Idempotent."""
+        if self._built:
+            return self
+        with self._build_lock:
+            if not self._built:
+                self.store.subscribe(
+                    self._on_change, replay=True, snapshot=("booking_index", self._dump, self._load),
+                )
+                self._built = True
+        return self
+
+    # ---------- Checkpoint ---------- #
+    def _dump(self):
+        """Copy of the postings; called under the store lock during a checkpoint."""
+        with self._lock:
+            return {
+                "postings": {field: {key: set(ids) for key, ids in values.items()}
+                             for field, values in self._postings.items()},
+                "by_date": {date: set(ids) for date, ids in self._by_date.items()},
+            }
+
+    def _load(self, state):
+        if set(state["postings"]) != set(HASH_FIELDS):
+            return False
+        with self._lock:
+            self._postings = state["postings"]
+            self._by_date = state["by_date"]
+            self._dates = sorted(self._by_date)
+
+    # ---------- Maintenance ---------- #
+    def _add(self, booking_id, record):
+        for field, normalize in HASH_FIELDS.items():
+            self._postings[field].setdefault(normalize(str(record[field])), set()).add(booking_id)
+        date = record["travel_date"]
+        ids = self._by_date.get(date)
+        if ids is None:
+            ids = self._by_date[date] = set()
+            insort(self._dates, date)
+        ids.add(booking_id)
+
+    def _remove(self, booking_id, record):
+        for field, normalize in HASH_FIELDS.items():
+            key = normalize(str(record[field]))
+            ids = self._postings[field].get(key)
+            if ids is not None:
+                ids.discard(booking_id)
+                if not ids:
+                    del self._postings[field][key]
+        date = record["travel_date"]
+        ids = self._by_date.get(date)
+        if ids is not None:
+            ids.discard(booking_id)
+            if not ids:
+                del self._by_date[date]
+                del self._dates[bisect_left(self._dates, date)]
+
+    def _on_change(self, op, booking_id, record, old_record):
+        with self._lock:
+            if old_record is not None:
+                self._remove(booking_id, old_record)
+            if op == "put":
+                self._add(booking_id, record)
+
+    # ---------- Queries ---------- #
+    def _date_range(self, date_from, date_to):
+        lo = bisect_left(self._dates, date_from) if date_from else 0
+        hi = bisect_right(self._dates, date_to) if date_to else len(self._dates)
+        ids = set()
+        for date in self._dates[lo:hi]:
+            ids |= self._by_date[date]
+        return ids
+
+    def search(self, origin=None, destination=None, status=None, class_name=None,
+               travel_date=None, travel_date_from=None, travel_date_to=None):
+        """
+        Booking ids matching every given filter, in booking order; None when no filter is given.
+        """
+        self.build()
+        filters = {"origin": origin, "destination": destination, "status": status, "class": class_name}
+        with self._lock:
+            postings = [
+                self._postings[field].get(HASH_FIELDS[field](value), set())
+                for field, value in filters.items() if value
+            ]
+            if travel_date:
+                postings.append(self._by_date.get(travel_date, set()))
+            if travel_date_from or travel_date_to:
+                postings.append(self._date_range(travel_date_from, travel_date_to))
+            if not postings:
+                return None
+            postings.sort(key=len)
+            result = set(postings[0])
+            for ids in postings[1:]:
+                if not result:
+                    break
+                result &= ids
+        return sorted(result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "distinct": {field: len(values) for field, values in self._postings.items()},
+                "travel_dates": len(self._dates),
+                "first_travel_date": self._dates[0] if self._dates else None,
+                "last_travel_date": self._dates[-1] if self._dates else None,
+            }
+
+
+booking_index = BookingIndex()
@@ -0,0 +1,190 @@
+"""
+Running dashboard aggregates for /booking/summary.
+
+Counters are kept overall and per travel day, train and class:
+  confirmed / cancelled  - live bookings by status
+  revenue                - fare of live confirmed bookings
+  archived               - rows moved to the archive
+  refund                 - fare of archived cancelled bookings
+Amounts are summed in integer paise so adds and removes never drift.
+
+Live counters follow the booking store through its change listener. They
+are saved with the store's checkpoint, so on start they are loaded and
+only the bookings written since are counted again. Archive counters
+cover the whole, ever-growing history, so they are updated from the
+archiver's events and saved to data/booking_stats.json after every
+archive batch. The dashboard therefore reads a handful of integers
+instead of re-reading every archive file.
+
+Recompute the archive counters from the archive store (with the API
+stopped, since a running service would overwrite the file) with:
+    python -m app.booking_stats --rebuild
+"""
+
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+from app.archive_store import archive_store
+from app.booking_archiver import booking_archiver
+from app.booking_store import booking_store
+
+BOOKING_STATS_FILE = Path(os.getenv("BOOKING_STATS_FILE", "data/booking_stats.json"))
+
+DIMENSIONS = {"day": "travel_date", "train": "train_id", "class": "class"}
+LIVE_FIELDS = ("confirmed", "cancelled", "revenue")
+ARCHIVE_FIELDS = ("archived", "refund")
+
+
+def _paise(fare):
+    return int(round(float(fare) * 100))
+
+
+def _empty(fields):
+    return dict.fromkeys(fields, 0)
+
+
+def _bump(counters, key, fields, deltas):
+    bucket = counters.get(key)
+    if bucket is None:
+        bucket = counters[key] = _empty(fields)
+    for field, delta in deltas.items():
+        bucket[field] += delta
+
+
+class BookingStats:
+    def __init__(self, store=booking_store, archiver=booking_archiver, path=BOOKING_STATS_FILE):
+        self.store = store
+        self.archiver = archiver
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._started = False
+        self.live = {"total": _empty(LIVE_FIELDS), **{dim: {} for dim in DIMENSIONS}}
+        self.archive = {"total": _empty(ARCHIVE_FIELDS), **{dim: {} for dim in DIMENSIONS}}
+
+    def start(self):
+        """Load saved archive counters and start following the store and archiver. Idempotent."""
+        with self._start_lock:
+            if self._started:
+                return self
+            if self.path.exists():
+                with open(self.path) as f:
+                    self.archive = json.load(f)
+            self.store.subscribe(self._on_change, replay=True, snapshot=("booking_stats", self._dump, self._load))
+            self.archiver.subscribe(self._on_archive)
+            self._started = True
+        return self
+
+    # ---------- Checkpoint ---------- #
+    def _dump(self):
+        """Copy of the live counters; called under the store lock during a checkpoint."""
+        with self._lock:
+            return {
+                "total": dict(self.live["total"]),
+                **{dim: {key: dict(bucket) for key, bucket in self.live[dim].items()} for dim in DIMENSIONS},
+            }
+
+    def _load(self, state):
+        if set(state) != {"total", *DIMENSIONS}:
+            return False
+        with self._lock:
+            self.live = state
+
+    # ---------- Event handlers ---------- #
+    def _apply(self, counters, fields, record, deltas):
+        for field, delta in deltas.items():
+            counters["total"][field] += delta
+        for dim, column in DIMENSIONS.items():
+            _bump(counters[dim], str(record[column]), fields, deltas)
+
+    @staticmethod
+    def _live_deltas(record, sign):
+        if record["status"] == "confirmed":
+            return {"confirmed": sign, "revenue": sign * _paise(record["fare"])}
+        if record["status"] == "cancelled":
+            return {"cancelled": sign}
+        return {}
+
+    def _on_change(self, op, booking_id, record, old_record):
+        with self._lock:
+            if old_record is not None:
+                self._apply(self.live, LIVE_FIELDS, old_record, self._live_deltas(old_record, -1))
+            if op == "put":
+                self._apply(self.live, LIVE_FIELDS, record, self._live_deltas(record, 1))
+
+    @staticmethod
+    def _archive_deltas(record):
+        deltas = {"archived": 1}
+        if record["status"] == "cancelled":
+            deltas["refund"] = _paise(record["fare"])
+        return deltas
+
+    def _on_archive(self, records):
+        with self._lock:
+            for record in records:
+                self._apply(self.archive, ARCHIVE_FIELDS, record, self._archive_deltas(record))
+        self.save()
+
+    # ---------- Persistence ---------- #
+    def save(self):
+        with self._save_lock:
+            with self._lock:
+                data = json.dumps(self.archive)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+
+    def rebuild_archive(self, store=archive_store):
+        """Recompute the archive counters from the archive store and save them."""
+        columns = ["status", "fare", *DIMENSIONS.values()]
+        archive = {"total": _empty(ARCHIVE_FIELDS), **{dim: {} for dim in DIMENSIONS}}
+        for batch in store.scan(columns=columns):
+            for record in batch.to_pylist():
+                self._apply(archive, ARCHIVE_FIELDS, record, self._archive_deltas(record))
+        with self._lock:
+            self.archive = archive
+        self.save()
+        return archive["total"]
+
+    # ---------- Reads ---------- #
+    @staticmethod
+    def _present(bucket):
+        return {
+            "total_confirmed": bucket.get("confirmed", 0),
+            "total_cancelled": bucket.get("cancelled", 0),
+            "total_archived": bucket.get("archived", 0),
+            "total_revenue": bucket.get("revenue", 0) / 100,
+            "total_refund": bucket.get("refund", 0) / 100,
+        }
+
+    def summary(self):
+        self.start()
+        with self._lock:
+            return self._present({**self.live["total"], **self.archive["total"]})
+
+    def breakdown(self, dimension):
+        """Summary per travel day, train or class."""
+        self.start()
+        with self._lock:
+            keys = set(self.live[dimension]) | set(self.archive[dimension])
+            return {
+                key: self._present({**self.live[dimension].get(key, {}), **self.archive[dimension].get(key, {})})
+                for key in sorted(keys)
+            }
+
+
+booking_stats = BookingStats()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["--rebuild"]:
+        sys.exit("usage: python -m app.booking_stats --rebuild")
+    totals = booking_stats.rebuild_archive()
+    print(f"✅ Archive counters rebuilt: {totals}")
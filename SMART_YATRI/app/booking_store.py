@@ -0,0 +1,682 @@
+"""
+Append-only booking store.
+
+Bookings live in a JSON-lines log (data/bookings.jsonl). Every change is
+appended as one entry:
+
+    {"op": "put", "id": 42, "rec": {...}}   insert or replace booking 42
+    {"op": "del", "id": 42}                 remove booking 42
+    {"op": "seq", "id": 99}                 highest id ever issued (compaction header)
+
+The log is read once when the store opens, leaving an in-memory index of
+booking_id -> (offset, length, train_id), train_id -> booking_ids and a
+sorted list of live ids for cursor pagination. Lookups are a dict hit and
+one pread, and writes are a single O_APPEND write. Nothing rewrites the whole file, so booking latency stays flat as
+the log grows.
+
+Durability uses group commit. The first writer to need an fsync becomes
+the leader and waits BOOKING_GROUP_COMMIT_MS so that concurrent writers
+land in the same fsync. Everyone who appended before that fsync is
+acknowledged together.
+
+Replaced and deleted entries are garbage. Once they make up more than
+BOOKING_COMPACT_RATIO of a log larger than BOOKING_COMPACT_MIN_BYTES, a
+background thread copies the live entries into a fresh file and replays
+anything appended meanwhile. It then swaps the new file in with
+os.replace. A torn final line left by a crash is truncated on open.
+
+The offset index is checkpointed to data/bookings.idx (numpy arrays plus
+the log's inode and size) after every BOOKING_CHECKPOINT_EVERY entries,
+after compaction and on shutdown. On open the checkpoint is loaded and
+only the log written after it is replayed, so startup does not re-parse
+every booking.
+
+Structures derived from the store (the search index, the dashboard
+counters, the archiver's heap) can join the checkpoint by passing
+snapshot=(name, dump, load) to subscribe(). dump() runs under the store
+lock as part of every checkpoint, so the saved state matches the saved
+offsets exactly. On the next open the store keeps the (op, id, location,
+old location) of every entry after the checkpoint; a subscriber whose
+state was saved gets load(state) followed by just those entries, instead
+of a replay of every live booking. The tail is dropped once every saved
+subscriber has rejoined, or when compaction rewrites the log.
+
+On first start an existing data/bookings.csv is imported into the log.
+
+Booking ids, the index and the conditional removes are only consistent
+within one process, so open() takes the owner lock on "<log>.lock"
+(app/owner_lock.py). A second writer process fails to open the store
+instead of issuing duplicate ids; run the booking service as a single
+worker.
+"""
+
+import csv
+import json
+import os
+import pickle
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+import numpy as np
+
+from app.owner_lock import acquire_owner_lock
+
+BOOKING_LOG = Path(os.getenv("BOOKING_LOG", "data/bookings.jsonl"))
+LEGACY_BOOKING_CSV = Path("data/bookings.csv")
+BOOKING_FSYNC = os.getenv("BOOKING_FSYNC", "1") == "1"
+BOOKING_GROUP_COMMIT_MS = float(os.getenv("BOOKING_GROUP_COMMIT_MS", "2"))
+BOOKING_COMPACT_RATIO = float(os.getenv("BOOKING_COMPACT_RATIO", "0.5"))
+BOOKING_COMPACT_MIN_BYTES = int(os.getenv("BOOKING_COMPACT_MIN_BYTES", str(8 * 1024 * 1024)))
+BOOKING_CHECKPOINT_EVERY = int(os.getenv("BOOKING_CHECKPOINT_EVERY", "50000"))
+CHECKPOINT_FORMAT = 1
+
+BOOKING_FIELDS = [
+    "train_id", "origin", "destination", "travel_date", "booking_date",
+    "class", "seats_requested", "fare", "status", "timestamp",
+]
+
+
+def _encode(entry):
+    return (json.dumps(entry, separators=(",", ":")) + "\n").encode()
+
+
+def _fsync_dir(path):
+    fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SortedIds:
+    """
+    Sorted set of booking ids kept in chunks of at most 2 * CHUNK: O(log n)
+    seek to a cursor, O(1) append of new (always larger) ids and cheap deletes.
+    """
+
+    CHUNK = 1024
+
+    def __init__(self):
+        self._chunks = []
+        self._maxes = []
+        self._len = 0
+
+    def add(self, value):
+        if not self._chunks or value > self._maxes[-1]:
+            if not self._chunks or len(self._chunks[-1]) >= self.CHUNK:
+                self._chunks.append([value])
+                self._maxes.append(value)
+            else:
+                self._chunks[-1].append(value)
+                self._maxes[-1] = value
+            self._len += 1
+            return
+        k = bisect_left(self._maxes, value)
+        chunk = self._chunks[k]
+        i = bisect_left(chunk, value)
+        if i < len(chunk) and chunk[i] == value:
+            return
+        chunk.insert(i, value)
+        self._len += 1
+        if len(chunk) > 2 * self.CHUNK:
+            self._chunks[k:k + 1] = [chunk[:self.CHUNK], chunk[self.CHUNK:]]
+            self._maxes[k:k + 1] = [chunk[self.CHUNK - 1], chunk[-1]]
+
+    def discard(self, value):
+        k = bisect_left(self._maxes, value)
+        if k == len(self._maxes):
+            return
+        chunk = self._chunks[k]
+        i = bisect_left(chunk, value)
+        if i < len(chunk) and chunk[i] == value:
+            del chunk[i]
+            self._len -= 1
+            if chunk:
+                self._maxes[k] = chunk[-1]
+            else:
+                del self._chunks[k]
+                del self._maxes[k]
+
+    def after(self, cursor, limit):
+        """Up to `limit` ids greater than `cursor` (from the start when cursor is None)."""
+        k = 0 if cursor is None else bisect_right(self._maxes, cursor)
+        i = 0 if cursor is None or k == len(self._chunks) else bisect_right(self._chunks[k], cursor)
+        out = []
+        while k < len(self._chunks) and len(out) < limit:
+            out.extend(self._chunks[k][i:i + limit - len(out)])
+            k, i = k + 1, 0
+        return out
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def __len__(self):
+        return self._len
+
+
+def _legacy_record(row):
+    record = {field: row.get(field) for field in BOOKING_FIELDS}
+    record["seats_requested"] = int(float(record["seats_requested"] or 0))
+    record["fare"] = float(record["fare"] or 0.0)
+    return record
+
+
+class BookingStore:
+    """
+    Log-structured booking table. Thread-safe; records are plain dicts with BOOKING_FIELDS.
+    Listeners registered with subscribe() are called as
+    listener(op, booking_id, record, old_record) for every put/delete, under
+    the store lock and in log order; record is None for deletes and
+    old_record is None for new bookings.
+    """
+
+    def __init__(self, path=BOOKING_LOG, legacy_csv=LEGACY_BOOKING_CSV, fsync=BOOKING_FSYNC,
+                 group_commit_ms=BOOKING_GROUP_COMMIT_MS, compact_ratio=BOOKING_COMPACT_RATIO,
+                 compact_min_bytes=BOOKING_COMPACT_MIN_BYTES, checkpoint_every=BOOKING_CHECKPOINT_EVERY):
+        self.path = Path(path)
+        self.index_path = self.path.with_suffix(".idx")
+        self.checkpoint_every = checkpoint_every
+        self.legacy_csv = Path(legacy_csv) if legacy_csv else None
+        self.fsync = fsync
+        self.group_commit = group_commit_ms / 1000.0
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+
+        self._lock = threading.Lock()
+        self._durable_cond = threading.Condition(self._lock)
+        self._open_lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()  # one checkpoint writes bookings.idx at a time
+        self._opened = False
+        self._listeners = []
+        self._snapshots = {}         # name -> dump() of subscribers that join the checkpoint
+        self._restored_states = {}   # name -> state from the checkpoint, until that subscriber rejoins
+        self._tail = None            # entries since that checkpoint, while _restored_states is not empty
+
+        self._owner_fd = None    # held for the life of the process; see app/owner_lock.py
+        self._fd = None          # O_APPEND writer
+        self._reader = None      # file object used for pread; replaced on compaction
+        self._offsets = {}       # booking_id -> (offset, length, train_id) of its latest put
+        self._by_train = {}      # train_id -> [booking_id, ...] in booking order
+        self._ids = SortedIds()  # live booking ids
+        self._next_id = 1
+        self._size = 0
+        self._live_bytes = 0
+
+        # Group commit bookkeeping, in bytes appended over the store's lifetime
+        self._appended = 0
+        self._durable = 0
+        self._syncing = False
+        self._compacting = False
+        self._since_checkpoint = 0
+        self._checkpointing = False
+
+        self.fsyncs = 0
+        self.compactions = 0
+        self.checkpoints = 0
+        self.replayed_on_open = 0
+
+    # ---------- Open / recover ---------- #
+    def open(self):
+        """Load the index from the log (importing the legacy CSV on first start). Idempotent."""
+        if self._opened:
+            return self
+        with self._open_lock:
+            if self._opened:
+                return self
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._owner_fd = acquire_owner_lock(self.path)
+            if not self.path.exists():
+                self._import_legacy()
+            self._load(self._load_checkpoint())
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._reader = open(self.path, "rb", buffering=0)
+            self._opened = True
+        return self
+
+    def close(self):
+        """Close the log and release the owner lock. The store must not be used afterwards."""
+        with self._open_lock, self._lock:
+            if not self._opened:
+                return
+            os.close(self._fd)
+            self._reader.close()
+            os.close(self._owner_fd)
+            self._opened = False
+
+    def _import_legacy(self):
+        tmp = self.path.with_suffix(".import")
+        with open(tmp, "wb") as out:
+            if self.legacy_csv is not None and self.legacy_csv.exists():
+                with open(self.legacy_csv, newline="") as f:
+                    for booking_id, row in enumerate(csv.DictReader(f), start=1):
+                        out.write(_encode({"op": "put", "id": booking_id, "rec": _legacy_record(row)}))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, self.path)
+        _fsync_dir(self.path)
+
+    def _load_checkpoint(self):
+        """Restore the index from bookings.idx if it matches the log; returns the log offset to replay from."""
+        if not self.index_path.exists():
+            return 0
+        try:
+            with np.load(self.index_path) as data:
+                meta = json.loads(str(data["meta"]))
+                st = self.path.stat()
+                if meta["format"] != CHECKPOINT_FORMAT or meta["inode"] != st.st_ino or meta["size"] > st.st_size:
+                    return 0
+                ids, offsets, lengths = data["ids"], data["offsets"], data["lengths"]
+                trains, train_codes = meta["trains"], data["train_codes"]
+                states = pickle.loads(data["states"].tobytes()) if "states" in data.files else {}
+        except (OSError, ValueError, KeyError, pickle.UnpicklingError):
+            return 0
+
+        for booking_id, offset, length, code in zip(ids.tolist(), offsets.tolist(), lengths.tolist(),
+                                                    train_codes.tolist()):
+            train_id = trains[code]
+            self._offsets[booking_id] = (offset, length, train_id)
+            self._by_train.setdefault(train_id, []).append(booking_id)
+            self._ids.add(booking_id)
+            self._live_bytes += length
+        self._next_id = meta["next_id"]
+        if states:
+            self._restored_states = states
+            self._tail = []
+        return meta["size"]
+
+    def checkpoint(self):
+        """Persist the offset index for the log as it stands, so the next open can skip the replay."""
+        self.open()
+        with self._checkpoint_lock:
+            with self._lock:
+                if self.fsync:
+                    os.fsync(self._fd)
+                offsets = dict(self._offsets)
+                states = {name: dump() for name, dump in self._snapshots.items()}
+                meta = {
+                    "format": CHECKPOINT_FORMAT,
+                    "inode": os.fstat(self._fd).st_ino,
+                    "size": self._size,
+                    "next_id": self._next_id,
+                }
+                self._since_checkpoint = 0
+
+            ids = np.fromiter(sorted(offsets), dtype=np.int64, count=len(offsets))
+            trains, codes = {}, np.empty(len(ids), dtype=np.int32)
+            locations = np.empty((len(ids), 2), dtype=np.int64)
+            for i, booking_id in enumerate(ids.tolist()):
+                offset, length, train_id = offsets[booking_id]
+                locations[i] = (offset, length)
+                codes[i] = trains.setdefault(train_id, len(trains))
+            meta["trains"] = list(trains)
+            states = np.frombuffer(pickle.dumps(states, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+
+            tmp = self.index_path.with_suffix(".idx.tmp")
+            with open(tmp, "wb") as f:
+                np.savez(f, meta=np.array(json.dumps(meta)), ids=ids, offsets=locations[:, 0],
+                         lengths=locations[:, 1], train_codes=codes, states=states)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.index_path)
+            self.checkpoints += 1
+
+    def _checkpoint_in_background(self):
+        try:
+            self.checkpoint()
+        finally:
+            self._checkpointing = False
+
+    def _load(self, start=0):
+        pos = start
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                old = self._apply(entry, pos, len(line))
+                self._record_tail(entry, pos, len(line), old)
+                pos += len(line)
+                self.replayed_on_open += 1
+        if pos < self.path.stat().st_size:
+            # Torn write from a crash: drop the partial tail
+            os.truncate(self.path, pos)
+        self._size = pos
+
+    def _apply(self, entry, offset, length):
+        """Update the in-memory index for one log entry; returns the location it replaced."""
+        booking_id = entry["id"]
+        if entry["op"] == "seq":
+            self._next_id = max(self._next_id, booking_id + 1)
+            return None
+        old = self._offsets.pop(booking_id, None)
+        if old is not None:
+            self._live_bytes -= old[1]
+        if entry["op"] == "put":
+            train_id = entry["rec"]["train_id"]
+            self._offsets[booking_id] = (offset, length, train_id)
+            self._live_bytes += length
+            if old is None:
+                self._by_train.setdefault(train_id, []).append(booking_id)
+                self._ids.add(booking_id)
+            self._next_id = max(self._next_id, booking_id + 1)
+        elif old is not None:
+            self._ids.discard(booking_id)
+            ids = self._by_train[old[2]]
+            ids.remove(booking_id)
+            if not ids:
+                del self._by_train[old[2]]
+        return old
+
+    def _record_tail(self, entry, offset, length, old):
+        if self._tail is not None and entry["op"] != "seq":
+            self._tail.append((entry["op"], entry["id"], (offset, length) if entry["op"] == "put" else None, old))
+
+    @staticmethod
+    def _read(reader, location):
+        offset, length = location[0], location[1]
+        return json.loads(os.pread(reader.fileno(), length, offset))["rec"]
+
+    # ---------- Writes ---------- #
+    def _append(self, entries):
+        """
+        Append entries as one write, update the index, then wait for the group commit.
+        `entries` may also be a function called under the store lock that returns
+        them, for writes that must check the current state first.
+        """
+        self.open()
+        with self._lock:
+            if callable(entries):
+                entries = entries()
+            if not entries:
+                return []
+            for entry in entries:
+                if entry["op"] == "put" and entry.get("id") is None:
+                    entry["id"] = self._next_id
+                    self._next_id += 1
+            data = [_encode(entry) for entry in entries]
+            blob = b"".join(data)
+            written = 0
+            while written < len(blob):
+                written += os.write(self._fd, blob[written:])
+            offset = self._size
+            for entry, line in zip(entries, data):
+                old = self._apply(entry, offset, len(line))
+                self._record_tail(entry, offset, len(line), old)
+                if self._listeners:
+                    old_record = self._read(self._reader, old) if old else None
+                    for listener in self._listeners:
+                        listener(entry["op"], entry["id"], entry.get("rec"), old_record)
+                offset += len(line)
+            self._size = offset
+            self._appended += len(blob)
+            self._wait_durable(self._appended)
+            compact = self._should_compact()
+            if compact:
+                self._compacting = True
+            self._since_checkpoint += len(entries)
+            checkpoint = (not compact and not self._checkpointing
+                          and self._since_checkpoint >= self.checkpoint_every)
+            if checkpoint:
+                self._checkpointing = True
+        if compact:
+            threading.Thread(target=self._run_compaction, daemon=True).start()
+        elif checkpoint:
+            threading.Thread(target=self._checkpoint_in_background, daemon=True).start()
+        return [entry["id"] for entry in entries]
+
+    def _wait_durable(self, target):
+        """Called with the lock held. Returns once bytes up to `target` are fsynced."""
+        if not self.fsync:
+            self._durable = self._appended
+            return
+        while self._durable < target:
+            if self._syncing:
+                self._durable_cond.wait()
+                continue
+            # Become the group-commit leader
+            self._syncing = True
+            self._lock.release()
+            try:
+                if self.group_commit:
+                    time.sleep(self.group_commit)
+                covered = self._appended
+                os.fsync(self._fd)
+            finally:
+                self._lock.acquire()
+                self._syncing = False
+            self._durable = max(self._durable, covered)
+            self.fsyncs += 1
+            self._durable_cond.notify_all()
+
+    def insert(self, record):
+        """Store a new booking and return its booking_id once it is durable."""
+        return self.insert_many([record])[0]
+
+    def insert_many(self, records):
+        return self._append([{"op": "put", "id": None, "rec": dict(record)} for record in records])
+
+    def delete(self, booking_ids):
+        entries = [{"op": "del", "id": booking_id} for booking_id in booking_ids]
+        if entries:
+            self._append(entries)
+
+    def remove_if_live(self, booking_id):
+        """Remove a booking if it is still live; returns its record, or None if it was already gone."""
+        removed = self.remove_many_if_live([booking_id])
+        return removed[0][1] if removed else None
+
+    def remove_many_if_live(self, booking_ids):
+        """
+        Remove the bookings that are still live and return their (booking_id, record)
+        pairs. The check and the delete happen under one lock hold, so when callers
+        race to remove the same booking exactly one of them gets it back.
+        """
+        removed = []
+
+        def claim():
+            for booking_id in dict.fromkeys(booking_ids):
+                location = self._offsets.get(booking_id)
+                if location is not None:
+                    removed.append((booking_id, self._read(self._reader, location)))
+            return [{"op": "del", "id": booking_id} for booking_id, _ in removed]
+
+        self._append(claim)
+        return removed
+
+    def restore(self, bookings):
+        """Put removed (booking_id, record) pairs back under their original ids."""
+        self._append([{"op": "put", "id": booking_id, "rec": dict(record)} for booking_id, record in bookings])
+
+    # ---------- Reads ---------- #
+    def get(self, booking_id):
+        self.open()
+        with self._lock:
+            reader, location = self._reader, self._offsets.get(booking_id)
+        return self._read(reader, location) if location else None
+
+    def get_many(self, booking_ids):
+        """(booking_id, record) pairs for the ids that are still live, in the given order."""
+        self.open()
+        with self._lock:
+            reader = self._reader
+            locations = [(bid, self._offsets.get(bid)) for bid in booking_ids]
+        return [(bid, self._read(reader, loc)) for bid, loc in locations if loc]
+
+    def ids_for_train(self, train_id):
+        self.open()
+        with self._lock:
+            return list(self._by_train.get(train_id, ()))
+
+    def ids(self):
+        """Live booking ids in booking order."""
+        self.open()
+        with self._lock:
+            return list(self._ids)
+
+    def page(self, cursor=None, limit=100):
+        """
+        Up to `limit` (booking_id, record) pairs with booking_id > cursor, in booking
+        order, plus the cursor for the next page (None on the last page).
+        """
+        self.open()
+        with self._lock:
+            ids = self._ids.after(cursor, limit + 1)
+            reader = self._reader
+            locations = [(bid, self._offsets[bid]) for bid in ids[:limit]]
+        next_cursor = ids[limit - 1] if len(ids) > limit else None
+        return [(bid, self._read(reader, loc)) for bid, loc in locations], next_cursor
+
+    def scan(self, cursor=None, batch_size=1000):
+        """
+        Iterate (booking_id, record) over every live booking in booking order, a page
+        at a time, so memory stays flat however many bookings there are.
+        """
+        while True:
+            page, cursor = self.page(cursor, batch_size)
+            yield from page
+            if cursor is None:
+                return
+
+    def __len__(self):
+        self.open()
+        return len(self._offsets)
+
+    def subscribe(self, listener, replay=False, snapshot=None):
+        """
+        Register a change listener. With replay=True it is first called with a
+        "put" for every live booking, atomically with the registration, so
+        derived structures can be built without missing or double-counting writes.
+
+        snapshot=(name, dump, load) adds the subscriber's state to checkpoints.
+        If the checkpoint the store opened from holds a state under `name`,
+        load(state) is called and only the entries written since are passed
+        to the listener, in place of the replay. Returns True in that case;
+        load() may return False to reject a state it cannot use.
+        """
+        self.open()
+        with self._lock:
+            restored = False
+            if snapshot is not None:
+                name, dump, load = snapshot
+                state = self._restored_states.pop(name, None)
+                if state is not None and self._tail is not None and load(state) is not False:
+                    for op, booking_id, location, old in self._tail:
+                        record = self._read(self._reader, location) if location else None
+                        listener(op, booking_id, record, self._read(self._reader, old) if old else None)
+                    restored = True
+                if not self._restored_states:
+                    self._tail = None
+                self._snapshots[name] = dump
+            if replay and not restored:
+                for booking_id in self._ids:
+                    listener("put", booking_id, self._read(self._reader, self._offsets[booking_id]), None)
+            self._listeners.append(listener)
+        return restored
+
+    # ---------- Compaction ---------- #
+    def _should_compact(self):
+        return (
+            not self._compacting
+            and self._size
+            and self._size >= self.compact_min_bytes
+            and (self._size - self._live_bytes) / self._size > self.compact_ratio
+        )
+
+    def compact(self):
+        """Rewrite the log with only live entries. Writers are blocked only while the tail is replayed."""
+        self.open()
+        with self._lock:
+            if self._compacting:
+                return False
+            self._compacting = True
+        self._run_compaction()
+        return True
+
+    def _run_compaction(self):
+        try:
+            with self._lock:
+                reader = self._reader
+                snapshot = [(booking_id, self._offsets[booking_id]) for booking_id in self._ids]
+                snapshot_size = self._size
+                last_id = self._next_id - 1
+            self._compact(reader, snapshot, snapshot_size, last_id)
+        finally:
+            with self._lock:
+                self._compacting = False
+        # The log is a new file now; the old checkpoint no longer matches it
+        self.checkpoint()
+
+    def _compact(self, reader, snapshot, snapshot_size, last_id):
+        tmp = self.path.with_suffix(".compact")
+        # Deleted bookings vanish from the new file; keep ids from being reissued after a restart
+        header = _encode({"op": "seq", "id": last_id})
+        offsets, pos = {}, len(header)
+        with open(tmp, "wb") as out:
+            out.write(header)
+            for booking_id, (offset, length, train_id) in snapshot:
+                out.write(os.pread(reader.fileno(), length, offset))
+                offsets[booking_id] = (pos, length, train_id)
+                pos += length
+            live_bytes = pos - len(header)
+            out.flush()
+            os.fsync(out.fileno())
+
+            with self._lock:
+                while self._syncing:
+                    self._durable_cond.wait()
+                # Entries appended since the snapshot go over verbatim, deletes included
+                tail = os.pread(reader.fileno(), self._size - snapshot_size, snapshot_size)
+                for line in tail.splitlines(keepends=True):
+                    entry = json.loads(line)
+                    old = offsets.pop(entry["id"], None)
+                    if old is not None:
+                        live_bytes -= old[1]
+                    if entry["op"] == "put":
+                        offsets[entry["id"]] = (pos, len(line), entry["rec"]["train_id"])
+                        live_bytes += len(line)
+                    pos += len(line)
+                out.write(tail)
+                out.flush()
+                os.fsync(out.fileno())
+                os.replace(tmp, self.path)
+                _fsync_dir(self.path)
+
+                os.close(self._fd)
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+                # Readers holding the old file object finish on it; it closes with its last reference
+                self._reader = open(self.path, "rb", buffering=0)
+                self._offsets = offsets
+                self._size = pos
+                self._live_bytes = live_bytes
+                self._durable = self._appended
+                # Tail locations point into the old file; late subscribers replay in full
+                self._tail = None
+                self._restored_states = {}
+                self.compactions += 1
+
+    def stats(self):
+        self.open()
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "live_bookings": len(self._offsets),
+                "log_bytes": self._size,
+                "live_bytes": self._live_bytes,
+                "garbage_ratio": round((self._size - self._live_bytes) / self._size, 4) if self._size else 0.0,
+                "fsyncs": self.fsyncs,
+                "compactions": self.compactions,
+                "checkpoints": self.checkpoints,
+                "replayed_on_open": self.replayed_on_open,
+                "snapshot_subscribers": sorted(self._snapshots),
+                "next_booking_id": self._next_id,
+            }
+
+
+booking_store = BookingStore()
@@ -0,0 +1,205 @@
+"""
+Array-backed RandomForest inference for the serving path.
+
+compile_models() flattens the fitted seat, seats-left and fare forests
+into contiguous node arrays (feature, threshold, left, right, value) and
+copies the one-hot vocabulary out of the shared preprocessor. The
+CompiledModels evaluator then encodes feature tuples itself and walks
+every tree of a forest at once with NumPy fancy indexing, skipping
+sklearn's input validation, joblib dispatch and per-tree Python calls.
+
+Outputs match sklearn exactly: thresholds are compared against float32
+features like sklearn does, class distributions are normalized the same
+way, and tree outputs are accumulated in estimator order (cumsum) before
+averaging. check_parity() enforces this at compile time.
+
+Compile an existing artifact dir with:  python -m app.compiled_forest <dir>
+"""
+
+import os
+import sys
+
+import joblib
+import numpy as np
+
+from app.inference import (
+    FEATURE_COLS,
+    PREPROCESSOR_FILE, SEAT_MODEL_FILE, SEATLEFT_MODEL_FILE, FARE_MODEL_FILE, COMPILED_MODELS_FILE,
+    format_predictions, predict_frame, ModelSet,
+)
+
+COMPILED_FORMAT = 1
+
+
+# ---------- Compile ---------- #
+def compile_forest(forest):
+    """
+    Concatenate every tree of a fitted RandomForest into one set of node arrays.
+    Leaves point to themselves, so a walk of `depth` steps parks on them.
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    is_classifier = hasattr(forest, "classes_")
+
+    for est in forest.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        node_ids = np.arange(n) + offset
+        leaf = tree.children_left == -1
+
+        features.append(np.where(leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        lefts.append(np.where(leaf, node_ids, tree.children_left + offset))
+        rights.append(np.where(leaf, node_ids, tree.children_right + offset))
+
+        if is_classifier:
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+        else:
+            values.append(tree.value[:, 0, 0].astype(np.float64))
+
+        roots.append(offset)
+        offset += n
+
+    return {
+        "feature": np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+        "threshold": np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+        "left": np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+        "right": np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+        "value": np.ascontiguousarray(np.concatenate(values)),
+        "roots": np.asarray(roots, dtype=np.intp),
+        "depth": max(est.tree_.max_depth for est in forest.estimators_),
+        "classes": np.asarray(forest.classes_) if is_classifier else None,
+    }
+
+
+def compile_models(preprocessor, seat, seatleft, fare):
+    """Flatten the shared preprocessor's vocabulary and the three forests."""
+    encoder = preprocessor.named_transformers_["cat"]
+    return {
+        "format": COMPILED_FORMAT,
+        "categories": [list(cats) for cats in encoder.categories_],
+        "n_features": len(preprocessor.get_feature_names_out()),
+        "forests": {
+            "seat": compile_forest(seat),
+            "seatleft": compile_forest(seatleft),
+            "fare": compile_forest(fare),
+        },
+    }
+
+
+# ---------- Evaluate ---------- #
+class CompiledForest:
+    def __init__(self, arrays):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.depth = arrays["depth"]
+        self.classes = arrays["classes"]
+
+    def apply(self, X):
+        """Leaf node index of every (row, tree) pair; X is float32 (n_rows, n_features)."""
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.roots.size))
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict(self, X):
+        leaf_values = self.value[self.apply(X)]
+        # Sequential accumulation over trees, as sklearn does, then average
+        mean = leaf_values.cumsum(axis=1)[:, -1] / self.roots.size
+        if self.classes is None:
+            return mean
+        return self.classes.take(np.argmax(mean, axis=1), axis=0)
+
+
+class CompiledModels:
+    """
+    Drop-in replacement for the sklearn path: feature tuples in, prediction dicts out.
+    """
+
+    def __init__(self, compiled):
+        if compiled.get("format") != COMPILED_FORMAT:
+            raise ValueError(f"Unsupported compiled model format: {compiled.get('format')}")
+        self.n_features = compiled["n_features"]
+        self.n_cat = len(compiled["categories"])
+        self.vocab = []
+        offset = 0
+        for cats in compiled["categories"]:
+            self.vocab.append({cat: offset + i for i, cat in enumerate(cats)})
+            offset += len(cats)
+        self.n_onehot = offset
+        self.seat = CompiledForest(compiled["forests"]["seat"])
+        self.seatleft = CompiledForest(compiled["forests"]["seatleft"])
+        self.fare = CompiledForest(compiled["forests"]["fare"])
+
+    def encode(self, rows):
+        """One-hot + passthrough, matching the ColumnTransformer layout; unknown categories encode as zeros."""
+        X = np.zeros((len(rows), self.n_features), dtype=np.float32)
+        for r, row in enumerate(rows):
+            for j, vocab in enumerate(self.vocab):
+                col = vocab.get(row[j])
+                if col is not None:
+                    X[r, col] = 1.0
+            X[r, self.n_onehot:] = row[self.n_cat:]
+        return X
+
+    def predict_rows(self, rows):
+        X = self.encode(rows)
+        return format_predictions(self.seat.predict(X), self.seatleft.predict(X), self.fare.predict(X))
+
+
+# ---------- Parity ---------- #
+def check_parity(compiled_models, models, frame):
+    """
+    Raise ValueError unless the compiled evaluator reproduces sklearn's
+    predictions exactly on every row of `frame`.
+    """
+    frame = frame[FEATURE_COLS]
+    rows = list(frame.itertuples(index=False, name=None))
+    expected = predict_frame(frame, models)
+    actual = compiled_models.predict_rows(rows)
+    mismatches = [i for i, (e, a) in enumerate(zip(expected, actual)) if e != a]
+    if mismatches:
+        i = mismatches[0]
+        raise ValueError(
+            f"Compiled forests disagree with sklearn on {len(mismatches)}/{len(rows)} rows "
+            f"(first: row {i}, sklearn={expected[i]}, compiled={actual[i]})"
+        )
+    return len(rows)
+
+
+def compile_artifact_dir(artifact_dir, parity_frame=None):
+    """
+    Compile the shared-preprocessor artifacts in `artifact_dir` into COMPILED_MODELS_FILE.
+    """
+    preprocessor_path = os.path.join(artifact_dir, PREPROCESSOR_FILE)
+    if not os.path.exists(preprocessor_path):
+        raise FileNotFoundError(f"No shared preprocessor in {artifact_dir}; retrain with train_all_models.py")
+
+    models = ModelSet(
+        preprocessor=joblib.load(preprocessor_path),
+        seat=joblib.load(os.path.join(artifact_dir, SEAT_MODEL_FILE)),
+        seatleft=joblib.load(os.path.join(artifact_dir, SEATLEFT_MODEL_FILE)),
+        fare=joblib.load(os.path.join(artifact_dir, FARE_MODEL_FILE)),
+    )
+    compiled = compile_models(models.preprocessor, models.seat, models.seatleft, models.fare)
+    if parity_frame is not None:
+        check_parity(CompiledModels(compiled), models, parity_frame)
+
+    joblib.dump(compiled, os.path.join(artifact_dir, COMPILED_MODELS_FILE))
+    return compiled
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m app.compiled_forest <artifact_dir>")
+    compile_artifact_dir(sys.argv[1])
+    print(f"✅ Compiled forests written to {os.path.join(sys.argv[1], COMPILED_MODELS_FILE)}")
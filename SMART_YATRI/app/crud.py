@@ -3,9 +3,12 @@ Smart Yatri CRUD operations
 Author: Abhay Tripathi
 Project: Smart Yatri
 """
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from . import models, schemas
-from datetime import datetime, timedelta
+from . import fare_rollup, models, schemas
+from .database import read_router
+from datetime import date, datetime, timedelta
 import random
 
 # -----------------------------
@@ -14,22 +17,108 @@ import random
 def create_booking(db: Session, booking: schemas.BookingCreate):
     db_booking = models.Booking(**booking.dict())
     db.add(db_booking)
+    db.execute(fare_rollup.add_booking(db_booking))
     db.commit()
+    read_router.note_write(db_booking.user_id)
     db.refresh(db_booking)
     return db_booking
 
 def get_all_bookings(db: Session):
     return db.query(models.Booking).all()
 
+# -----------------------------
+# Cancellation
+# -----------------------------
+# One conditional UPDATE ... RETURNING both checks and flips the status, so
+# a cancel is a single round-trip and two concurrent cancels of the same
+# booking cannot both succeed: the loser's WHERE no longer matches.
+CANCEL_RETURNING = (
+    models.Booking.id,
+    models.Booking.user_id,
+    models.Booking.status,
+    models.Booking.cancellation_time,
+    *(getattr(models.Booking, name) for name in fare_rollup.GROUP_COLUMNS),
+    models.Booking.fare,
+)
+
+
+def cancel_statement(booking_ids):
+    return (
+        update(models.Booking)
+        .where(models.Booking.id.in_(booking_ids))
+        .where(models.Booking.status != models.BookingStatus.CANCELLED)
+        # Naive UTC, as datetime.utcnow() stored it; now() alone is in the server's time zone
+        .values(status=models.BookingStatus.CANCELLED, cancellation_time=func.timezone("utc", func.now()))
+        .returning(*CANCEL_RETURNING)
+        .execution_options(synchronize_session=False)
+    )
+
+
 def cancel_booking(db: Session, booking_id: int):
-    booking = db.query(models.Booking).filter(models.Booking.id == booking_id).first()
-    if not booking:
-        return None
-    booking.status = "cancelled"
-    booking.cancellation_time = datetime.utcnow()
+    """Cancel one booking; returns its (id, status, cancellation_time, ...) row, or None if it was not live."""
+    rows = db.execute(cancel_statement([booking_id])).all()
+    if rows:
+        db.execute(*fare_rollup.remove_bookings(rows))
     db.commit()
-    db.refresh(booking)
-    return booking
+    read_router.note_write(*{row.user_id for row in rows})
+    return rows[0] if rows else None
+
+
+async def cancel_bookings(db: AsyncSession, booking_ids):
+    """Cancel every live booking in `booking_ids` in one statement; returns the rows that changed."""
+    rows = (await db.execute(cancel_statement(booking_ids))).all()
+    if rows:
+        await db.execute(*fare_rollup.remove_bookings(rows))
+    await db.commit()
+    read_router.note_write(*{row.user_id for row in rows})
+    return rows
+
+# -----------------------------
+# Keyset pagination
+# -----------------------------
+# List endpoints select only the response columns with Core and page by
+# seeking past the last key, so every page is one index range scan of
+# `limit` rows with no ORM objects built and no OFFSET to skip over.
+BOOKING_COLUMNS = tuple(getattr(models.Booking, name) for name in schemas.BookingResponse.model_fields)
+
+
+def bookings_after(after_id, limit):
+    """All bookings in id order, starting after `after_id`. Selects one extra row to detect a next page."""
+    query = select(*BOOKING_COLUMNS).order_by(models.Booking.id).limit(limit + 1)
+    if after_id is not None:
+        query = query.where(models.Booking.id > after_id)
+    return query
+
+
+def user_bookings_before(user_id, cursor, limit):
+    """A user's bookings, newest travel date first, starting after a `travel_cursor`."""
+    query = (
+        select(*BOOKING_COLUMNS)
+        .where(models.Booking.user_id == user_id)
+        .order_by(models.Booking.travel_date.desc(), models.Booking.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        query = query.where(tuple_(models.Booking.travel_date, models.Booking.id) < parse_travel_cursor(cursor))
+    return query
+
+
+def travel_cursor(row):
+    return f"{row.travel_date.isoformat()}:{row.id}"
+
+
+def parse_travel_cursor(cursor):
+    """(travel_date, id) from a "YYYY-MM-DD:id" cursor; raises ValueError if malformed."""
+    travel_date, _, booking_id = cursor.partition(":")
+    return date.fromisoformat(travel_date), int(booking_id)
+
+
+def keyset_page(rows, limit, cursor_of):
+    """Split a limit+1 result into plain row dicts and the cursor of the next page (None on the last)."""
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return [row._asdict() for row in rows], (cursor_of(rows[-1]) if more else None)
+
 
 # -----------------------------
 # Prediction & Fare Trends
@@ -39,8 +128,9 @@ def predict_seat_availability(train_id: str, class_name: str, travel_date: datet
     probability = random.uniform(0.3, 0.95)
     return {"train_id": train_id, "class_name": class_name, "travel_date": travel_date, "probability_available": round(probability, 2)}
 
-def get_fare_trends(train_id: str, class_name: str):
+def get_fare_trends(db: Session, train_id: str, class_name: str, days: int = 7):
     today = datetime.today().date()
-    booked_trends = [{"date": today - timedelta(days=i), "avg_fare": random.randint(500, 1500)} for i in range(7)]
+    rows = db.execute(fare_rollup.daily_trend(train_id, class_name, days, end_date=today)).all()
+    booked_trends = [{"date": r.date, "avg_fare": float(r.avg_fare)} for r in rows]
     predicted_trends = [{"date": today + timedelta(days=i), "avg_fare": random.randint(600, 1600)} for i in range(7)]
     return {"booked_trends": booked_trends, "predicted_trends": predicted_trends}
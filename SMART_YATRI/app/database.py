@@ -3,12 +3,39 @@ Smart Yatri Database Setup
 Author: Abhay Tripathi
 Project: Smart Yatri
 Description: SQLAlchemy database connection and session management
+
+Two engines share one pool configuration:
+  engine        - sync psycopg2 engine (get_db), for scripts, Alembic and
+                  the routes that have not moved to async yet
+  async_engine  - asyncpg engine (get_async_db), so request handlers await
+                  the database instead of parking a threadpool worker
+Pool sizing comes from DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+DB_POOL_PRE_PING and DB_POOL_RECYCLE. Both pools time every checkout, so
+pool_stats() shows how long requests waited for a connection and how many
+gave up after DB_POOL_TIMEOUT.
+
+Read-only routes depend on get_read_db, which hands out a session on one
+of the DB_REPLICA_URLS engines (comma-separated, round-robin). A replica
+that fails a health check or a connect is skipped for
+DB_REPLICA_RETRY_SECONDS. A user who wrote in the last
+DB_READ_YOUR_WRITES_SECONDS is served from the primary, so they never
+read a replica that has not caught up with their own write. With no
+replicas configured, or none healthy, reads use the primary.
 """
 
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError, OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+import asyncio
 import os
+import threading
+import time
+
+from app.metrics import Histogram, POOL_WAIT_MS_BUCKETS
 
 # ----------------------
 # Environment variables (can also use .env)
@@ -20,15 +47,192 @@ DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("POSTGRES_PORT", "5432")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+DB_REPLICA_URLS = [url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()]
+DB_REPLICA_HEALTH_INTERVAL = float(os.getenv("DB_REPLICA_HEALTH_INTERVAL", "5"))
+DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "10"))
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+
+
+# ----------------------
+# Instrumented pools
+# ----------------------
+class _TimedCheckout:
+    """Mixin for QueuePool classes: records how long each checkout waited for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait_ms = Histogram(POOL_WAIT_MS_BUCKETS)
+        self.checkout_timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            self.checkout_wait_ms.observe((time.perf_counter() - start) * 1000.0)
+
+    def recreate(self):
+        # Carry the metrics over when the engine rebuilds its pool (e.g. after a disconnect)
+        pool = super().recreate()
+        pool.checkout_wait_ms, pool.checkout_timeouts = self.checkout_wait_ms, self.checkout_timeouts
+        return pool
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+    "pool_recycle": DB_POOL_RECYCLE,
+}
 
 # ----------------------
 # SQLAlchemy setup
 # ----------------------
-engine = create_engine(DATABASE_URL, echo=False)
+engine = create_engine(DATABASE_URL, echo=False, poolclass=TimedQueuePool, **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False, poolclass=TimedAsyncQueuePool, **POOL_OPTIONS)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
+# ----------------------
+# Read replicas
+# ----------------------
+def _async_url(url):
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    return url
+
+
+class ReplicaRouter:
+    """
+    Round-robin over healthy replica engines, with read-your-writes
+    stickiness per user. Falls back to `primary` when no replica is usable.
+    """
+
+    def __init__(self, primary, urls=DB_REPLICA_URLS, sticky_seconds=DB_READ_YOUR_WRITES_SECONDS,
+                 retry_seconds=DB_REPLICA_RETRY_SECONDS, clock=time.monotonic):
+        self.primary = primary
+        self.replicas = [
+            create_async_engine(_async_url(url), echo=False, poolclass=TimedAsyncQueuePool, **POOL_OPTIONS)
+            for url in urls
+        ]
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._down_until = [0.0] * len(self.replicas)
+        self._next = 0
+        self._recent_writers = {}      # user_id -> end of the read-your-writes window
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.sticky_reads = 0
+        self.failovers = 0
+
+    def note_write(self, *user_ids):
+        """Pin these users' reads to the primary for the read-your-writes window."""
+        until = self._clock() + self.sticky_seconds
+        with self._lock:
+            for user_id in user_ids:
+                self._recent_writers[user_id] = until
+
+    def _sticky(self, user_id, now):
+        until = self._recent_writers.get(user_id)
+        if until is None:
+            return False
+        if until <= now:
+            del self._recent_writers[user_id]
+            return False
+        return True
+
+    def pick(self, user_id=None):
+        """(index, engine) to read from; index is None for the primary."""
+        now = self._clock()
+        with self._lock:
+            if user_id is not None and self._sticky(user_id, now):
+                self.sticky_reads += 1
+                return None, self.primary
+            for _ in range(len(self.replicas)):
+                index = self._next
+                self._next = (self._next + 1) % len(self.replicas)
+                if self._down_until[index] <= now:
+                    self.replica_reads += 1
+                    return index, self.replicas[index]
+            self.primary_reads += 1
+            return None, self.primary
+
+    def mark_down(self, index):
+        with self._lock:
+            self._down_until[index] = self._clock() + self.retry_seconds
+            self.failovers += 1
+
+    def mark_up(self, index):
+        with self._lock:
+            self._down_until[index] = 0.0
+
+    async def check(self):
+        """Ping every replica once, updating which ones reads may use."""
+        for index, replica in enumerate(self.replicas):
+            try:
+                async with replica.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            except (OSError, DBAPIError, OperationalError, PoolTimeoutError):
+                self.mark_down(index)
+            except Exception as exc:
+                # Anything else (driver bug, bad URL) also takes the replica out, and
+                # must not stop the other replicas from being checked
+                print(f"⚠️ Replica {index} health check failed: {exc!r}")
+                self.mark_down(index)
+            else:
+                self.mark_up(index)
+
+    async def run_health_checks(self, interval=DB_REPLICA_HEALTH_INTERVAL):
+        while True:
+            try:
+                await self.check()
+            except Exception as exc:
+                print(f"⚠️ Replica health check round failed: {exc!r}")
+            await asyncio.sleep(interval)
+
+    def stats(self):
+        now = self._clock()
+        with self._lock:
+            return {
+                "replicas": len(self.replicas),
+                "healthy": sum(1 for until in self._down_until if until <= now),
+                "replica_reads": self.replica_reads,
+                "primary_reads": self.primary_reads,
+                "sticky_reads": self.sticky_reads,
+                "failovers": self.failovers,
+                "sticky_users": len(self._recent_writers),
+            }
+
+
+read_router = ReplicaRouter(async_engine)
+
+
 # ----------------------
 # Dependency for FastAPI routes
 # ----------------------
@@ -42,3 +246,57 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Yield an AsyncSession for async routes.
+    The connection is checked out on first use and returned when the request ends.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db(request: Request):
+    """
+    Yield an AsyncSession for read-only routes, bound to a replica when one
+    is usable. The user is taken from the route's user_id path or query
+    parameter, for read-your-writes stickiness.
+    """
+    user_id = request.path_params.get("user_id", request.query_params.get("user_id"))
+    index, bind = read_router.pick(int(user_id) if user_id and str(user_id).isdigit() else None)
+    async with AsyncSessionLocal(bind=bind) as db:
+        if index is not None:
+            # Connect up front so a dead replica fails over here rather than mid-query
+            try:
+                await db.connection()
+            except (OSError, DBAPIError, OperationalError, PoolTimeoutError):
+                read_router.mark_down(index)
+                await db.close()
+                db = AsyncSessionLocal(bind=read_router.primary)
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+def _pool_stats(pool):
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "idle": pool.checkedin(),
+        "checkout_timeouts": pool.checkout_timeouts,
+        "checkout_wait_ms": pool.checkout_wait_ms.snapshot(),
+    }
+
+
+def pool_stats():
+    """Pool occupancy and checkout-wait histograms for every engine, plus read routing counters."""
+    return {
+        "config": POOL_OPTIONS,
+        "sync": _pool_stats(engine.pool),
+        "async": _pool_stats(async_engine.sync_engine.pool),
+        "replicas": [_pool_stats(replica.sync_engine.pool) for replica in read_router.replicas],
+        "read_routing": read_router.stats(),
+    }
@@ -0,0 +1,172 @@
+"""
+Execution backends for CPU-bound inference and blocking file/DB work.
+
+Async route handlers never run pandas or sklearn on the event loop.
+Inference goes to a dedicated pool chosen by INFERENCE_BACKEND:
+  thread  - ThreadPoolExecutor (default; NumPy releases the GIL for most
+            of the compiled-forest walk)
+  process - ProcessPoolExecutor whose workers load the models once at
+            start-up, so one API process can use every core
+CSV and other blocking I/O goes to a separate, bounded thread pool. Both
+pools report queue depth, running tasks and queue-wait histograms.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.metrics import Histogram, QUEUE_WAIT_MS_BUCKETS
+from app.inference import predict_batch_items, predict_records
+from app.model_registry import registry
+from app.prediction_cache import prediction_cache
+
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "8"))
+IO_MAX_PENDING = int(os.getenv("IO_MAX_PENDING", "256"))
+
+
+# ---------- Work run inside the inference pool ---------- #
+def _init_inference_worker():
+    """Process-pool initializer: load the models before the first task arrives."""
+    registry.warm()
+
+
+def predict_in_worker(records):
+    return predict_records(records, registry.models(), prediction_cache)
+
+
+def predict_batch_in_worker(items, request_model):
+    return predict_batch_items(items, request_model, registry.models(), prediction_cache)
+
+
+# ---------- Instrumented pools ---------- #
+class InstrumentedExecutor:
+    """
+    Wraps a concurrent.futures executor for use from async handlers and
+    tracks how deep its queue gets. `max_pending` bounds queued + running
+    tasks; further callers wait on the event loop instead of piling up.
+    """
+
+    def __init__(self, name, factory, max_pending=None):
+        self.name = name
+        self._factory = factory
+        self._executor = None
+        self._create_lock = threading.Lock()
+        self.max_pending = max_pending
+        self._slots = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.peak_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._create_lock:
+                if self._executor is None:
+                    self._executor = self._factory()
+        return self._executor
+
+    def _on_submit(self):
+        with self._lock:
+            self.queued += 1
+            self.peak_depth = max(self.peak_depth, self.queued + self.running)
+
+    def _on_start(self, submitted_at):
+        self.queue_wait_ms.observe((time.perf_counter() - submitted_at) * 1000.0)
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+
+    def _on_finish(self, ok):
+        with self._lock:
+            self.running -= 1
+            self.completed += 1
+            self.failed += 0 if ok else 1
+
+    async def run(self, fn, *args):
+        if self.max_pending and self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        if self._slots is not None:
+            async with self._slots:
+                return await self._run(fn, *args)
+        return await self._run(fn, *args)
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        submitted_at = time.perf_counter()
+        self._on_submit()
+        if isinstance(self.executor, ProcessPoolExecutor):
+            # A worker process cannot report back when it starts; count the whole round trip
+            self._on_start(submitted_at)
+            try:
+                result = await loop.run_in_executor(self.executor, fn, *args)
+            except Exception:
+                self._on_finish(False)
+                raise
+            self._on_finish(True)
+            return result
+
+        def call():
+            self._on_start(submitted_at)
+            try:
+                result = fn(*args)
+            except Exception:
+                self._on_finish(False)
+                raise
+            self._on_finish(True)
+            return result
+
+        return await loop.run_in_executor(self.executor, call)
+
+    def stats(self):
+        with self._lock:
+            depth = {
+                "queued": self.queued,
+                "running": self.running,
+                "peak_depth": self.peak_depth,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+        return {"name": self.name, "max_pending": self.max_pending, **depth,
+                "queue_wait_ms": self.queue_wait_ms.snapshot()}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _make_inference_pool():
+    if INFERENCE_BACKEND == "process":
+        return ProcessPoolExecutor(
+            max_workers=INFERENCE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_inference_worker,
+        )
+    if INFERENCE_BACKEND != "thread":
+        raise ValueError(f"Unknown INFERENCE_BACKEND: {INFERENCE_BACKEND!r} (use 'thread' or 'process')")
+    return ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+
+
+inference_executor = InstrumentedExecutor("inference", _make_inference_pool)
+io_executor = InstrumentedExecutor(
+    "io",
+    lambda: ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io"),
+    max_pending=IO_MAX_PENDING,
+)
+
+
+def executor_stats():
+    return {
+        "backend": INFERENCE_BACKEND,
+        "inference": inference_executor.stats(),
+        "io": io_executor.stats(),
+    }
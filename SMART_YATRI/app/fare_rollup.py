@@ -0,0 +1,135 @@
+"""
+Incremental maintenance and reads of the fare_daily_rollup table.
+
+Each booking write executes one of these statements in its own transaction:
+  add_booking     - upsert the booking's (train, class, day, route) row,
+                    adding its fare to sum/count and widening min/max
+  add_bookings    - the same for a bulk insert, one row per group
+  remove_bookings - subtract cancelled bookings' fares; min/max are
+                    recomputed for a group only when a cancelled fare was
+                    one of its bounds
+Trend reads then aggregate at most one row per day and route, however
+many bookings those days hold.
+"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models import Booking, BookingStatus, FareDailyRollup
+
+GROUP_COLUMNS = ("train_id", "class_name", "booking_date", "origin", "destination")
+
+
+def _group_key(booking):
+    return {name: getattr(booking, name) for name in GROUP_COLUMNS}
+
+
+def _upsert():
+    row = FareDailyRollup.__table__
+    stmt = insert(row)
+    return stmt.on_conflict_do_update(
+        index_elements=list(GROUP_COLUMNS),
+        set_={
+            "fare_sum": row.c.fare_sum + stmt.excluded.fare_sum,
+            "fare_count": row.c.fare_count + stmt.excluded.fare_count,
+            "fare_min": func.least(row.c.fare_min, stmt.excluded.fare_min),
+            "fare_max": func.greatest(row.c.fare_max, stmt.excluded.fare_max),
+        },
+    )
+
+
+def add_booking(booking):
+    """Upsert statement that adds a new booking's fare to its rollup row."""
+    return _upsert().values(
+        **_group_key(booking), fare_sum=booking.fare, fare_count=1, fare_min=booking.fare, fare_max=booking.fare
+    )
+
+
+def add_bookings(bookings):
+    """
+    (statement, parameters) adding a batch of new bookings (dicts) to the
+    rollup: one pre-aggregated row per group, for a single executemany.
+    """
+    groups = {}
+    for booking in bookings:
+        key = tuple(booking[name] for name in GROUP_COLUMNS)
+        fare = booking["fare"]
+        group = groups.get(key)
+        if group is None:
+            groups[key] = {"fare_sum": fare, "fare_count": 1, "fare_min": fare, "fare_max": fare}
+        else:
+            group["fare_sum"] += fare
+            group["fare_count"] += 1
+            group["fare_min"] = min(group["fare_min"], fare)
+            group["fare_max"] = max(group["fare_max"], fare)
+    # Sorted so concurrent batches take the row locks in the same order
+    params = [{**dict(zip(GROUP_COLUMNS, key)), **group} for key, group in sorted(groups.items())]
+    return _upsert(), params
+
+
+def remove_bookings(bookings):
+    """
+    (statement, parameters) taking cancelled bookings (rows with the group
+    columns and fare) out of the rollup: one executemany row per group. Run
+    it after the status update, in the same transaction, so the min/max
+    recompute no longer sees the cancelled fares.
+    """
+    groups = {}
+    for booking in bookings:
+        key = tuple(getattr(booking, name) for name in GROUP_COLUMNS)
+        group = groups.setdefault(key, {"fare_sum": 0.0, "fare_count": 0, "fare_min": booking.fare, "fare_max": booking.fare})
+        group["fare_sum"] += booking.fare
+        group["fare_count"] += 1
+        group["fare_min"] = min(group["fare_min"], booking.fare)
+        group["fare_max"] = max(group["fare_max"], booking.fare)
+    params = [
+        {**{f"g_{name}": value for name, value in zip(GROUP_COLUMNS, key)}, **{f"r_{k}": v for k, v in group.items()}}
+        for key, group in sorted(groups.items())
+    ]
+
+    row = FareDailyRollup.__table__
+    live = [getattr(Booking, name) == bindparam(f"g_{name}") for name in GROUP_COLUMNS]
+    live.append(Booking.status != BookingStatus.CANCELLED)
+    live_min = select(func.min(Booking.fare)).where(*live).scalar_subquery()
+    live_max = select(func.max(Booking.fare)).where(*live).scalar_subquery()
+    stmt = (
+        update(row)
+        .where(*(row.c[name] == bindparam(f"g_{name}") for name in GROUP_COLUMNS))
+        .values(
+            fare_sum=row.c.fare_sum - bindparam("r_fare_sum"),
+            fare_count=row.c.fare_count - bindparam("r_fare_count"),
+            # A bound only moves if a cancelled fare was sitting on it
+            fare_min=case((row.c.fare_min >= bindparam("r_fare_min"), live_min), else_=row.c.fare_min),
+            fare_max=case((row.c.fare_max <= bindparam("r_fare_max"), live_max), else_=row.c.fare_max),
+        )
+    )
+    return stmt, params
+
+
+def daily_trend(train_id, class_name, days=30, origin=None, destination=None, end_date=None):
+    """Per-day average, min and max fare for a train class over the last `days` days."""
+    end_date = end_date or date.today()
+    start_date = end_date - timedelta(days=days - 1)
+    fare_count = func.sum(FareDailyRollup.fare_count)
+    query = (
+        select(
+            FareDailyRollup.booking_date.label("date"),
+            (func.sum(FareDailyRollup.fare_sum) / func.nullif(fare_count, 0)).label("avg_fare"),
+            func.min(FareDailyRollup.fare_min).label("min_fare"),
+            func.max(FareDailyRollup.fare_max).label("max_fare"),
+            fare_count.label("bookings"),
+        )
+        .where(FareDailyRollup.train_id == train_id)
+        .where(FareDailyRollup.class_name == class_name)
+        .where(FareDailyRollup.booking_date.between(start_date, end_date))
+        .where(FareDailyRollup.fare_count > 0)
+        .group_by(FareDailyRollup.booking_date)
+        .order_by(FareDailyRollup.booking_date)
+    )
+    if origin:
+        query = query.where(FareDailyRollup.origin == origin)
+    if destination:
+        query = query.where(FareDailyRollup.destination == destination)
+    return query
@@ -0,0 +1,175 @@
+"""
+Shared inference helpers for the seat, seats-left and fare models.
+
+The pipelines saved by train_all_models.py select engineered columns
+(lead_time_days, travel_dow, est_distance_km, ...) rather than the raw
+request fields, so every serving path builds its features here and runs the
+three models over all rows in one call. When a compiled copy of the
+forests is available (see app/compiled_forest.py) predictions skip
+sklearn and pandas entirely, and rows inside the precomputed grid (see
+app/prediction_table.py) skip the models altogether.
+
+Artifacts come in two layouts: one shared preprocessor plus three bare
+estimators (current train_all_models.py), or three full pipelines that
+each carry their own encoder (older artifacts). The shared layout is
+transformed once per batch and the sparse matrix is fed to all models.
+"""
+
+import hashlib
+import os
+from collections import namedtuple
+from datetime import date
+
+import pandas as pd
+from pydantic import ValidationError
+
+CATEGORICAL_COLS = ["train_id", "origin", "destination", "class"]
+NUMERIC_COLS = ["lead_time_days", "travel_dow", "seats_requested", "est_distance_km"]
+FEATURE_COLS = CATEGORICAL_COLS + NUMERIC_COLS
+
+PREPROCESSOR_FILE = "preprocessor.joblib"
+SEAT_MODEL_FILE = "seat_model.joblib"
+SEATLEFT_MODEL_FILE = "seatleft_model.joblib"
+FARE_MODEL_FILE = "fare_model.joblib"
+COMPILED_MODELS_FILE = "compiled_models.joblib"
+
+MAX_BATCH_SIZE = 1000
+
+ARTIFACT_FILES = [PREPROCESSOR_FILE, SEAT_MODEL_FILE, SEATLEFT_MODEL_FILE, FARE_MODEL_FILE, COMPILED_MODELS_FILE]
+
+# preprocessor is None when the estimators are self-contained pipelines;
+# version identifies the artifacts the set was loaded from;
+# compiled is the array-backed evaluator from app.compiled_forest, if built;
+# table is the precomputed PredictionTable from app.prediction_table, if built
+ModelSet = namedtuple(
+    "ModelSet", ["preprocessor", "seat", "seatleft", "fare", "version", "compiled", "table"],
+    defaults=[None, None, None],
+)
+
+
+def artifact_fingerprint(artifact_dir):
+    """
+    Short hash of the artifact files' names, sizes and mtimes; changes whenever a model is rewritten.
+    """
+    digest = hashlib.sha1()
+    for name in ARTIFACT_FILES:
+        path = os.path.join(artifact_dir, name)
+        if os.path.exists(path):
+            st = os.stat(path)
+            digest.update(f"{name}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+def est_distance(origin, destination):
+    """Same pseudo-distance as train_all_models.add_engineered_features."""
+    if pd.isna(origin) or pd.isna(destination):
+        return 100
+    return abs(sum(map(ord, str(origin))) - sum(map(ord, str(destination)))) % 1200 + 50
+
+
+def build_feature_rows(records):
+    """
+    Turn request dicts (keyed by alias, i.e. "class") into model feature tuples
+    in FEATURE_COLS order. Plain Python, so single rows never touch pandas.
+    """
+    rows = []
+    for rec in records:
+        travel = date.fromisoformat(rec["travel_date"])
+        booking = date.fromisoformat(rec["booking_date"])
+        rows.append((
+            rec["train_id"],
+            rec["origin"],
+            rec["destination"],
+            rec["class"],
+            (travel - booking).days,
+            travel.weekday(),
+            int(rec["seats_requested"]),
+            est_distance(rec["origin"], rec["destination"]),
+        ))
+    return rows
+
+
+def format_predictions(seat_available, seats_left, fares):
+    return [
+        {
+            "seat_available": int(s),
+            "seats_left": int(l),
+            "predicted_fare": round(float(f), 2),
+        }
+        for s, l, f in zip(seat_available, seats_left, fares)
+    ]
+
+
+def predict_frame(df, models):
+    """
+    Run each sklearn model once over every row of the feature frame; results keep row order.
+    """
+    X = models.preprocessor.transform(df) if models.preprocessor is not None else df
+    return format_predictions(models.seat.predict(X), models.seatleft.predict(X), models.fare.predict(X))
+
+
+def predict_rows(rows, models):
+    """
+    Predict feature tuples with the compiled forests when available, else through sklearn.
+    """
+    if models.compiled is not None:
+        return models.compiled.predict_rows(rows)
+    return predict_frame(pd.DataFrame(rows, columns=FEATURE_COLS), models)
+
+
+def predict_records(records, models, cache=None):
+    """
+    Predict for request dicts, answering rows inside the precomputed grid from
+    the lookup table and repeated rows outside it from cache. Only the rows
+    that miss both are sent to the models, still as one batch.
+    """
+    rows = build_feature_rows(records)
+    if models.table is not None:
+        results = [models.table.lookup(row) for row in rows]
+    else:
+        results = [None] * len(rows)
+    missing = [i for i, result in enumerate(results) if result is None]
+    if not missing:
+        return results
+
+    # models is one immutable snapshot, so this is the version every prediction below comes from
+    version = models.version
+    if cache is not None:
+        cache.bind_version(version)
+        for i in missing:
+            results[i] = cache.get(rows[i], version)
+        missing = [i for i in missing if results[i] is None]
+    if missing:
+        for i, pred in zip(missing, predict_rows([rows[i] for i in missing], models)):
+            if cache is not None:
+                cache.put(rows[i], pred, version)
+            results[i] = pred
+    return results
+
+
+def predict_batch_items(items, request_model, models, cache=None):
+    """
+    Validate raw batch items one by one and predict the valid ones in a single pass.
+    Invalid items get their validation errors in their slot instead of failing the batch.
+    """
+    results = [None] * len(items)
+    valid, positions = [], []
+
+    for i, item in enumerate(items):
+        try:
+            req = request_model.model_validate(item)
+        except ValidationError as exc:
+            results[i] = {
+                "index": i,
+                "status": "invalid",
+                "errors": [{"loc": list(e["loc"]), "msg": e["msg"], "type": e["type"]} for e in exc.errors()],
+            }
+            continue
+        valid.append(req.model_dump(by_alias=True))
+        positions.append(i)
+
+    if valid:
+        for i, pred in zip(positions, predict_records(valid, models, cache)):
+            results[i] = {"index": i, "status": "ok", **pred}
+
+    return results
@@ -5,13 +5,17 @@ Project: Smart Yatri
 Description: Main API routes for train bookings, cancellations, and seat/fare predictions.
 """
 
-from fastapi import FastAPI, HTTPException, Depends
-from sqlalchemy.orm import Session
-from datetime import date, datetime
+import asyncio
+
+from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
 from typing import List
 
-from app import models, schemas
-from app.database import engine, Base, get_db
+from app import crud, fare_rollup, models, schemas
+from app.database import engine, Base, get_async_db, get_read_db, pool_stats, read_router
+from app.streaming import MAX_PAGE_SIZE
 
 # ----------------------
 # Initialize database tables
@@ -27,12 +31,20 @@ app = FastAPI(
     version="1.0.0"
 )
 
+
+@app.on_event("startup")
+async def start_replica_health_checks():
+    if read_router.replicas:
+        app.state.replica_health = asyncio.create_task(read_router.run_health_checks())
+
 # ----------------------
 # Routes
 # ----------------------
+# Handlers await the asyncpg engine, so a slow query or a busy pool holds a
+# coroutine rather than one of the threadpool's workers.
 
 @app.post("/bookings/", response_model=schemas.BookingResponse)
-def create_booking(booking: schemas.BookingCreate, db: Session = Depends(get_db)):
+async def create_booking(booking: schemas.BookingCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create a new train booking
     """
@@ -46,54 +58,57 @@ def create_booking(booking: schemas.BookingCreate, db: Session = Depends(get_db)
         class_name=booking.class_name,
         seats_booked=booking.seats_booked,
         fare=booking.fare,
-        status="confirmed"
+        status=models.BookingStatus.CONFIRMED
     )
     db.add(db_booking)
-    db.commit()
-    db.refresh(db_booking)
+    await db.execute(fare_rollup.add_booking(db_booking))
+    await db.commit()
+    read_router.note_write(db_booking.user_id)
+    await db.refresh(db_booking)
     return db_booking
 
 
-@app.get("/bookings/", response_model=List[schemas.BookingResponse])
-def get_all_bookings(db: Session = Depends(get_db)):
+@app.get("/bookings/")
+async def get_all_bookings(
+    cursor: int | None = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
-    Fetch all bookings
+    Fetch bookings a page at a time, in id order
     """
-    bookings = db.query(models.Booking).all()
-    return bookings
+    rows = (await db.execute(crud.bookings_after(cursor, limit))).all()
+    records, next_cursor = crud.keyset_page(rows, limit, lambda row: row.id)
+    return ORJSONResponse({"records": records, "next_cursor": next_cursor})
 
 
 @app.get("/bookings/{booking_id}", response_model=schemas.BookingResponse)
-def get_booking(booking_id: int, db: Session = Depends(get_db)):
+async def get_booking(booking_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Fetch a single booking by ID
     """
-    booking = db.query(models.Booking).filter(models.Booking.id == booking_id).first()
+    booking = await db.get(models.Booking, booking_id)
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     return booking
 
 
 @app.post("/bookings/{booking_id}/cancel", response_model=schemas.CancelResponse)
-def cancel_booking(booking_id: int, db: Session = Depends(get_db)):
+async def cancel_booking(booking_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Cancel a booking by ID
     """
-    booking = db.query(models.Booking).filter(models.Booking.id == booking_id).first()
-    if not booking:
+    rows = await crud.cancel_bookings(db, [booking_id])
+    if rows:
+        return schemas.CancelResponse(id=rows[0].id, status=rows[0].status, cancellation_time=rows[0].cancellation_time)
+    # Nothing changed: tell a missing booking apart from one already cancelled
+    if await db.get(models.Booking, booking_id) is None:
         raise HTTPException(status_code=404, detail="Booking not found")
-    if booking.status == "canceled":
-        raise HTTPException(status_code=400, detail="Booking already canceled")
-
-    booking.status = "canceled"
-    booking.cancellation_time = datetime.utcnow()
-    db.commit()
-    db.refresh(booking)
-    return booking
+    raise HTTPException(status_code=400, detail="Booking already cancelled")
 
 
 @app.get("/seat-availability/", response_model=List[schemas.SeatAvailabilityResponse])
-def check_seat_availability(train_id: str, class_name: str, travel_date: date, db: Session = Depends(get_db)):
+async def check_seat_availability(train_id: str, class_name: str, travel_date: date):
     """
     Check seat availability probability for a train class on a given date
     """
@@ -110,20 +125,24 @@ def check_seat_availability(train_id: str, class_name: str, travel_date: date, d
 
 
 @app.get("/fare-trends/", response_model=schemas.FareTrendsResponse)
-def get_fare_trends(train_id: str, class_name: str, db: Session = Depends(get_db)):
+async def get_fare_trends(
+    train_id: str,
+    class_name: str,
+    days: int = Query(30, gt=0),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
-    Get past and predicted fare trends for a train class
+    Get past fare trends for a train class from the daily fare rollup
     """
-    # Example data (replace with ML or DB logic)
-    booked_trends = [
-        schemas.FareTrendPoint(date=date.today(), avg_fare=100.0),
-        schemas.FareTrendPoint(date=date.today(), avg_fare=105.0),
-    ]
-    predicted_trends = [
-        schemas.FareTrendPoint(date=date.today(), avg_fare=110.0),
-        schemas.FareTrendPoint(date=date.today(), avg_fare=115.0),
-    ]
-    return schemas.FareTrendsResponse(
-        booked_trends=booked_trends,
-        predicted_trends=predicted_trends
-    )
+    rows = (await db.execute(fare_rollup.daily_trend(train_id, class_name, days))).all()
+    booked_trends = [schemas.FareTrendPoint(date=r.date, avg_fare=float(r.avg_fare)) for r in rows]
+    # Predicted trends stay empty until the fare model is wired in here
+    return schemas.FareTrendsResponse(booked_trends=booked_trends)
+
+
+@app.get("/metrics/db-pool")
+async def db_pool_metrics():
+    """
+    Connection pool occupancy and checkout-wait histograms
+    """
+    return pool_stats()
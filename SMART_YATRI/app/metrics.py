@@ -0,0 +1,40 @@
+"""
+Small in-process metrics helpers shared by the batching and executor layers.
+"""
+
+import threading
+from bisect import bisect_left
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+QUEUE_WAIT_MS_BUCKETS = [0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250]
+POOL_WAIT_MS_BUCKETS = [0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000, 30000]
+
+
+class Histogram:
+    """Cumulative-style bucket counts (Prometheus `le` semantics) plus count and sum."""
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, n in zip(self.buckets + ["+Inf"], self.counts):
+                running += n
+                cumulative[str(bound)] = running
+            return {
+                "count": self.count,
+                "sum": round(self.sum, 4),
+                "mean": round(self.sum / self.count, 4) if self.count else 0.0,
+                "buckets": cumulative,
+            }
@@ -1,9 +1,96 @@
+"""
+Model retraining for the admin endpoints.
+
+Training a version takes minutes, so it never runs inside a request.
+retrain_jobs.submit() queues the CSV on a single background thread (one
+training at a time) and returns a job id straight away; the admin polls
+the job until it reports the published version. When a job finishes the
+new models are swapped into this process with registry.reload(); other
+workers follow the CURRENT pointer on their next reload check.
+
+Jobs are tracked in memory by the process that accepted them, and the
+last RETRAIN_JOBS_KEEP are kept for status queries.
+"""
+
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app.model_registry import registry
+from train_all_models import train_version
+
 DEFAULT_CSV = "data/default_dataset.csv"
 UPLOADS_DIR = "uploads"
-UPLOAD_FILE_NAME = "latest.csv"
+RETRAIN_JOBS_KEEP = int(os.getenv("RETRAIN_JOBS_KEEP", "50"))
 
 def train_from_csv(csv_path: str):
-    return {"csv_used": csv_path, "status": "model trained"}
+    version = train_version(csv_path)
+    # Swap the new models in for this process; other workers follow the CURRENT pointer
+    registry.reload()
+    return {"csv_used": csv_path, "status": "model trained", "version": version}
+
+
+# ---------- Background retrain jobs ---------- #
+class RetrainJobs:
+    def __init__(self, keep=RETRAIN_JOBS_KEEP):
+        self.keep = keep
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrain")
+
+    def new_id(self):
+        return uuid.uuid4().hex[:12]
+
+    def submit(self, csv_path, job_id=None):
+        """Queue a training run on `csv_path`; returns the job's status dict."""
+        job_id = job_id or self.new_id()
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "csv_used": csv_path,
+            "version": None,
+            "error": None,
+            "submitted_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.keep:
+                self._jobs.popitem(last=False)
+            queued = dict(job)
+        self._executor.submit(self._run, job)
+        return queued
+
+    def _run(self, job):
+        self._update(job, status="running", started_at=datetime.utcnow().isoformat())
+        try:
+            result = train_from_csv(job["csv_used"])
+        except Exception as exc:
+            print(f"❌ Retrain job {job['job_id']} failed: {exc}")
+            self._update(job, status="failed", error=str(exc), finished_at=datetime.utcnow().isoformat())
+            return
+        self._update(job, status="succeeded", version=result["version"], finished_at=datetime.utcnow().isoformat())
+        print(f"✅ Retrain job {job['job_id']} published {result['version']}")
+
+    def _update(self, job, **fields):
+        with self._lock:
+            job.update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self):
+        with self._lock:
+            return [dict(job) for job in reversed(self._jobs.values())]
+
+
+retrain_jobs = RetrainJobs()
 
 def predict_from_input(train_id, class_name, month, days_to_departure, demand_index):
     return 0.7  # Dummy fixed probability
@@ -0,0 +1,248 @@
+"""
+Process-wide registry for the trained model artifacts.
+
+Every router asks the registry for models instead of calling joblib.load
+at import, so a worker holds exactly one copy of each artifact and only
+pays the load cost on the first prediction. With MODEL_MMAP_MODE=r the
+forests' node arrays are memory-mapped from disk, so workers on the same
+box share those pages through the OS page cache (requires uncompressed
+joblib dumps, which is what train_all_models.py writes).
+
+Training writes each run into its own directory under the artifact root
+(ml/model_artifacts/<version>/) and then atomically rewrites the CURRENT
+pointer file. The registry serves an immutable snapshot of one version;
+when the pointer moves, the new version is loaded off to the side and
+swapped in with a single attribute assignment, so requests never take a
+lock and in-flight requests finish on the snapshot they started with.
+A root without CURRENT is treated as a flat, unversioned artifact dir.
+
+The sklearn preprocessor and forests are only a fallback: a version with
+a compiled copy (app/compiled_forest.py) answers every request without
+them. They are therefore wrapped in LazyArtifact and read from disk the
+first time a prediction actually needs sklearn, i.e. when the compiled
+file is missing. A normal version load reads just the compiled arrays
+and the prediction table.
+"""
+
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import joblib
+
+from app.compiled_forest import CompiledModels
+from app.prediction_table import PredictionTable
+from app.inference import (
+    ARTIFACT_FILES, PREPROCESSOR_FILE, SEAT_MODEL_FILE, SEATLEFT_MODEL_FILE, FARE_MODEL_FILE, COMPILED_MODELS_FILE,
+    ModelSet, artifact_fingerprint,
+)
+
+ARTIFACT_DIR = os.getenv("MODEL_ARTIFACT_DIR", "ml/model_artifacts")
+MODEL_MMAP_MODE = os.getenv("MODEL_MMAP_MODE") or None
+MODEL_RELOAD_CHECK_SECONDS = float(os.getenv("MODEL_RELOAD_CHECK_SECONDS", "5"))
+MODEL_KEEP_VERSIONS = int(os.getenv("MODEL_KEEP_VERSIONS", "3"))
+
+CURRENT_POINTER = "CURRENT"
+
+# pointer is the CURRENT value the snapshot was loaded for (None for a flat dir)
+LoadedVersion = namedtuple("LoadedVersion", ["pointer", "path", "models", "loaded_at", "artifact_bytes"])
+
+
+# ---------- Versioned artifact layout ---------- #
+def current_version(root=ARTIFACT_DIR):
+    """Version named by the CURRENT pointer, or None for a flat artifact dir."""
+    try:
+        with open(os.path.join(root, CURRENT_POINTER)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def list_versions(root=ARTIFACT_DIR):
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if name.startswith("v") and os.path.isdir(os.path.join(root, name))
+    )
+
+
+def new_version_dir(root=ARTIFACT_DIR):
+    """Create an empty directory for a training run and return (version, path)."""
+    version = datetime.utcnow().strftime("v%Y%m%d-%H%M%S-%f")
+    path = os.path.join(root, version)
+    os.makedirs(path)
+    return version, path
+
+
+def publish_version(version, root=ARTIFACT_DIR, keep=MODEL_KEEP_VERSIONS):
+    """
+    Atomically point CURRENT at `version`, then prune old versions beyond `keep`.
+    """
+    pointer = os.path.join(root, CURRENT_POINTER)
+    tmp = f"{pointer}.tmp"
+    with open(tmp, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, pointer)
+
+    for old in list_versions(root)[:-keep]:
+        if old != version:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+
+
+def artifact_sizes(path):
+    return {
+        name: os.path.getsize(os.path.join(path, name))
+        for name in ARTIFACT_FILES
+        if os.path.exists(os.path.join(path, name))
+    }
+
+
+# ---------- Lazy sklearn artifacts ---------- #
+class LazyArtifact:
+    """
+    A joblib artifact that is loaded on first use. Attribute access (predict,
+    transform, ...) is forwarded to the loaded object.
+    """
+
+    def __init__(self, path, mmap_mode=None):
+        self.path = path
+        self.mmap_mode = mmap_mode
+        self._obj = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._obj is not None
+
+    def get(self):
+        obj = self._obj
+        if obj is None:
+            with self._lock:
+                if self._obj is None:
+                    self._obj = joblib.load(self.path, mmap_mode=self.mmap_mode)
+                    print(f"⚠️ Loaded sklearn fallback {os.path.basename(self.path)}")
+                obj = self._obj
+        return obj
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+def sklearn_artifacts(models):
+    return [a for a in (models.preprocessor, models.seat, models.seatleft, models.fare) if isinstance(a, LazyArtifact)]
+
+
+# ---------- Registry ---------- #
+class ModelRegistry:
+    """
+    Serves one immutable LoadedVersion and hot-swaps it when CURRENT moves.
+    """
+
+    def __init__(self, artifact_dir=ARTIFACT_DIR, mmap_mode=MODEL_MMAP_MODE,
+                 check_interval=MODEL_RELOAD_CHECK_SECONDS):
+        self.artifact_dir = artifact_dir
+        self.mmap_mode = mmap_mode
+        self.check_interval = check_interval
+        self._active = None
+        self._load_lock = threading.Lock()
+        self._next_check = 0.0
+        self._reloading = False
+
+    def _load(self, pointer):
+        path = os.path.join(self.artifact_dir, pointer) if pointer else self.artifact_dir
+
+        def load(name):
+            return joblib.load(os.path.join(path, name), mmap_mode=self.mmap_mode)
+
+        def lazy(name):
+            return LazyArtifact(os.path.join(path, name), self.mmap_mode)
+
+        compiled = None
+        if os.path.exists(os.path.join(path, COMPILED_MODELS_FILE)):
+            compiled = CompiledModels(load(COMPILED_MODELS_FILE))
+        models = ModelSet(
+            preprocessor=lazy(PREPROCESSOR_FILE) if os.path.exists(os.path.join(path, PREPROCESSOR_FILE)) else None,
+            seat=lazy(SEAT_MODEL_FILE),
+            seatleft=lazy(SEATLEFT_MODEL_FILE),
+            fare=lazy(FARE_MODEL_FILE),
+            version=pointer or artifact_fingerprint(path),
+            compiled=compiled,
+            table=PredictionTable(path) if PredictionTable.exists(path) else None,
+        )
+        return LoadedVersion(
+            pointer=pointer,
+            path=path,
+            models=models,
+            loaded_at=datetime.utcnow(),
+            artifact_bytes=artifact_sizes(path),
+        )
+
+    def reload(self):
+        """
+        Load whatever CURRENT points at and swap it in. Readers keep using the
+        previous snapshot until the assignment below.
+        """
+        with self._load_lock:
+            pointer = current_version(self.artifact_dir)
+            active = self._active
+            if active is None or active.pointer != pointer or pointer is None:
+                self._active = self._load(pointer)
+            self._next_check = time.monotonic() + self.check_interval
+        return self._active
+
+    def _reload_in_background(self):
+        try:
+            self.reload()
+        finally:
+            self._reloading = False
+
+    def models(self):
+        """The ModelSet for this request. Lock-free once the first version is loaded."""
+        active = self._active
+        if active is None:
+            return self.reload().models
+
+        if time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.check_interval
+            if current_version(self.artifact_dir) != active.pointer and not self._reloading:
+                # Another worker (or training run) published a new version
+                self._reloading = True
+                threading.Thread(target=self._reload_in_background, daemon=True).start()
+        return active.models
+
+    def warm(self):
+        """
+        Load everything the serving path will use up front, e.g. before forking
+        or accepting traffic. sklearn is included only when there is no
+        compiled copy to serve from.
+        """
+        models = self.models()
+        if models.compiled is None:
+            for artifact in sklearn_artifacts(models):
+                artifact.get()
+        return models
+
+    def info(self):
+        active = self._active
+        return {
+            "artifact_root": self.artifact_dir,
+            "current_pointer": current_version(self.artifact_dir),
+            "active_version": active.models.version if active else None,
+            "loaded_at": active.loaded_at.isoformat() if active else None,
+            "artifact_bytes": active.artifact_bytes if active else {},
+            "total_bytes": sum(active.artifact_bytes.values()) if active else 0,
+            "mmap_mode": self.mmap_mode,
+            "compiled": active.models.compiled is not None if active else False,
+            "sklearn_loaded": any(a.loaded for a in sklearn_artifacts(active.models)) if active else False,
+            "prediction_table": active.models.table.stats() if active and active.models.table is not None else None,
+            "available_versions": list_versions(self.artifact_dir),
+        }
+
+
+registry = ModelRegistry()
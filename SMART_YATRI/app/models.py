@@ -5,12 +5,29 @@ Project: Smart Yatri
 Description: SQLAlchemy models for bookings
 """
 
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime
+import enum
+
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Enum, Index, Numeric
 from sqlalchemy.sql import func
 from app.database import Base
 
+
+class BookingStatus(str, enum.Enum):
+    CONFIRMED = "CONFIRMED"
+    CANCELLED = "CANCELLED"
+
+
 class Booking(Base):
     __tablename__ = "bookings"
+    # One index per hot query: a user's history ordered by travel date, the
+    # user's fare trends over a booking_date range, a train run's bookings,
+    # and the newest-first admin summary.
+    __table_args__ = (
+        Index("ix_bookings_user_travel_date", "user_id", "travel_date"),
+        Index("ix_bookings_user_booking_date", "user_id", "booking_date"),
+        Index("ix_bookings_train_run", "train_id", "travel_date", "class_name"),
+        Index("ix_bookings_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
@@ -22,5 +39,31 @@ class Booking(Base):
     class_name = Column(String, nullable=False)
     seats_booked = Column(Integer, nullable=False)
     fare = Column(Float, nullable=False)
-    status = Column(String, nullable=False, default="CONFIRMED")
+    # Stored as VARCHAR; the Enum type rejects any other spelling on write
+    status = Column(
+        Enum(BookingStatus, native_enum=False, length=16, validate_strings=True),
+        nullable=False,
+        default=BookingStatus.CONFIRMED,
+    )
     cancellation_time = Column(DateTime, nullable=True, default=None)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class FareDailyRollup(Base):
+    """
+    Fares of live (not cancelled) bookings per booking day and route,
+    kept up to date by app/fare_rollup.py in the same transaction as the
+    booking write. Fare trends read this table instead of grouping bookings.
+    """
+    __tablename__ = "fare_daily_rollup"
+
+    # Primary key order puts (train_id, class_name) first so a trend query is one range scan
+    train_id = Column(String, primary_key=True)
+    class_name = Column(String, primary_key=True)
+    booking_date = Column(Date, primary_key=True)
+    origin = Column(String, primary_key=True)
+    destination = Column(String, primary_key=True)
+    fare_sum = Column(Numeric(14, 2), nullable=False, default=0)
+    fare_count = Column(Integer, nullable=False, default=0)
+    fare_min = Column(Float, nullable=True)
+    fare_max = Column(Float, nullable=True)
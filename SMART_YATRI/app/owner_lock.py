@@ -0,0 +1,46 @@
+"""
+Single-process ownership of in-memory booking state.
+
+The booking store's id counter and index, and the seat inventory's
+counts, live in the memory of the process that opened them. A second
+uvicorn worker would keep its own copy, issue duplicate ids and oversell
+seats. Each of them therefore takes an exclusive, non-blocking lock on
+"<file>.lock" when it opens. The lock is held for the life of the
+process, so a second process fails at startup instead of diverging.
+
+Run the booking service with a single worker (uvicorn --workers 1); scale
+prediction with INFERENCE_BACKEND=process instead.
+"""
+
+import os
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class OwnerLockError(RuntimeError):
+    """Raised when another process already owns the state behind a lock file."""
+
+
+def acquire_owner_lock(path):
+    """Lock "<path>.lock" for this process; returns the fd, which must stay open."""
+    lock_path = Path(f"{path}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        os.close(fd)
+        raise OwnerLockError(
+            f"{path} is already owned by another process; run the booking service with --workers 1"
+        )
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    return fd
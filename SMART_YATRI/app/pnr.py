@@ -0,0 +1,50 @@
+"""
+PNR codes for bookings.
+
+A PNR is the booking_id pushed through a keyed permutation of the 40-bit
+integers and written as 8 Crockford base32 characters plus a check
+character, e.g. "K3W9T0QH7". Consecutive bookings get unrelated-looking
+PNRs. Each PNR decodes straight back to its booking_id, so a lookup is
+decode + the store's hash index, with no PNR table to keep in sync.
+The check character rejects most typos before they reach the store.
+
+PNR_KEY must stay the same for the life of the data: changing it
+changes every PNR.
+"""
+
+import os
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"   # Crockford base32: no I, L, O, U
+DECODE = {ch: i for i, ch in enumerate(ALPHABET)}
+DECODE.update({"I": 1, "L": 1, "O": 0})
+
+BITS = 40
+MASK = (1 << BITS) - 1
+MULTIPLIER = 0x9E3779B97F & MASK | 1           # odd, so invertible mod 2**40
+INVERSE = pow(MULTIPLIER, -1, 1 << BITS)
+PNR_KEY = int(os.getenv("PNR_KEY", "0x5A17C3E9D2"), 0) & MASK
+PNR_LENGTH = BITS // 5 + 1
+
+
+def _check_char(payload):
+    return ALPHABET[sum((i + 1) * DECODE[ch] for i, ch in enumerate(payload)) % 32]
+
+
+def encode_pnr(booking_id):
+    value = ((booking_id * MULTIPLIER) & MASK) ^ PNR_KEY
+    payload = "".join(ALPHABET[(value >> shift) & 31] for shift in range(BITS - 5, -1, -5))
+    return payload + _check_char(payload)
+
+
+def decode_pnr(pnr):
+    """booking_id for a PNR, or None if it is malformed or fails its check character."""
+    pnr = pnr.strip().upper()
+    if len(pnr) != PNR_LENGTH or any(ch not in DECODE for ch in pnr):
+        return None
+    payload = "".join(ALPHABET[DECODE[ch]] for ch in pnr[:-1])
+    if ALPHABET[DECODE[pnr[-1]]] != _check_char(payload):
+        return None
+    value = 0
+    for ch in payload:
+        value = (value << 5) | DECODE[ch]
+    return ((value ^ PNR_KEY) * INVERSE) & MASK
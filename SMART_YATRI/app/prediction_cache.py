@@ -0,0 +1,106 @@
+"""
+Bounded in-process cache for model predictions.
+
+Entries are keyed on the engineered feature tuple the models actually
+see (train, route, class, lead time, weekday, seats, distance), so two
+requests that differ only in booking_date but share a lead time hit the
+same entry. The cache is bound to a model version and empties itself
+when a different version is served. Reads and writes carry the version
+their request predicts with, so a request that started on the old
+version during a swap neither reads the new version's entries nor
+writes its own results into the new version's cache.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "50000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "86400"))
+
+
+class PredictionCache:
+    """
+    LRU cache with a per-entry TTL and hit/miss counters. Thread-safe, since
+    the sync route handlers run on the threadpool.
+    """
+
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_writes = 0
+
+    def bind_version(self, version):
+        """Drop every entry if predictions now come from a different model version."""
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+                self.invalidations += 1
+
+    def get(self, key, version=None):
+        now = self._clock()
+        with self._lock:
+            if version is not None and version != self._version:
+                self.misses += 1
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version=None):
+        """Store a prediction; dropped if it was made with a version other than the bound one."""
+        expires_at = self._clock() + self.ttl
+        with self._lock:
+            if version is not None and version != self._version:
+                self.stale_writes += 1
+                return False
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_writes": self.stale_writes,
+            "model_version": self._version,
+        }
+
+
+# Shared by every router that serves predictions
+prediction_cache = PredictionCache()
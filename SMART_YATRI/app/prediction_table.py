@@ -0,0 +1,165 @@
+"""
+Precomputed prediction lookup table for the common feature grid.
+
+Every model feature is low-cardinality: the (train, origin, destination,
+class) combinations seen in training, lead time in days, travel weekday
+and a small seat count (est_distance_km follows from the route). The
+offline build evaluates all three models over
+
+    observed combos x lead 0..max_lead x weekday 0..6 x seats 1..max_seats
+
+and stores the answers as dense, memory-mapped .npy arrays in the model
+version directory. Serving answers a known key with one array lookup and
+falls back to live inference only for keys outside the grid.
+
+Fares are stored in paise (int32) and rebuilt by dividing by 100, which
+gives back exactly the value round(fare, 2) produces on the live path.
+
+Build for an existing version dir with:
+    python -m app.prediction_table <artifact_dir> <training_csv>
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from app.inference import CATEGORICAL_COLS, FEATURE_COLS, est_distance
+
+TABLE_DIR = "prediction_table"
+TABLE_META_FILE = "meta.json"
+PREDICTION_TABLE_MAX_LEAD = int(os.getenv("PREDICTION_TABLE_MAX_LEAD", "180"))
+PREDICTION_TABLE_MAX_SEATS = int(os.getenv("PREDICTION_TABLE_MAX_SEATS", "6"))
+BUILD_CHUNK_ROWS = 250_000
+N_WEEKDAYS = 7
+
+
+# ---------- Build ---------- #
+def grid_bounds(df):
+    """Lead-time and seat ranges to cover: what training saw, capped by the env limits."""
+    lead = (pd.to_datetime(df["travel_date"], errors="coerce") - pd.to_datetime(df["booking_date"], errors="coerce")).dt.days
+    seats = pd.to_numeric(df["seats_requested"], errors="coerce")
+    max_lead = int(min(max(lead.max(), 0), PREDICTION_TABLE_MAX_LEAD)) if lead.notna().any() else PREDICTION_TABLE_MAX_LEAD
+    max_seats = int(min(max(seats.max(), 1), PREDICTION_TABLE_MAX_SEATS)) if seats.notna().any() else 1
+    return max_lead, max_seats
+
+
+def build_prediction_table(df, models, artifact_dir):
+    """
+    Evaluate `models` (shared-preprocessor layout) over the grid spanned by
+    the combos in `df` and write the table under artifact_dir/TABLE_DIR.
+    """
+    if models.preprocessor is None:
+        raise ValueError("Prediction table needs the shared-preprocessor artifacts; retrain with train_all_models.py")
+
+    combos = sorted(set(df[CATEGORICAL_COLS].dropna().astype(str).itertuples(index=False, name=None)))
+    max_lead, max_seats = grid_bounds(df)
+    shape = (len(combos), max_lead + 1, N_WEEKDAYS, max_seats)
+    per_combo = shape[1] * shape[2] * shape[3]
+
+    out_dir = os.path.join(artifact_dir, TABLE_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    open_memmap = np.lib.format.open_memmap
+    seat = open_memmap(os.path.join(out_dir, "seat_available.npy"), mode="w+", dtype=np.int8, shape=shape)
+    seatleft = open_memmap(os.path.join(out_dir, "seats_left.npy"), mode="w+", dtype=np.int16, shape=shape)
+    fare = open_memmap(os.path.join(out_dir, "fare_paise.npy"), mode="w+", dtype=np.int32, shape=shape)
+
+    # One combo's grid, in C order of the (lead, weekday, seats) axes
+    lead, dow, seats = np.meshgrid(
+        np.arange(shape[1]), np.arange(shape[2]), np.arange(1, shape[3] + 1), indexing="ij"
+    )
+    grid = pd.DataFrame({
+        "lead_time_days": lead.ravel(),
+        "travel_dow": dow.ravel(),
+        "seats_requested": seats.ravel(),
+    })
+
+    step = max(1, BUILD_CHUNK_ROWS // per_combo)
+    for start in range(0, len(combos), step):
+        block = combos[start:start + step]
+        frame = pd.DataFrame(np.repeat(np.array(block, dtype=object), per_combo, axis=0), columns=CATEGORICAL_COLS)
+        frame = pd.concat([frame, pd.concat([grid] * len(block), ignore_index=True)], axis=1)
+        frame["est_distance_km"] = [est_distance(o, d) for o, d in zip(frame["origin"], frame["destination"])]
+
+        X = models.preprocessor.transform(frame[FEATURE_COLS])
+        block_shape = (len(block),) + shape[1:]
+        seat[start:start + len(block)] = models.seat.predict(X).astype(np.int8).reshape(block_shape)
+        # int() on the live path truncates toward zero; astype does the same
+        seatleft[start:start + len(block)] = models.seatleft.predict(X).astype(np.int16).reshape(block_shape)
+        paise = [int(round(round(float(f), 2) * 100)) for f in models.fare.predict(X)]
+        fare[start:start + len(block)] = np.asarray(paise, dtype=np.int32).reshape(block_shape)
+
+    for arr in (seat, seatleft, fare):
+        arr.flush()
+    with open(os.path.join(out_dir, TABLE_META_FILE), "w") as f:
+        json.dump({"combos": combos, "max_lead": max_lead, "max_seats": max_seats}, f)
+    return shape
+
+
+# ---------- Serve ---------- #
+class PredictionTable:
+    """Memory-mapped lookup over the precomputed grid."""
+
+    def __init__(self, artifact_dir):
+        path = os.path.join(artifact_dir, TABLE_DIR)
+        with open(os.path.join(path, TABLE_META_FILE)) as f:
+            meta = json.load(f)
+        self.index = {tuple(combo): i for i, combo in enumerate(meta["combos"])}
+        self.max_lead = meta["max_lead"]
+        self.max_seats = meta["max_seats"]
+        self.seat = np.load(os.path.join(path, "seat_available.npy"), mmap_mode="r")
+        self.seatleft = np.load(os.path.join(path, "seats_left.npy"), mmap_mode="r")
+        self.fare = np.load(os.path.join(path, "fare_paise.npy"), mmap_mode="r")
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def exists(artifact_dir):
+        return os.path.exists(os.path.join(artifact_dir, TABLE_DIR, TABLE_META_FILE))
+
+    def lookup(self, row):
+        """Prediction dict for a feature tuple, or None when it falls outside the grid."""
+        i = self.index.get(row[:4])
+        lead, dow, seats = row[4], row[5], row[6]
+        if i is None or not (0 <= lead <= self.max_lead and 1 <= seats <= self.max_seats):
+            self.misses += 1
+            return None
+        self.hits += 1
+        key = (i, lead, dow, seats - 1)
+        return {
+            "seat_available": int(self.seat[key]),
+            "seats_left": int(self.seatleft[key]),
+            "predicted_fare": int(self.fare[key]) / 100,
+        }
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "combos": len(self.index),
+            "max_lead": self.max_lead,
+            "max_seats": self.max_seats,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m app.prediction_table <artifact_dir> <training_csv>")
+    import joblib
+    from app.inference import (
+        ModelSet, PREPROCESSOR_FILE, SEAT_MODEL_FILE, SEATLEFT_MODEL_FILE, FARE_MODEL_FILE,
+    )
+
+    artifact_dir, csv_path = sys.argv[1], sys.argv[2]
+    models = ModelSet(
+        preprocessor=joblib.load(os.path.join(artifact_dir, PREPROCESSOR_FILE)),
+        seat=joblib.load(os.path.join(artifact_dir, SEAT_MODEL_FILE)),
+        seatleft=joblib.load(os.path.join(artifact_dir, SEATLEFT_MODEL_FILE)),
+        fare=joblib.load(os.path.join(artifact_dir, FARE_MODEL_FILE)),
+    )
+    shape = build_prediction_table(pd.read_csv(csv_path), models, artifact_dir)
+    print(f"✅ Prediction table {shape} written to {os.path.join(artifact_dir, TABLE_DIR)}")
@@ -1,26 +1,35 @@
 """
 Booking-related endpoints:
 - POST /bookings/               -> create a booking
+- POST /bookings/bulk           -> create many bookings in one transaction
 - GET  /bookings/{user_id}      -> user-specific booking history
 - GET  /bookings/summary        -> admin booking summary (all bookings)
 - PUT  /bookings/{booking_id}/cancel -> soft-cancel a booking (IRCTC-style)
+- POST /bookings/cancel         -> soft-cancel many bookings in one statement
 - GET  /fare-trends/{user_id}   -> fare trends (booked fares + predicted placeholder)
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
-from datetime import datetime, timedelta, date
-
-from app.database import get_db
-from app.models import Booking
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, insert, select
+from pydantic import ValidationError
+from typing import Any, Dict, List, Optional
+import os
+from datetime import timedelta, date
+
+from app import crud, fare_rollup
+from app.database import get_async_db, get_read_db, read_router
+from app.models import Booking, BookingStatus
+from app.streaming import MAX_PAGE_SIZE
 from app.schemas import BookingCreate, BookingResponse, CancelResponse, FareTrendsResponse, FareTrendPoint
 
 # Router prefixed with /bookings
 router = APIRouter(prefix="/bookings", tags=["Booking"])
 
+MAX_BULK_BOOKINGS = int(os.getenv("MAX_BULK_BOOKINGS", "5000"))
+
 @router.post("/", response_model=BookingResponse)
-def create_booking(payload: BookingCreate, db: Session = Depends(get_db)):
+async def create_booking(payload: BookingCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create and persist a booking.
     """
@@ -34,59 +43,119 @@ def create_booking(payload: BookingCreate, db: Session = Depends(get_db)):
         class_name=payload.class_name,
         seats_booked=payload.seats_booked,
         fare=payload.fare,
-        status="CONFIRMED"
+        status=BookingStatus.CONFIRMED
     )
     db.add(bk)
-    db.commit()
-    db.refresh(bk)
+    await db.execute(fare_rollup.add_booking(bk))
+    await db.commit()
+    read_router.note_write(bk.user_id)
+    await db.refresh(bk)
     return bk
 
-@router.get("/{user_id}", response_model=List[BookingResponse])
-def get_user_bookings(user_id: int, db: Session = Depends(get_db)):
+@router.post("/bulk")
+async def create_bookings_bulk(
+    payload: List[Dict[str, Any]] = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Create many bookings at once. Items are validated individually; invalid
+    ones are reported by index and the valid ones are inserted together with
+    a single multi-row INSERT ... RETURNING id in one transaction.
+    """
+    if len(payload) > MAX_BULK_BOOKINGS:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds {MAX_BULK_BOOKINGS} items")
+
+    indexes, rows, failed = [], [], []
+    for index, item in enumerate(payload):
+        try:
+            booking = BookingCreate.model_validate(item)
+        except ValidationError as exc:
+            failed.append({"index": index, "errors": exc.errors(include_url=False, include_context=False)})
+            continue
+        indexes.append(index)
+        rows.append({**booking.model_dump(), "status": BookingStatus.CONFIRMED})
+
+    ids = []
+    if rows:
+        # insertmanyvalues batches the rows into a few multi-row statements and
+        # hands the ids back in parameter order
+        stmt = insert(Booking).returning(Booking.id, sort_by_parameter_order=True)
+        ids = (await db.execute(stmt, rows)).scalars().all()
+        rollup, params = fare_rollup.add_bookings(rows)
+        await db.execute(rollup, params)
+        await db.commit()
+        read_router.note_write(*{row["user_id"] for row in rows})
+
+    return {
+        "received": len(payload),
+        "inserted": len(ids),
+        "bookings": [{"index": index, "id": booking_id} for index, booking_id in zip(indexes, ids)],
+        "failed": failed,
+    }
+
+@router.get("/{user_id}")
+async def get_user_bookings(
+    user_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
-    Retrieve all bookings for given user (includes cancelled records).
+    Retrieve a user's bookings (includes cancelled records), newest travel date first,
+    a page at a time.
     """
-    bookings = db.query(Booking).filter(Booking.user_id == user_id).order_by(Booking.travel_date.desc()).all()
-    return bookings
+    try:
+        query = crud.user_bookings_before(user_id, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    rows = (await db.execute(query)).all()
+    records, next_cursor = crud.keyset_page(rows, limit, crud.travel_cursor)
+    return ORJSONResponse({"records": records, "next_cursor": next_cursor})
 
 @router.get("/summary", response_model=List[BookingResponse])
-def get_all_bookings_summary(limit: Optional[int] = Query(100, gt=0), db: Session = Depends(get_db)):
+async def get_all_bookings_summary(limit: Optional[int] = Query(100, gt=0), db: AsyncSession = Depends(get_read_db)):
     """
     Admin/Staff endpoint that returns booking summary (all users).
     Default limit is 100 records unless specified.
     """
-    bookings = db.query(Booking).order_by(Booking.created_at.desc()).limit(limit).all()
-    return bookings
+    result = await db.execute(select(Booking).order_by(Booking.created_at.desc()).limit(limit))
+    return result.scalars().all()
 
 @router.put("/{booking_id}/cancel", response_model=CancelResponse)
-def cancel_booking(booking_id: int, db: Session = Depends(get_db)):
+async def cancel_booking(booking_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Soft-cancel a booking. Sets status = CANCELLED and records cancellation_time.
     (No hard-delete to preserve history.)
     """
-    booking = db.query(Booking).filter(Booking.id == booking_id).first()
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
-
-    if booking.status == "CANCELLED":
-        return CancelResponse(id=booking.id, status=booking.status, cancellation_time=booking.cancellation_time)
-
-    # Implementing a simple cancellation timestamp and marking status
-    booking.status = "CANCELLED"
-    booking.cancellation_time = datetime.utcnow()
-    db.add(booking)
-    db.commit()
-    db.refresh(booking)
-
+    rows = await crud.cancel_bookings(db, [booking_id])
+    if rows:
+        booking = rows[0]
+    else:
+        # Already cancelled (return it unchanged) or missing
+        booking = await db.get(Booking, booking_id)
+        if not booking:
+            raise HTTPException(status_code=404, detail="Booking not found")
     return CancelResponse(id=booking.id, status=booking.status, cancellation_time=booking.cancellation_time)
 
+@router.post("/cancel", response_model=List[CancelResponse])
+async def cancel_bookings(booking_ids: List[int] = Body(..., embed=True), db: AsyncSession = Depends(get_async_db)):
+    """
+    Cancel many bookings with one UPDATE statement. Returns the bookings that
+    were cancelled by this call; ids that are missing or already cancelled
+    are left out.
+    """
+    if len(booking_ids) > MAX_BULK_BOOKINGS:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds {MAX_BULK_BOOKINGS} items")
+    rows = await crud.cancel_bookings(db, booking_ids) if booking_ids else []
+    return [CancelResponse(id=r.id, status=r.status, cancellation_time=r.cancellation_time) for r in rows]
+
 @router.get("/fare-trends/{user_id}", response_model=FareTrendsResponse)
-def fare_trends(
+async def fare_trends(
     user_id: int,
     origin: Optional[str] = Query(None),
     destination: Optional[str] = Query(None),
     days: int = Query(30, gt=0),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Produce fare trends for a given user:
@@ -96,18 +165,18 @@ def fare_trends(
     end_date = date.today()
     start_date = end_date - timedelta(days=days-1)
 
-    q = db.query(func.date(Booking.booking_date).label("date"), func.avg(Booking.fare).label("avg_fare"))\
-          .filter(Booking.user_id == user_id)\
-          .filter(Booking.booking_date >= start_date)\
-          .filter(Booking.booking_date <= end_date)
+    q = select(func.date(Booking.booking_date).label("date"), func.avg(Booking.fare).label("avg_fare"))\
+          .where(Booking.user_id == user_id)\
+          .where(Booking.booking_date >= start_date)\
+          .where(Booking.booking_date <= end_date)
 
     if origin:
-        q = q.filter(Booking.origin == origin)
+        q = q.where(Booking.origin == origin)
     if destination:
-        q = q.filter(Booking.destination == destination)
+        q = q.where(Booking.destination == destination)
 
     q = q.group_by(func.date(Booking.booking_date)).order_by(func.date(Booking.booking_date))
-    rows = q.all()
+    rows = (await db.execute(q)).all()
 
     booked_trends = [FareTrendPoint(date=r.date, avg_fare=float(r.avg_fare)) for r in rows]
 
@@ -1,17 +1,13 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Body, HTTPException
 from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
-import joblib
-import pandas as pd
-import os
+from typing import Any, Dict, List
 
-router = APIRouter(prefix="/predict", tags=["Prediction"])
-
-ARTIFACT_DIR = "ml/model_artifacts"
+from app.batching import prediction_coalescer
+from app.executors import inference_executor, predict_batch_in_worker
+from app.inference import MAX_BATCH_SIZE
 
-seat_model = joblib.load(os.path.join(ARTIFACT_DIR, "seat_model.joblib"))
-seatleft_model = joblib.load(os.path.join(ARTIFACT_DIR, "seatleft_model.joblib"))
-fare_model = joblib.load(os.path.join(ARTIFACT_DIR, "fare_model.joblib"))
+router = APIRouter(prefix="/predict", tags=["Prediction"])
 
 class PredictRequest(BaseModel):
     train_id: str
@@ -32,21 +28,12 @@ class PredictRequest(BaseModel):
         return value
 
 @router.post("/")
-def predict(request: PredictRequest):
-    df = pd.DataFrame([{
-        "train_id": request.train_id,
-        "origin": request.origin,
-        "destination": request.destination,
-        "travel_date": request.travel_date,
-        "booking_date": request.booking_date,
-        "class": request.class_name,
-        "seats_requested": request.seats_requested,
-    }])
-    seat_available = int(seat_model.predict(df)[0])
-    seats_left = int(seatleft_model.predict(df)[0])
-    predicted_fare = round(float(fare_model.predict(df)[0]), 2)
-    return {
-        "seat_available": seat_available,
-        "seats_left": seats_left,
-        "predicted_fare": predicted_fare
-    }
+async def predict(request: PredictRequest):
+    return await prediction_coalescer.submit(request.model_dump(by_alias=True))
+
+@router.post("/batch")
+async def predict_batch(payload: List[Dict[str, Any]] = Body(...)):
+    if len(payload) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds {MAX_BATCH_SIZE} items")
+    results = await inference_executor.run(predict_batch_in_worker, payload, PredictRequest)
+    return {"results": results}
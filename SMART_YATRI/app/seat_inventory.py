@@ -0,0 +1,192 @@
+"""
+Authoritative seat inventory for booking.
+
+data/live_seats.csv holds seats_left per (train_id, travel_date, class).
+On open the counts are loaded into one int32 numpy array, with a dict
+from key to array slot. reserve() checks and decrements a slot, and
+release() restores it. Both hold the lock only for the dict lookup and
+the arithmetic, so a booking cannot oversell a tracked run and the check
+costs about as much as a dict lookup.
+
+Changes are written behind: a daemon thread rewrites the CSV every
+SEAT_FLUSH_INTERVAL_SECONDS if anything changed since the last write, so
+a burst of bookings costs one file write. stop() flushes what is left.
+Runs that are not in the file are untracked; reserve() returns None for
+them and the booking falls back to the seat model.
+
+Each run also has a capacity (the optional "capacity" column, or its
+seats_left the first time the file is loaded). release() never raises a
+run above it. Callers release only the seats of a booking they actually
+removed from the booking store, so one cancellation returns its seats
+once.
+
+The counts live in this process only, so the inventory takes an owner
+lock on open (app/owner_lock.py): the booking service must run as a
+single worker, and a second process fails to start instead of overselling.
+"""
+
+import csv
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from app.owner_lock import acquire_owner_lock
+
+SEAT_INVENTORY_FILE = Path(os.getenv("SEAT_INVENTORY_FILE", "data/live_seats.csv"))
+SEAT_FLUSH_INTERVAL_SECONDS = float(os.getenv("SEAT_FLUSH_INTERVAL_SECONDS", "1"))
+
+INVENTORY_FIELDS = ["train_id", "travel_date", "class", "seats_left", "capacity"]
+
+
+class SeatsUnavailable(ValueError):
+    """Raised by reserve() when a tracked run has fewer seats left than requested."""
+
+    def __init__(self, seats_left):
+        super().__init__(f"Only {seats_left} seats left")
+        self.seats_left = seats_left
+
+
+class SeatInventory:
+    def __init__(self, path=SEAT_INVENTORY_FILE, interval=SEAT_FLUSH_INTERVAL_SECONDS):
+        self.path = Path(path)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._opened = False
+        self._slots = {}                  # (train_id, travel_date, class) -> index into _seats
+        self._keys = []
+        self._seats = np.zeros(0, dtype=np.int32)
+        self._capacity = np.zeros(0, dtype=np.int32)
+        self._owner_fd = None
+        self._changes = 0                 # bumped on every reserve / release
+        self._flushed = 0                 # value of _changes at the last write
+        self._stop = threading.Event()
+        self._thread = None
+        self.reserved = 0
+        self.released = 0
+        self.rejected = 0
+        self.flushes = 0
+
+    def open(self):
+        """Load the seat counts. Idempotent."""
+        with self._lock:
+            if self._opened:
+                return self
+            self._owner_fd = acquire_owner_lock(self.path)
+            keys, seats, capacity = [], [], []
+            if self.path.exists():
+                with open(self.path, newline="") as f:
+                    for row in csv.DictReader(f):
+                        keys.append((row["train_id"], row["travel_date"], row["class"]))
+                        seats.append(int(row["seats_left"]))
+                        capacity.append(int(row.get("capacity") or row["seats_left"]))
+            self._keys = keys
+            self._slots = {key: i for i, key in enumerate(keys)}
+            self._seats = np.array(seats, dtype=np.int32)
+            self._capacity = np.array(capacity, dtype=np.int32)
+            self._opened = True
+        print(f"✅ Seat inventory loaded: {len(keys)} runs from {self.path}")
+        return self
+
+    def start(self):
+        """Open the inventory and start the write-behind thread. Idempotent."""
+        self.open()
+        with self._flush_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="seat-inventory", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+    # ---------- Reserve / release ---------- #
+    def reserve(self, train_id, travel_date, class_name, seats):
+        """
+        Take `seats` from a run. Returns the seats left afterwards, or None if
+        the run is not tracked. Raises SeatsUnavailable if there are too few.
+        """
+        self.open()
+        key = (train_id, travel_date, class_name)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                return None
+            left = int(self._seats[slot])
+            if left < seats:
+                self.rejected += 1
+                raise SeatsUnavailable(left)
+            self._seats[slot] = left - seats
+            self._changes += 1
+            self.reserved += seats
+            return left - seats
+
+    def release(self, train_id, travel_date, class_name, seats):
+        """
+        Give `seats` back to a run, up to its capacity. Returns the seats left
+        afterwards, or None if untracked.
+        """
+        self.open()
+        key = (train_id, travel_date, class_name)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                return None
+            left = int(self._seats[slot])
+            new_left = min(left + seats, int(self._capacity[slot]))
+            self._seats[slot] = new_left
+            self._changes += 1
+            self.released += new_left - left
+            return new_left
+
+    def seats_left(self, train_id, travel_date, class_name):
+        self.open()
+        with self._lock:
+            slot = self._slots.get((train_id, travel_date, class_name))
+            return None if slot is None else int(self._seats[slot])
+
+    # ---------- Write-behind ---------- #
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as exc:
+                print(f"⚠️ Seat inventory flush failed: {exc}")
+
+    def flush(self):
+        """Rewrite the CSV if seats changed since the last write."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._opened or self._changes == self._flushed:
+                    return False
+                changes, keys, seats, capacity = self._changes, self._keys, self._seats.copy(), self._capacity
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(INVENTORY_FIELDS)
+                writer.writerows((*key, left, cap) for key, left, cap in zip(keys, seats.tolist(), capacity.tolist()))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._flushed = changes
+            self.flushes += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "runs": len(self._keys),
+                "seats_left": int(self._seats.sum()),
+                "reserved": self.reserved,
+                "released": self.released,
+                "rejected": self.rejected,
+                "unflushed_changes": self._changes - self._flushed,
+                "flushes": self.flushes,
+            }
+
+
+seat_inventory = SeatInventory()
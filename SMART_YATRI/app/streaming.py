@@ -0,0 +1,42 @@
+"""
+Chunked encoders for large exports.
+
+Each generator takes an iterable of pages (lists of row dicts) and yields
+one encoded string per page, so a StreamingResponse holds at most one
+page in memory however many rows are exported.
+"""
+
+import csv
+import io
+import json
+
+STREAM_CHUNK_SIZE = 1000
+MAX_PAGE_SIZE = 1000
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def ndjson_chunks(pages):
+    for page in pages:
+        if page:
+            yield "".join(json.dumps(row, default=str) + "\n" for row in page)
+
+
+def csv_chunks(pages, fieldnames):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode_stream(pages, fmt, fieldnames):
+    """Pick the encoder for an export format ("ndjson" or "csv")."""
+    if fmt == "csv":
+        return csv_chunks(pages, fieldnames)
+    return ndjson_chunks(pages)
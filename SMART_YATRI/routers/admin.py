@@ -1,28 +1,48 @@
 import os, shutil
 from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
 from app.auth import get_current_admin, oauth2_scheme
-from app.ml_utils import train_from_csv, DEFAULT_CSV, UPLOADS_DIR, UPLOAD_FILE_NAME
+from app.ml_utils import retrain_jobs, DEFAULT_CSV, UPLOADS_DIR
+from app.model_registry import registry
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
-@router.post("/upload-retrain")
+# Training runs in the background (app/ml_utils.py); these return a job to poll
+@router.post("/upload-retrain", status_code=202)
 def upload_and_retrain(file: UploadFile = File(...), token: str = Depends(oauth2_scheme)):
     _ = get_current_admin(token)
 
     os.makedirs(UPLOADS_DIR, exist_ok=True)
-    save_path = os.path.join(UPLOADS_DIR, UPLOAD_FILE_NAME)
+    # One file per job, so a later upload cannot replace a queued job's data
+    job_id = retrain_jobs.new_id()
+    save_path = os.path.join(UPLOADS_DIR, f"{job_id}.csv")
 
     with open(save_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
     file.file.close()
 
-    status = train_from_csv(save_path)
-    return {"status": "trained", "details": status}
+    return retrain_jobs.submit(save_path, job_id=job_id)
 
-@router.post("/retrain-default")
+@router.post("/retrain-default", status_code=202)
 def retrain_default(token: str = Depends(oauth2_scheme)):
     _ = get_current_admin(token)
     if not os.path.exists(DEFAULT_CSV):
         raise HTTPException(status_code=400, detail=f"No dataset found at {DEFAULT_CSV}")
-    status = train_from_csv(DEFAULT_CSV)
-    return {"status": "trained", "details": status}
+    return retrain_jobs.submit(DEFAULT_CSV)
+
+@router.get("/retrain-jobs")
+def list_retrain_jobs(token: str = Depends(oauth2_scheme)):
+    _ = get_current_admin(token)
+    return retrain_jobs.list()
+
+@router.get("/retrain-jobs/{job_id}")
+def retrain_job_status(job_id: str, token: str = Depends(oauth2_scheme)):
+    _ = get_current_admin(token)
+    job = retrain_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Retrain job not found")
+    return job
+
+@router.get("/models")
+def active_models(token: str = Depends(oauth2_scheme)):
+    _ = get_current_admin(token)
+    return registry.info()
@@ -1,57 +1,70 @@
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from app.routes.prediction import PredictRequest
+from app.batching import prediction_coalescer
+from app.executors import io_executor
+from app.booking_store import BOOKING_FIELDS, booking_store
+from app.archive_store import ARCHIVE_COLUMNS, archive_store
+from app.booking_archiver import booking_archiver
+from app.booking_index import booking_index
+from app.booking_stats import DIMENSIONS, booking_stats
+from app.pnr import decode_pnr, encode_pnr
+from app.seat_inventory import SeatsUnavailable, seat_inventory
+from app.streaming import MAX_PAGE_SIZE, MEDIA_TYPES, STREAM_CHUNK_SIZE, encode_stream
 from datetime import datetime
-import pandas as pd
-import joblib
-import os
-from pathlib import Path
+import numpy as np
 
 router = APIRouter(prefix="/booking", tags=["Booking"])
 
-ARTIFACT_DIR = "ml/model_artifacts"
-BOOKING_STORAGE = Path("data/bookings.csv")
-ARCHIVE_DIR = Path("data/archive")
 
-os.makedirs(ARCHIVE_DIR, exist_ok=True)
-
-seat_model = joblib.load(os.path.join(ARTIFACT_DIR, "seat_model.joblib"))
-seatleft_model = joblib.load(os.path.join(ARTIFACT_DIR, "seatleft_model.joblib"))
-fare_model = joblib.load(os.path.join(ARTIFACT_DIR, "fare_model.joblib"))
+# ---------- Booking endpoints ---------- #
+# Handlers are async; store and archive I/O runs on the bounded I/O pool and
+# inference on the inference pool, so the event loop never blocks. Past
+# bookings are archived by booking_archiver in the background.
+@router.on_event("startup")
+async def start_booking_services():
+    await io_executor.run(booking_store.open)
+    await io_executor.run(archive_store.open)
+    # Stats must be listening before the archiver's first run
+    await io_executor.run(booking_stats.start)
+    await io_executor.run(booking_archiver.start)
+    await io_executor.run(booking_index.build)
+    await io_executor.run(seat_inventory.start)
 
 
-# ---------- Utility: auto-archive ---------- #
-def auto_archive():
-    if not BOOKING_STORAGE.exists():
-        return
-    df = pd.read_csv(BOOKING_STORAGE)
-    if df.empty:
-        return
-    today = datetime.now().date()
-    past_or_cancelled = df[
-        (pd.to_datetime(df["travel_date"]).dt.date < today) | (df["status"] == "cancelled")
-    ]
-    if not past_or_cancelled.empty:
-        archive_path = ARCHIVE_DIR / f"archive_{today.strftime('%Y%m%d')}.csv"
-        if archive_path.exists():
-            old = pd.read_csv(archive_path)
-            df_archive = pd.concat([old, past_or_cancelled], ignore_index=True)
-        else:
-            df_archive = past_or_cancelled
-        df_archive.to_csv(archive_path, index=False)
-        df.drop(past_or_cancelled.index).to_csv(BOOKING_STORAGE, index=False)
+@router.on_event("shutdown")
+async def stop_booking_services():
+    booking_archiver.stop()
+    await io_executor.run(booking_store.checkpoint)
+    await io_executor.run(seat_inventory.stop)
 
 
-# ---------- Booking endpoints ---------- #
+# Seats come from the live inventory when the run is tracked there; the
+# seat model only decides availability for runs it does not cover. The
+# fare always comes from the model. A reservation is handed back if the
+# booking fails after it was taken.
 @router.post("/")
-def book_ticket(request: PredictRequest):
-    auto_archive()
-    df = pd.DataFrame([request.dict(by_alias=True)])
-    seat_available = int(seat_model.predict(df)[0])
-    seats_left = int(seatleft_model.predict(df)[0])
-    fare = round(float(fare_model.predict(df)[0]), 2)
-    if seat_available == 0:
+async def book_ticket(request: PredictRequest):
+    run = (request.train_id, request.travel_date, request.class_name)
+    try:
+        seats_left = seat_inventory.reserve(*run, request.seats_requested)
+    except SeatsUnavailable:
         return {"status": "rejected", "reason": "No seats available"}
+    reserved = seats_left is not None
+    try:
+        prediction = await prediction_coalescer.submit(request.model_dump(by_alias=True))
+        if not reserved:
+            if prediction["seat_available"] == 0:
+                return {"status": "rejected", "reason": "No seats available"}
+            seats_left = prediction["seats_left"]
+        return await io_executor.run(_store_booking, request, prediction["predicted_fare"], seats_left)
+    except BaseException:
+        if reserved:
+            seat_inventory.release(*run, request.seats_requested)
+        raise
 
+
+def _store_booking(request: PredictRequest, fare: float, seats_left: int):
     record = {
         "train_id": request.train_id,
         "origin": request.origin,
@@ -64,62 +77,179 @@ def book_ticket(request: PredictRequest):
         "status": "confirmed",
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
     }
-    if BOOKING_STORAGE.exists():
-        existing = pd.read_csv(BOOKING_STORAGE)
-        existing = pd.concat([existing, pd.DataFrame([record])], ignore_index=True)
-    else:
-        existing = pd.DataFrame([record])
-    existing.to_csv(BOOKING_STORAGE, index=False)
-    return {"status": "confirmed", "seats_left": seats_left, "fare": fare}
+    booking_id = booking_store.insert(record)
+    return {
+        "status": "confirmed",
+        "pnr": encode_pnr(booking_id),
+        "booking_id": booking_id,
+        "seats_left": seats_left,
+        "fare": fare,
+    }
+
+
+def _with_pnr(booking_id, record):
+    return {"pnr": encode_pnr(booking_id), "booking_id": booking_id, **record}
+
+
+# ---------- Pagination / export ---------- #
+# format=json returns one page and a next_cursor; ndjson and csv stream every
+# matching row, a chunk at a time. Starlette drives the sync generators on
+# its threadpool, so the store reads stay off the event loop.
+EXPORT_FORMAT = Query("json", alias="format", pattern="^(json|ndjson|csv)$")
+
+
+def _stream(pages, fmt, fieldnames, name):
+    return StreamingResponse(
+        encode_stream(pages, fmt, fieldnames),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
 
 
 @router.get("/all")
-def get_all_bookings():
-    auto_archive()
-    if not BOOKING_STORAGE.exists():
+async def get_all_bookings(
+    cursor: int | None = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    fmt: str = EXPORT_FORMAT,
+):
+    if fmt != "json":
+        return _stream(_booking_pages(), fmt, ["pnr", "booking_id", *BOOKING_FIELDS], "bookings")
+    return await io_executor.run(_get_all_bookings, cursor, limit)
+
+
+def _booking_pages():
+    cursor = None
+    while True:
+        page, cursor = booking_store.page(cursor, STREAM_CHUNK_SIZE)
+        yield [_with_pnr(bid, rec) for bid, rec in page]
+        if cursor is None:
+            return
+
+
+def _get_all_bookings(cursor=None, limit=100):
+    if not len(booking_store):
         return {"message": "No bookings found"}
-    return pd.read_csv(BOOKING_STORAGE).to_dict(orient="records")
+    page, next_cursor = booking_store.page(cursor, limit)
+    return {"records": [_with_pnr(bid, rec) for bid, rec in page], "next_cursor": next_cursor}
 
 
-@router.delete("/cancel/{train_id}")
-def cancel_booking(train_id: str):
-    auto_archive()
-    if not BOOKING_STORAGE.exists():
-        raise HTTPException(status_code=404, detail="No bookings found")
-    df = pd.read_csv(BOOKING_STORAGE)
-    if train_id not in df["train_id"].values:
+# A PNR decodes straight to its booking_id (app/pnr.py), and the store keeps
+# a hash index from booking_id to log offset, so status and cancel are one
+# dict lookup and one read however many bookings there are.
+def _lookup(pnr: str):
+    booking_id = decode_pnr(pnr)
+    booking = booking_store.get(booking_id) if booking_id is not None else None
+    if booking is None:
         raise HTTPException(status_code=404, detail="Booking not found")
-    booking = df[df["train_id"] == train_id].iloc[-1]
-    travel_date = datetime.strptime(booking["travel_date"], "%Y-%m-%d")
-    days_left = (travel_date - datetime.now()).days
-    fare = booking["fare"]
-    if days_left > 4:
-        refund = fare * 0.9
-    elif 1 <= days_left <= 4:
-        refund = fare * 0.5
-    else:
-        refund = fare * 0.1
-    df.loc[df["train_id"] == train_id, "status"] = "cancelled"
-    df.to_csv(BOOKING_STORAGE, index=False)
-    auto_archive()
+    return booking_id, booking
+
+
+@router.delete("/cancel/{pnr}")
+async def cancel_booking(pnr: str):
+    return await io_executor.run(_cancel_booking, pnr)
+
+
+def _refund_rates(days_left):
+    """Refund share per booking: 90% more than 4 days out, 50% for 1-4 days, 10% after that."""
+    return np.where(days_left > 4, 0.9, np.where(days_left >= 1, 0.5, 0.1))
+
+
+def _days_left(travel_date: str):
+    return (datetime.strptime(travel_date, "%Y-%m-%d") - datetime.now()).days
+
+
+def _cancel_booking(pnr: str):
+    booking_id, _ = _lookup(pnr)
+    # The archiver removes the booking from the store atomically; when cancels
+    # race, only the one that got the booking back refunds it
+    archived = booking_archiver.archive([booking_id], status="cancelled")
+    if not archived:
+        raise HTTPException(status_code=409, detail="Booking already cancelled")
+    booking = archived[0][1]
+    refund = float(booking["fare"]) * float(_refund_rates(_days_left(booking["travel_date"])))
+    # Only the caller that removed the booking returns its seats
+    seat_inventory.release(
+        booking["train_id"], booking["travel_date"], booking["class"], int(booking["seats_requested"])
+    )
     return {
         "status": "cancelled",
-        "train_id": train_id,
+        "pnr": encode_pnr(booking_id),
+        "train_id": booking["train_id"],
         "refund_amount": round(refund, 2),
         "message": "Booking cancelled successfully and archived",
     }
 
 
-@router.get("/status/{train_id}")
-def get_booking_status(train_id: str):
-    auto_archive()
-    if not BOOKING_STORAGE.exists():
-        raise HTTPException(status_code=404, detail="No bookings found")
-    df = pd.read_csv(BOOKING_STORAGE)
-    if train_id not in df["train_id"].values:
-        raise HTTPException(status_code=404, detail="No booking found")
-    booking = df[df["train_id"] == train_id].iloc[-1]
+# Cancels a whole train run: every confirmed booking for the train on that
+# date (optionally one class). Refunds are computed as one array operation,
+# and the bookings are archived and removed in a single store append.
+@router.delete("/train/{train_id}/{travel_date}")
+async def cancel_train_run(
+    train_id: str,
+    travel_date: str,
+    class_name: str | None = Query(None, alias="class"),
+    full_refund: bool = Query(False, description="Refund 100% instead of the 90/50/10 tiers"),
+):
+    try:
+        datetime.strptime(travel_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Date must be in format YYYY-MM-DD")
+    return await io_executor.run(_cancel_train_run, train_id, travel_date, class_name, full_refund)
+
+
+def _cancel_train_run(train_id: str, travel_date: str, class_name: str | None, full_refund: bool):
+    on_date = set(booking_index.search(travel_date=travel_date, class_name=class_name))
+    ids = [bid for bid in booking_store.ids_for_train(train_id) if bid in on_date]
+    candidates = [
+        bid for bid, rec in booking_store.get_many(ids)
+        if rec["status"] == "confirmed" and rec["travel_date"] == travel_date
+        and (class_name is None or rec["class"].upper() == class_name.upper())
+    ]
+    # Same atomic removal as a single cancel: bookings a concurrent PNR cancel
+    # or archiver sweep took first are left out of the refunds and seat counts
+    bookings = booking_archiver.archive(candidates, status="cancelled")
+    if not bookings:
+        raise HTTPException(status_code=404, detail="No confirmed bookings found for this run")
+
+    fares = np.array([float(rec["fare"]) for _, rec in bookings])
+    seats = np.array([int(rec["seats_requested"]) for _, rec in bookings])
+    rate = 1.0 if full_refund else _refund_rates(_days_left(travel_date))
+    refunds = np.round(fares * rate, 2)
+
+    classes = np.array([rec["class"] for _, rec in bookings])
+    for cls in np.unique(classes):
+        seat_inventory.release(train_id, travel_date, str(cls), int(seats[classes == cls].sum()))
+
+    return {
+        "status": "cancelled",
+        "train_id": train_id,
+        "travel_date": travel_date,
+        "class": class_name,
+        "full_refund": full_refund,
+        "cancelled": len(bookings),
+        "refund_total": round(float(refunds.sum()), 2),
+        "refunds": [
+            {
+                "pnr": encode_pnr(bid),
+                "class": rec["class"],
+                "seats_requested": int(n),
+                "fare": float(fare),
+                "refund_amount": float(refund),
+            }
+            for (bid, rec), n, fare, refund in zip(bookings, seats, fares, refunds)
+        ],
+    }
+
+
+@router.get("/status/{pnr}")
+async def get_booking_status(pnr: str):
+    return await io_executor.run(_get_booking_status, pnr)
+
+
+def _get_booking_status(pnr: str):
+    booking_id, booking = _lookup(pnr)
     return {
+        "pnr": encode_pnr(booking_id),
         "train_id": booking["train_id"],
         "status": booking["status"],
         "fare": booking["fare"],
@@ -128,85 +258,88 @@ def get_booking_status(train_id: str):
 
 
 @router.get("/search")
-def search_bookings(
+async def search_bookings(
     origin: str | None = Query(None),
     destination: str | None = Query(None),
     status: str | None = Query(None),
     class_name: str | None = Query(None, alias="class"),
     travel_date: str | None = Query(None),
+    travel_date_from: str | None = Query(None),
+    travel_date_to: str | None = Query(None),
 ):
-    auto_archive()
-    if not BOOKING_STORAGE.exists():
+    return await io_executor.run(
+        _search_bookings, origin, destination, status, class_name, travel_date, travel_date_from, travel_date_to
+    )
+
+
+def _search_bookings(origin, destination, status, class_name, travel_date, travel_date_from, travel_date_to):
+    if not len(booking_store):
         return {"message": "No bookings found"}
-    df = pd.read_csv(BOOKING_STORAGE)
-    if origin:
-        df = df[df["origin"].str.upper() == origin.upper()]
-    if destination:
-        df = df[df["destination"].str.upper() == destination.upper()]
-    if status:
-        df = df[df["status"].str.lower() == status.lower()]
-    if class_name:
-        df = df[df["class"].str.upper() == class_name.upper()]
-    if travel_date:
-        df = df[df["travel_date"] == travel_date]
-    if df.empty:
+    ids = booking_index.search(
+        origin=origin, destination=destination, status=status, class_name=class_name,
+        travel_date=travel_date, travel_date_from=travel_date_from, travel_date_to=travel_date_to,
+    )
+    if ids is None:
+        matches = [_with_pnr(bid, rec) for bid, rec in booking_store.scan()]
+    else:
+        matches = [_with_pnr(bid, rec) for bid, rec in booking_store.get_many(ids)]
+    if not matches:
         return {"message": "No matching bookings found"}
-    return df.to_dict(orient="records")
+    return matches
 
 
 @router.get("/archive")
-def view_archived_bookings(date: str | None = Query(None)):
-    auto_archive()
-    if not os.listdir(ARCHIVE_DIR):
+async def view_archived_bookings(
+    date: str | None = Query(None, description="Archive day, YYYYMMDD"),
+    travel_date_from: str | None = Query(None),
+    travel_date_to: str | None = Query(None),
+    train_id: str | None = Query(None),
+    status: str | None = Query(None),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    fmt: str = EXPORT_FORMAT,
+):
+    filters = {
+        "archived_on": date, "travel_date_from": travel_date_from, "travel_date_to": travel_date_to,
+        "train_id": train_id, "status": status,
+    }
+    if fmt != "json":
+        pages = (batch.to_pylist() for batch in archive_store.scan(batch_size=STREAM_CHUNK_SIZE, **filters))
+        return _stream(pages, fmt, ARCHIVE_COLUMNS, f"archive_{date}" if date else "archive")
+    return await io_executor.run(_view_archived_bookings, filters, cursor, limit)
+
+
+def _view_archived_bookings(filters, cursor=None, limit=100):
+    if not archive_store.has_data():
         return {"message": "No archived records found"}
+    try:
+        records, next_cursor = archive_store.page(cursor, limit, **filters)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    date = filters["archived_on"]
     if date:
-        file = ARCHIVE_DIR / f"archive_{date}.csv"
-        if not file.exists():
+        if not records and cursor is None:
             raise HTTPException(status_code=404, detail="Archive not found for given date")
-        df = pd.read_csv(file)
-        return {"archive_date": date, "records": df.to_dict(orient="records")}
-    all_records = []
-    for file in ARCHIVE_DIR.glob("archive_*.csv"):
-        df = pd.read_csv(file)
-        all_records.extend(df.to_dict(orient="records"))
-    return {"total_archived_records": len(all_records), "records": all_records}
+        return {"archive_date": date, "records": records, "next_cursor": next_cursor}
+    return {"records": records, "next_cursor": next_cursor}
 
 
 # ---------- NEW: Dashboard Summary ---------- #
 @router.get("/summary")
-def booking_summary():
+async def booking_summary(group_by: str | None = Query(None, description="day, train or class")):
     """Return a summary dashboard of all bookings and revenue/refund stats."""
-    auto_archive()
-
-    total_confirmed = total_cancelled = total_archived = 0
-    total_revenue = total_refund = 0.0
-
-    # Active file
-    if BOOKING_STORAGE.exists():
-        df = pd.read_csv(BOOKING_STORAGE)
-        total_confirmed = (df["status"] == "confirmed").sum()
-        total_cancelled = (df["status"] == "cancelled").sum()
-        total_revenue = df[df["status"] == "confirmed"]["fare"].sum()
+    if group_by and group_by not in DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(DIMENSIONS)}")
+    return await io_executor.run(_booking_summary, group_by)
 
-    # Archived data
-    if os.listdir(ARCHIVE_DIR):
-        for file in ARCHIVE_DIR.glob("archive_*.csv"):
-            df = pd.read_csv(file)
-            total_archived += len(df)
-            total_refund += df[df["status"] == "cancelled"]["fare"].sum()
 
+def _booking_summary(group_by: str | None = None):
+    summary = booking_stats.summary()
     chart_data = {
         "labels": ["Confirmed", "Cancelled", "Archived"],
-        "values": [total_confirmed, total_cancelled, total_archived],
-    }
-
-    return {
-        "summary": {
-            "total_confirmed": int(total_confirmed),
-            "total_cancelled": int(total_cancelled),
-            "total_archived": int(total_archived),
-            "total_revenue": round(total_revenue, 2),
-            "total_refund": round(total_refund, 2),
-        },
-        "chart_data": chart_data,
+        "values": [summary["total_confirmed"], summary["total_cancelled"], summary["total_archived"]],
     }
+    response = {"summary": summary, "chart_data": chart_data}
+    if group_by:
+        response["breakdown"] = booking_stats.breakdown(group_by)
+    return response
@@ -1,18 +1,14 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Body, HTTPException
 from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
-import joblib
-import pandas as pd
-import os
+from typing import Any, Dict, List
 
-router = APIRouter(prefix="/predict", tags=["Prediction"])
-
-ARTIFACT_DIR = "ml/model_artifacts"
+from app.batching import prediction_coalescer
+from app.executors import executor_stats, inference_executor, predict_batch_in_worker
+from app.inference import MAX_BATCH_SIZE
+from app.prediction_cache import prediction_cache
 
-# Load trained models
-seat_model = joblib.load(os.path.join(ARTIFACT_DIR, "seat_model.joblib"))
-seatleft_model = joblib.load(os.path.join(ARTIFACT_DIR, "seatleft_model.joblib"))
-fare_model = joblib.load(os.path.join(ARTIFACT_DIR, "fare_model.joblib"))
+router = APIRouter(prefix="/predict", tags=["Prediction"])
 
 
 class PredictRequest(BaseModel):
@@ -36,27 +32,39 @@ class PredictRequest(BaseModel):
 
 
 @router.post("/")
-def predict(request: PredictRequest):
+async def predict(request: PredictRequest):
     """
     Predict seat availability, seats left, and fare using trained models.
+    Concurrent calls are coalesced into one vectorized model call.
+    """
+
+    return await prediction_coalescer.submit(request.model_dump(by_alias=True))
+
+
+@router.post("/batch")
+async def predict_batch(payload: List[Dict[str, Any]] = Body(...)):
+    """
+    Predict many rows in one vectorized pass.
+    Results come back in request order; invalid items carry their
+    validation errors instead of failing the whole batch.
     """
+    if len(payload) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds {MAX_BATCH_SIZE} items")
+    results = await inference_executor.run(predict_batch_in_worker, payload, PredictRequest)
+    return {"results": results}
 
-    df = pd.DataFrame([{
-        "train_id": request.train_id,
-        "origin": request.origin,
-        "destination": request.destination,
-        "travel_date": request.travel_date,
-        "booking_date": request.booking_date,
-        "class": request.class_name,
-        "seats_requested": request.seats_requested,
-    }])
-
-    seat_available = int(seat_model.predict(df)[0])
-    seats_left = int(seatleft_model.predict(df)[0])
-    predicted_fare = round(float(fare_model.predict(df)[0]), 2)
-
-    return {
-        "seat_available": seat_available,
-        "seats_left": seats_left,
-        "predicted_fare": predicted_fare
-    }
+
+@router.get("/cache")
+def cache_stats():
+    """
+    Hit/miss counters and occupancy of the shared prediction cache.
+    """
+    return prediction_cache.stats()
+
+
+@router.get("/metrics")
+def batching_metrics():
+    """
+    Coalescer batch-size/queue-wait histograms and execution pool queue depths.
+    """
+    return {"batching": prediction_coalescer.stats(), **executor_stats()}
@@ -0,0 +1,79 @@
+"""
+ArchiveStore: rows land in the partition of their archive month, and page
+cursors cover every row exactly once, including across a part merge.
+"""
+
+import pytest
+
+from app.archive_store import ArchiveStore
+
+
+def _records(first, count, travel_date="2026-11-01"):
+    return [
+        {"booking_id": i, "train_id": f"T{i % 3}", "origin": "NDLS", "destination": "BCT",
+         "travel_date": travel_date, "booking_date": "2026-10-01", "class": "SL",
+         "seats_requested": 1, "fare": 100.0 + i, "status": "CANCELLED", "timestamp": "2026-10-01 10:00:00"}
+        for i in range(first, first + count)
+    ]
+
+
+def _walk(store, limit, cursor=None):
+    ids = []
+    while True:
+        rows, cursor = store.page(cursor=cursor, limit=limit)
+        ids.extend(row["booking_id"] for row in rows)
+        if cursor is None:
+            return ids
+
+
+def test_rows_are_partitioned_by_archive_month(tmp_path):
+    store = ArchiveStore(tmp_path)
+    store.append(_records(1, 5), archived_on="20261005")
+    store.append(_records(6, 3), archived_on="20261102")
+
+    partitions = store.stats()["partitions"]
+    assert sorted(partitions) == ["202610", "202611"]
+    assert partitions["202610"]["rows"] == 5 and partitions["202611"]["rows"] == 3
+    assert (tmp_path / "month=202610").is_dir() and (tmp_path / "month=202611").is_dir()
+    assert [row["booking_id"] for row in store.records(archived_on="20261102")] == [6, 7, 8]
+
+
+def test_pages_cover_every_row_once_across_months(tmp_path):
+    store = ArchiveStore(tmp_path)
+    store.append(_records(1, 7), archived_on="20261005")
+    store.append(_records(8, 4), archived_on="20261006")
+    store.append(_records(12, 6), archived_on="20261102")
+
+    assert sorted(_walk(store, limit=4)) == list(range(1, 18))
+    assert _walk(store, limit=4) == _walk(store, limit=100)
+
+
+def test_cursor_survives_a_merge(tmp_path):
+    store = ArchiveStore(tmp_path, max_parts=2)
+    store.append(_records(1, 4), archived_on="20261005")
+    store.append(_records(5, 4), archived_on="20261006")
+    first, cursor = store.page(limit=3)
+    assert store.stats()["partitions"]["202610"]["parts"] == 2
+
+    store.append(_records(9, 4), archived_on="20261007")   # third part: the month is merged
+    assert store.stats()["partitions"]["202610"]["parts"] == 1
+
+    rest = _walk(store, limit=3, cursor=cursor)
+    assert [row["booking_id"] for row in first] + rest == _walk(store, limit=100)
+    assert sorted([row["booking_id"] for row in first] + rest) == list(range(1, 13))
+
+
+def test_reopen_keeps_partitions(tmp_path):
+    ArchiveStore(tmp_path).append(_records(1, 5), archived_on="20261005")
+
+    reopened = ArchiveStore(tmp_path)
+    assert reopened.stats()["partitions"]["202610"]["rows"] == 5
+    assert sorted(_walk(reopened, limit=2)) == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize("cursor", ["2026:1", "202610", "202610:x", "abcdef:3"])
+def test_bad_cursor_raises(tmp_path, cursor):
+    store = ArchiveStore(tmp_path)
+    store.append(_records(1, 2), archived_on="20261005")
+    with pytest.raises(ValueError):
+        store.page(cursor=cursor)
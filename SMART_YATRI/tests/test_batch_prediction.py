@@ -0,0 +1,54 @@
+"""
+predict_batch_items: invalid items get their errors in place, and every
+valid item is predicted in one call to the models, in request order.
+"""
+
+from types import SimpleNamespace
+
+from app.inference import predict_batch_items
+from app.prediction_cache import PredictionCache
+from app.routes.prediction import PredictRequest
+
+
+class CountingForest:
+    """Stands in for the compiled forests; echoes each row's seats_requested."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_rows(self, rows):
+        self.calls.append(len(rows))
+        return [{"seat_available": 1, "seats_left": row[6], "predicted_fare": 100.0 + row[4]} for row in rows]
+
+
+def _models():
+    return SimpleNamespace(table=None, compiled=CountingForest(), version="v1")
+
+
+def _item(seats, **overrides):
+    return {"train_id": "12951", "origin": "NDLS", "destination": "BCT", "travel_date": "2026-11-10",
+            "booking_date": "2026-11-01", "class": "3A", "seats_requested": seats, **overrides}
+
+
+def test_invalid_items_do_not_fail_the_batch():
+    models = _models()
+    items = [_item(1), _item(0), _item(3, travel_date="10/11/2026"), _item(4)]
+
+    results = predict_batch_items(items, PredictRequest, models)
+
+    assert [r["status"] for r in results] == ["ok", "invalid", "invalid", "ok"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert results[1]["errors"][0]["loc"] == ["seats_requested"]
+    assert results[2]["errors"][0]["loc"] == ["travel_date"]
+    assert results[0]["seats_left"] == 1 and results[3]["seats_left"] == 4
+    assert results[0]["predicted_fare"] == 109.0
+    assert models.compiled.calls == [2]
+
+
+def test_repeated_rows_are_served_from_cache():
+    models, cache = _models(), PredictionCache()
+    predict_batch_items([_item(1), _item(2)], PredictRequest, models, cache)
+    results = predict_batch_items([_item(2), _item(5)], PredictRequest, models, cache)
+
+    assert [r["seats_left"] for r in results] == [2, 5]
+    assert models.compiled.calls == [2, 1]
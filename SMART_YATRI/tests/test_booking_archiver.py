@@ -0,0 +1,69 @@
+"""
+BookingArchiver.run_once moves only the bookings whose travel date is
+before the cutoff, and a failed archive write loses nothing.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from app.archive_store import ArchiveStore
+from app.booking_archiver import BookingArchiver
+from app.booking_store import BookingStore
+
+TODAY = date.today()
+
+
+def _booking(days_ahead):
+    return {"train_id": "T1", "travel_date": (TODAY + timedelta(days=days_ahead)).isoformat(),
+            "class": "SL", "fare": 100.0, "status": "confirmed"}
+
+
+@pytest.fixture
+def archiver(tmp_path):
+    store = BookingStore(tmp_path / "bookings.jsonl", legacy_csv=None, fsync=False, group_commit_ms=0).open()
+    archiver = BookingArchiver(store, ArchiveStore(tmp_path / "archive"), interval=3600)
+    archiver.start()
+    yield archiver
+    archiver.stop()
+    store.close()
+
+
+def _archived_ids(archiver):
+    return sorted(row["booking_id"] for row in archiver.archive_store.records(columns=["booking_id"]))
+
+
+def test_run_archives_up_to_the_watermark(archiver):
+    ids = archiver.store.insert_many([_booking(days) for days in (1, 2, 3, 4, 5)])
+
+    assert archiver.run_once(today=TODAY + timedelta(days=3)) == 2
+    assert archiver.run_once(today=TODAY + timedelta(days=3)) == 0
+    assert archiver.watermark == (TODAY + timedelta(days=3)).isoformat()
+    assert _archived_ids(archiver) == ids[:2]
+    assert archiver.store.ids() == ids[2:]
+    assert archiver.stats()["next_travel_date"] == (TODAY + timedelta(days=3)).isoformat()
+
+
+def test_removed_bookings_are_skipped(archiver):
+    ids = archiver.store.insert_many([_booking(days) for days in (1, 1, 2)])
+    archiver.store.delete(ids[:1])
+
+    assert archiver.run_once(today=TODAY + timedelta(days=10)) == 2
+    assert _archived_ids(archiver) == ids[1:]
+
+
+def test_failed_write_restores_and_retries(archiver, monkeypatch):
+    ids = archiver.store.insert_many([_booking(1), _booking(2)])
+    append = archiver.archive_store.append
+
+    def broken(records, archived_on=None):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(archiver.archive_store, "append", broken)
+    with pytest.raises(OSError):
+        archiver.run_once(today=TODAY + timedelta(days=5))
+    assert archiver.store.ids() == ids
+
+    monkeypatch.setattr(archiver.archive_store, "append", append)
+    assert archiver.run_once(today=TODAY + timedelta(days=5)) == 2
+    assert _archived_ids(archiver) == ids
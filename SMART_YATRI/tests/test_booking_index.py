@@ -0,0 +1,78 @@
+"""
+BookingIndex.search returns exactly what a full filter over the store would,
+and follows the store as bookings are added and removed.
+"""
+
+import pytest
+
+from app.booking_index import BookingIndex
+from app.booking_store import BookingStore
+
+
+def _booking(n):
+    return {
+        "train_id": f"T{n % 5}",
+        "origin": ["NDLS", "BCT", "MAS"][n % 3],
+        "destination": ["HWH", "SBC"][n % 2],
+        "travel_date": f"2026-11-{1 + n % 20:02d}",
+        "class": ["SL", "3A", "2A"][n % 3],
+        "fare": 100.0 + n,
+        "status": "cancelled" if n % 7 == 0 else "confirmed",
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BookingStore(tmp_path / "bookings.jsonl", legacy_csv=None, fsync=False, group_commit_ms=0).open()
+    store.insert_many([_booking(n) for n in range(150)])
+    yield store
+    store.close()
+
+
+def _expected(store, origin=None, status=None, class_name=None, date_from=None, date_to=None):
+    return [
+        booking_id for booking_id, record in store.scan()
+        if (not origin or record["origin"] == origin.upper())
+        and (not status or record["status"] == status.lower())
+        and (not class_name or record["class"] == class_name.upper())
+        and (not date_from or record["travel_date"] >= date_from)
+        and (not date_to or record["travel_date"] <= date_to)
+    ]
+
+
+@pytest.mark.parametrize("filters", [
+    {"origin": "ndls"},
+    {"origin": "BCT", "class_name": "3a"},
+    {"status": "CANCELLED"},
+    {"date_from": "2026-11-05", "date_to": "2026-11-09"},
+    {"origin": "MAS", "status": "confirmed", "date_from": "2026-11-15"},
+    {"origin": "MAS", "class_name": "SL"},       # never together: empty
+])
+def test_search_matches_a_full_scan(store, filters):
+    index = BookingIndex(store).build()
+    expected = _expected(store, **filters)
+    assert index.search(
+        origin=filters.get("origin"), status=filters.get("status"), class_name=filters.get("class_name"),
+        travel_date_from=filters.get("date_from"), travel_date_to=filters.get("date_to"),
+    ) == expected
+
+
+def test_exact_travel_date_and_no_filters(store):
+    index = BookingIndex(store).build()
+    assert index.search(travel_date="2026-11-03") == [i for i in store.ids() if (i - 1) % 20 == 2]
+    assert index.search() is None
+
+
+def test_index_follows_removals_and_inserts(store):
+    index = BookingIndex(store).build()
+    before = index.search(travel_date="2026-11-01")
+    store.delete(before[:3])
+    assert index.search(travel_date="2026-11-01") == before[3:]
+
+    new_id = store.insert({**_booking(0), "travel_date": "2026-12-25", "origin": "SBC"})
+    assert index.search(origin="sbc") == [new_id]
+    assert index.stats()["last_travel_date"] == "2026-12-25"
+
+    store.delete([new_id])
+    assert index.search(origin="SBC") == []
+    assert index.stats()["last_travel_date"] == "2026-11-20"
@@ -0,0 +1,97 @@
+"""
+The hot booking queries must be served by the indexes on bookings
+(migration 3f1c2a9d7b10). Each query is built the way the app builds it
+and run through EXPLAIN; the plan has to name the expected index.
+
+The SQLite run always happens. Set TEST_DATABASE_URL to a Postgres URL
+to check the same plans there (tables go in a throwaway schema, and
+sequential scans are disabled so a small table still shows the index).
+"""
+
+import os
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, func, select, text
+
+from app import crud
+from app.models import Base, Booking
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+TRAVEL_DATE = date(2026, 10, 17)
+
+HOT_QUERIES = [
+    (
+        "user history by travel date",
+        lambda: crud.user_bookings_before(7, f"{TRAVEL_DATE.isoformat()}:100", 20),
+        "ix_bookings_user_travel_date",
+    ),
+    (
+        "user fare trends by booking date",
+        lambda: select(func.avg(Booking.fare))
+        .where(Booking.user_id == 7)
+        .where(Booking.booking_date.between(date(2026, 9, 18), TRAVEL_DATE)),
+        "ix_bookings_user_booking_date",
+    ),
+    (
+        "bookings of one train run",
+        lambda: select(Booking.id)
+        .where(Booking.train_id == "12951")
+        .where(Booking.travel_date == TRAVEL_DATE)
+        .where(Booking.class_name == "3A"),
+        "ix_bookings_train_run",
+    ),
+    (
+        "newest-first admin summary",
+        lambda: select(Booking).order_by(Booking.created_at.desc()).limit(100),
+        "ix_bookings_created_at",
+    ),
+]
+
+
+def _explain(conn, prefix, query):
+    sql = str(query.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    return "\n".join(str(row[-1]) for row in conn.exec_driver_sql(f"{prefix} {sql}"))
+
+
+@pytest.fixture(scope="module")
+def sqlite_conn(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('db') / 'bookings.db'}")
+    Base.metadata.create_all(engine, tables=[Booking.__table__])
+    with engine.connect() as conn:
+        yield conn
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def postgres_conn():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_engine(TEST_DATABASE_URL)
+    schema = f"explain_{uuid.uuid4().hex[:8]}"
+    with engine.connect() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+        conn.execute(text(f"SET search_path TO {schema}"))
+        Base.metadata.create_all(conn, tables=[Booking.__table__])
+        conn.execute(text("ANALYZE bookings"))
+        conn.execute(text("SET enable_seqscan = off"))
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+            conn.commit()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name, build, index", HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_sqlite_plan_uses_index(sqlite_conn, name, build, index):
+    plan = _explain(sqlite_conn, "EXPLAIN QUERY PLAN", build())
+    assert index in plan, f"{name}: {plan}"
+
+
+@pytest.mark.parametrize("name, build, index", HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_postgres_plan_uses_index(postgres_conn, name, build, index):
+    plan = _explain(postgres_conn, "EXPLAIN", build())
+    assert index in plan, f"{name}: {plan}"
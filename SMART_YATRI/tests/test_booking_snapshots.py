@@ -0,0 +1,115 @@
+"""
+Restart from the booking store checkpoint: the search index, dashboard
+counters and archiver heap come back from their saved state plus the
+log written after the checkpoint, and match a build from a full replay.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from app.archive_store import ArchiveStore
+from app.booking_archiver import BookingArchiver
+from app.booking_index import BookingIndex
+from app.booking_stats import BookingStats
+from app.booking_store import BookingStore
+
+TODAY = date.today()
+
+
+def _booking(n, days_ahead, status="confirmed"):
+    return {
+        "train_id": f"T{100 + n % 7}",
+        "origin": ["NDLS", "BCT", "MAS"][n % 3],
+        "destination": ["HWH", "SBC"][n % 2],
+        "travel_date": (TODAY + timedelta(days=days_ahead)).isoformat(),
+        "booking_date": TODAY.isoformat(),
+        "class": ["SL", "3A", "2A"][n % 3],
+        "seats_requested": 1 + n % 4,
+        "fare": 250.0 + n,
+        "status": status,
+        "timestamp": TODAY.isoformat(),
+    }
+
+
+class Service:
+    """The booking store and its three followers, started in the API's order."""
+
+    def __init__(self, root, scan_allowed=True):
+        self.store = BookingStore(root / "bookings.jsonl", legacy_csv=None, fsync=False, group_commit_ms=0)
+        self.archive = ArchiveStore(root / "archive")
+        self.archiver = BookingArchiver(self.store, self.archive, interval=3600)
+        self.stats = BookingStats(self.store, self.archiver, root / "booking_stats.json")
+        self.index = BookingIndex(self.store)
+        self.store.open()
+        if not scan_allowed:
+            self.store.scan = self._no_scan
+        self.stats.start()
+        self.archiver.start()
+        self.index.build()
+
+    @staticmethod
+    def _no_scan(*args, **kwargs):
+        raise AssertionError("full store scan on start-up")
+
+    def state(self):
+        live = set(self.store.ids())
+        return {
+            "postings": self.index._dump()["postings"],
+            "by_date": self.index._dump()["by_date"],
+            "dates": list(self.index._dates),
+            "live": self.stats._dump(),
+            # Entries of removed bookings stay in the heap until popped, then are skipped
+            "heap": sorted({entry for entry in self.archiver._dump()["heap"] if entry[1] in live}),
+        }
+
+    def stop(self):
+        self.archiver.stop()
+        self.store.close()
+
+
+@pytest.fixture
+def root(tmp_path):
+    service = Service(tmp_path)
+    ids = service.store.insert_many([_booking(n, 1 + n % 30) for n in range(200)])
+    service.archiver.archive(ids[:20], status="cancelled")
+    service.store.checkpoint()
+
+    # Written after the checkpoint: replayed from the log tail on restart
+    more = service.store.insert_many([_booking(n, 2 + n % 10) for n in range(200, 260)])
+    service.archiver.archive(ids[20:30] + more[:5], status="cancelled")
+    service.stop()
+    return tmp_path
+
+
+def test_restart_restores_followers_from_checkpoint(root):
+    restarted = Service(root, scan_allowed=False)
+    restored = restarted.state()
+    stats = restarted.store.stats()
+    restarted.stop()
+
+    (root / "bookings.idx").unlink()
+    replayed = Service(root)
+    expected = replayed.state()
+    replayed.stop()
+
+    assert restored == expected
+    # 60 bookings and 15 cancellations since the checkpoint, not all 260 bookings
+    assert stats["replayed_on_open"] == 75
+
+
+def test_compaction_before_subscribe_falls_back_to_replay(root):
+    expected_service = Service(root)
+    expected = expected_service.state()
+    expected_service.stop()
+
+    store = BookingStore(root / "bookings.jsonl", legacy_csv=None, fsync=False, group_commit_ms=0).open()
+    # The tail's locations point into the log being replaced
+    store.compact()
+    index = BookingIndex(store)
+    assert store.subscribe(index._on_change, replay=True, snapshot=("booking_index", index._dump, index._load)) is False
+    actual = index._dump()
+    store.close()
+
+    assert actual["postings"] == expected["postings"]
+    assert actual["by_date"] == expected["by_date"]
@@ -0,0 +1,63 @@
+"""
+BookingStats keeps the /booking/summary counters in step with the store and
+the archiver, and they match a recount from scratch.
+"""
+
+import pytest
+
+from app.archive_store import ArchiveStore
+from app.booking_archiver import BookingArchiver
+from app.booking_stats import BookingStats
+from app.booking_store import BookingStore
+
+
+def _booking(n, status="confirmed"):
+    return {"train_id": f"T{n % 2}", "travel_date": "2026-11-01", "class": "3A", "fare": 100.10 + n, "status": status}
+
+
+@pytest.fixture
+def service(tmp_path):
+    store = BookingStore(tmp_path / "bookings.jsonl", legacy_csv=None, fsync=False, group_commit_ms=0).open()
+    archiver = BookingArchiver(store, ArchiveStore(tmp_path / "archive"), interval=3600)
+    stats = BookingStats(store, archiver, tmp_path / "booking_stats.json").start()
+    yield store, archiver, stats
+    store.close()
+
+
+def test_live_counters_follow_the_store(service):
+    store, _, stats = service
+    ids = store.insert_many([_booking(n) for n in range(6)] + [_booking(6, status="cancelled")])
+    assert stats.summary()["total_confirmed"] == 6
+    assert stats.summary()["total_cancelled"] == 1
+    assert stats.summary()["total_revenue"] == pytest.approx(sum(100.10 + n for n in range(6)))
+
+    store.delete(ids[:2])
+    summary = stats.summary()
+    assert summary["total_confirmed"] == 4
+    assert summary["total_revenue"] == pytest.approx(sum(100.10 + n for n in range(2, 6)))
+    assert stats.breakdown("train")["T0"]["total_confirmed"] == 2
+
+
+def test_archived_cancellations_move_to_refunds(service, tmp_path):
+    store, archiver, stats = service
+    ids = store.insert_many([_booking(n) for n in range(4)])
+    archiver.archive(ids[:2], status="cancelled")
+    archiver.archive(ids[:2], status="cancelled")      # already gone: counted once
+
+    summary = stats.summary()
+    assert summary["total_confirmed"] == 2
+    assert summary["total_archived"] == 2
+    assert summary["total_refund"] == pytest.approx(100.10 + 101.10)
+
+    rebuilt = BookingStats(store, archiver, tmp_path / "rebuilt.json")
+    rebuilt.rebuild_archive(archiver.archive_store)
+    assert rebuilt.archive == stats.archive
+
+
+def test_archive_counters_survive_a_restart(service, tmp_path):
+    store, archiver, stats = service
+    ids = store.insert_many([_booking(n) for n in range(3)])
+    archiver.archive(ids, status="cancelled")
+
+    restarted = BookingStats(store, archiver, tmp_path / "booking_stats.json").start()
+    assert restarted.summary() == stats.summary()
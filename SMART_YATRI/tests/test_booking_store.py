@@ -0,0 +1,119 @@
+"""
+The append-only booking store: durability via group commit, compaction,
+recovery on reopen, and single-process ownership of the log.
+"""
+
+import threading
+
+import pytest
+
+from app.booking_store import BookingStore
+from app.owner_lock import OwnerLockError
+
+
+def _store(path, **options):
+    options.setdefault("fsync", False)
+    options.setdefault("group_commit_ms", 0)
+    return BookingStore(path, legacy_csv=None, **options).open()
+
+
+def _booking(n):
+    return {"train_id": f"T{n % 3}", "travel_date": "2026-11-01", "class": "3A", "fare": 100.0 + n, "status": "confirmed"}
+
+
+def test_reopen_restores_bookings_and_id_counter(tmp_path):
+    path = tmp_path / "bookings.jsonl"
+    store = _store(path)
+    ids = store.insert_many([_booking(n) for n in range(10)])
+    store.delete(ids[:3])
+    store.close()
+
+    store = _store(path)
+    assert store.ids() == ids[3:]
+    assert store.get(ids[5])["fare"] == 105.0
+    assert store.get(ids[0]) is None
+    assert store.ids_for_train("T1") == [i for i in ids[3:] if (i - 1) % 3 == 1]
+    assert store.insert(_booking(10)) == ids[-1] + 1
+    store.close()
+
+
+def test_concurrent_writers_share_fsyncs(tmp_path):
+    store = _store(tmp_path / "bookings.jsonl", fsync=True, group_commit_ms=20)
+    ids, barrier = [], threading.Barrier(16)
+
+    def book(n):
+        barrier.wait()
+        ids.append(store.insert(_booking(n)))
+
+    threads = [threading.Thread(target=book, args=(n,)) for n in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(ids) == list(range(1, 17))
+    assert store.stats()["fsyncs"] < 16
+    store.close()
+
+
+def test_compaction_drops_garbage_and_keeps_ids_unique(tmp_path):
+    path = tmp_path / "bookings.jsonl"
+    store = _store(path)
+    ids = store.insert_many([_booking(n) for n in range(100)])
+    store.delete(ids[:90] + ids[-1:])
+    before = store.stats()["log_bytes"]
+
+    assert store.compact()
+    stats = store.stats()
+    assert stats["log_bytes"] < before / 4
+    assert stats["garbage_ratio"] < 0.1
+    assert [record["fare"] for _, record in store.get_many(ids[90:])] == [100.0 + n for n in range(90, 99)]
+    store.close()
+
+    # The highest id was deleted, but the compaction header keeps it from being reissued
+    store = _store(path)
+    assert store.ids() == ids[90:99]
+    assert store.insert(_booking(100)) == ids[-1] + 1
+    store.close()
+
+
+def test_torn_final_line_is_truncated_on_open(tmp_path):
+    path = tmp_path / "bookings.jsonl"
+    store = _store(path)
+    ids = store.insert_many([_booking(n) for n in range(3)])
+    store.close()
+    with open(path, "ab") as f:
+        f.write(b'{"op": "put", "id": 4, "rec": {"train_')
+
+    store = _store(path)
+    assert store.ids() == ids
+    assert path.read_bytes().endswith(b"\n")
+    assert store.insert(_booking(3)) == 4
+    store.close()
+
+
+def test_remove_if_live_succeeds_once(tmp_path):
+    store = _store(tmp_path / "bookings.jsonl")
+    booking_id = store.insert(_booking(1))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.remove_if_live(booking_id))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(result is not None for result in results) == 1
+    assert store.get(booking_id) is None
+    store.close()
+
+
+def test_second_owner_is_refused_until_close(tmp_path):
+    path = tmp_path / "bookings.jsonl"
+    first = _store(path)
+    with pytest.raises(OwnerLockError):
+        _store(path)
+    first.close()
+
+    second = _store(path)
+    assert len(second) == 0
+    second.close()
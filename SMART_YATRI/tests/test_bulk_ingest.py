@@ -0,0 +1,88 @@
+"""
+POST /bookings/bulk: valid items are inserted in one transaction with their
+ids handed back in request order, invalid ones are reported by index, and
+the fare rollup gains the inserted fares. SQLite gets stand-ins for
+PostgreSQL's least() and greatest().
+"""
+
+import asyncio
+
+import pytest
+import sqlalchemy as sa
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models import Base, Booking, FareDailyRollup
+from app.routes import booking as booking_routes
+
+
+def _item(fare, **overrides):
+    return {"user_id": 7, "train_id": "12951", "origin": "NDLS", "destination": "BCT", "travel_date": "2026-11-10",
+            "booking_date": "2026-10-17", "class": "3A", "seats_booked": 1, "fare": fare, **overrides}
+
+
+def _postgres_functions(engine):
+    @sa.event.listens_for(engine, "connect")
+    def register(dbapi_conn, _):
+        dbapi_conn.create_function("least", -1, lambda *args: min(a for a in args if a is not None))
+        dbapi_conn.create_function("greatest", -1, lambda *args: max(a for a in args if a is not None))
+
+
+def _ingest(*payloads):
+    """Post each payload in turn; returns the last response, fares by id and the rollup rows."""
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        _postgres_functions(engine.sync_engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[Booking.__table__, FareDailyRollup.__table__])
+        try:
+            for payload in payloads:
+                async with AsyncSession(engine) as db:
+                    result = await booking_routes.create_bookings_bulk(payload, db)
+            async with engine.connect() as conn:
+                fares = (await conn.execute(sa.select(Booking.id, Booking.fare).order_by(Booking.id))).all()
+                rollup = (await conn.execute(sa.select(FareDailyRollup))).all()
+        finally:
+            await engine.dispose()
+        return result, dict(fares), rollup
+
+    return asyncio.run(run())
+
+
+def test_valid_items_are_inserted_in_order():
+    payload = [_item(300.0), _item(-5.0), _item(100.0, travel_date="soon"), _item(200.0),
+               _item(400.0, **{"class": "SL"})]
+    result, fares, rollup = _ingest(payload)
+
+    assert result["received"] == 5 and result["inserted"] == 3
+    assert [b["index"] for b in result["bookings"]] == [0, 3, 4]
+    assert [fares[b["id"]] for b in result["bookings"]] == [300.0, 200.0, 400.0]
+    assert [f["index"] for f in result["failed"]] == [1, 2]
+    assert result["failed"][0]["errors"][0]["loc"] == ("fare",)
+
+    by_class = {row.class_name: row for row in rollup}
+    assert (float(by_class["3A"].fare_sum), by_class["3A"].fare_count) == (500.0, 2)
+    assert (by_class["3A"].fare_min, by_class["3A"].fare_max) == (200.0, 300.0)
+    assert by_class["SL"].fare_count == 1
+
+
+def test_second_batch_merges_into_the_rollup():
+    result, fares, rollup = _ingest([_item(300.0), _item(200.0)], [_item(50.0), _item(900.0)])
+    assert [b["id"] for b in result["bookings"]] == [3, 4]
+    assert len(fares) == 4
+
+    (row,) = rollup
+    assert (float(row.fare_sum), row.fare_count, row.fare_min, row.fare_max) == (1450.0, 4, 50.0, 900.0)
+
+
+def test_all_invalid_inserts_nothing():
+    result, fares, rollup = _ingest([_item(0.0), {"user_id": 1}])
+    assert result["inserted"] == 0 and len(result["failed"]) == 2
+    assert fares == {} and rollup == []
+
+
+def test_oversized_batch_is_refused(monkeypatch):
+    monkeypatch.setattr(booking_routes, "MAX_BULK_BOOKINGS", 2)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(booking_routes.create_bookings_bulk([_item(1.0)] * 3, db=None))
+    assert exc.value.status_code == 413
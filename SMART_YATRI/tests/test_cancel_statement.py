@@ -0,0 +1,97 @@
+"""
+Cancelling through crud.cancel_statement: only live bookings change and are
+returned, so a repeated cancel takes nothing out of the fare rollup twice.
+SQLite gets stand-ins for PostgreSQL's now() and timezone().
+"""
+
+import asyncio
+from datetime import date, datetime
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.models import Base, Booking, BookingStatus, FareDailyRollup
+
+GROUP = {
+    "train_id": "12951", "class_name": "3A", "booking_date": date(2026, 10, 17),
+    "origin": "NDLS", "destination": "BCT",
+}
+FARES = [100.0, 200.0, 300.0]
+
+
+def _postgres_functions(engine):
+    @sa.event.listens_for(engine, "connect")
+    def register(dbapi_conn, _):
+        dbapi_conn.create_function("now", 0, lambda: datetime.utcnow().isoformat(" "))
+        dbapi_conn.create_function("timezone", 2, lambda _tz, ts: ts)
+
+
+def _seed(conn):
+    conn.execute(sa.insert(Booking), [
+        {**GROUP, "user_id": 7, "travel_date": date(2026, 10, 30), "seats_booked": 1,
+         "fare": fare, "status": BookingStatus.CONFIRMED}
+        for fare in FARES
+    ])
+    conn.execute(sa.insert(FareDailyRollup), [{
+        **GROUP, "fare_sum": sum(FARES), "fare_count": len(FARES), "fare_min": min(FARES), "fare_max": max(FARES),
+    }])
+
+
+def _engine():
+    engine = sa.create_engine("sqlite://")
+    _postgres_functions(engine)
+    Base.metadata.create_all(engine, tables=[Booking.__table__, FareDailyRollup.__table__])
+    with engine.begin() as conn:
+        _seed(conn)
+    return engine
+
+
+def _rollup(conn):
+    row = conn.execute(sa.select(FareDailyRollup)).one()
+    return float(row.fare_sum), row.fare_count, row.fare_min, row.fare_max
+
+
+def test_only_live_bookings_are_returned():
+    engine = _engine()
+    with engine.begin() as conn:
+        rows = conn.execute(crud.cancel_statement([1, 2, 99])).all()
+        assert sorted(row.id for row in rows) == [1, 2]
+        assert all(row.status == BookingStatus.CANCELLED for row in rows)
+        assert all(isinstance(row.cancellation_time, datetime) for row in rows)
+
+        assert conn.execute(crud.cancel_statement([1, 2])).all() == []
+        statuses = dict(conn.execute(sa.select(Booking.id, Booking.status)).all())
+    assert statuses == {1: BookingStatus.CANCELLED, 2: BookingStatus.CANCELLED, 3: BookingStatus.CONFIRMED}
+
+
+def test_cancel_booking_updates_the_rollup_once():
+    engine = _engine()
+    with Session(engine) as db:
+        row = crud.cancel_booking(db, 1)
+        assert row.id == 1 and row.fare == 100.0
+        assert crud.cancel_booking(db, 1) is None
+    with engine.connect() as conn:
+        assert _rollup(conn) == (500.0, 2, 200.0, 300.0)
+
+
+def test_async_cancel_skips_already_cancelled():
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        _postgres_functions(engine.sync_engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[Booking.__table__, FareDailyRollup.__table__]))
+            await conn.run_sync(_seed)
+        async with AsyncSession(engine) as db:
+            first = await crud.cancel_bookings(db, [1, 3])
+            second = await crud.cancel_bookings(db, [1, 2, 3])
+        async with engine.connect() as conn:
+            rollup = await conn.run_sync(_rollup)
+        await engine.dispose()
+        return first, second, rollup
+
+    first, second, rollup = asyncio.run(run())
+    assert sorted(row.id for row in first) == [1, 3]
+    assert [row.id for row in second] == [2]
+    assert rollup == (0.0, 0, None, None)
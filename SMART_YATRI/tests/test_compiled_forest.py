@@ -0,0 +1,109 @@
+"""
+Compiled forests against sklearn, and the registry's lazy sklearn fallback.
+
+A small set of artifacts is trained on synthetic bookings in the layout
+train_all_models.py writes (shared preprocessor plus three forests),
+compiled with compile_artifact_dir, and served through ModelRegistry.
+"""
+
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.preprocessing import OneHotEncoder
+
+from app.compiled_forest import compile_artifact_dir
+from app.inference import (
+    CATEGORICAL_COLS, NUMERIC_COLS, FEATURE_COLS,
+    PREPROCESSOR_FILE, SEAT_MODEL_FILE, SEATLEFT_MODEL_FILE, FARE_MODEL_FILE, COMPILED_MODELS_FILE,
+    est_distance, predict_frame,
+)
+from app.model_registry import ModelRegistry, sklearn_artifacts
+
+SAMPLE_ROWS = 500
+
+
+def _bookings(rng, n):
+    stations = ["NDLS", "BCT", "MAS", "HWH", "SBC"]
+    origin = rng.choice(stations, n)
+    destination = rng.choice(stations, n)
+    df = pd.DataFrame({
+        "train_id": rng.choice([f"T{i}" for i in range(100, 112)], n),
+        "origin": origin,
+        "destination": destination,
+        "class": rng.choice(["SL", "3A", "2A"], n),
+        "lead_time_days": rng.integers(0, 120, n),
+        "travel_dow": rng.integers(0, 7, n),
+        "seats_requested": rng.integers(1, 7, n),
+        "est_distance_km": [est_distance(o, d) for o, d in zip(origin, destination)],
+    })
+    df["booked"] = (rng.random(n) < 0.3 + df["lead_time_days"] / 240).astype(int)
+    df["seats_left"] = (72 - df["seats_requested"] * rng.integers(1, 10, n)).clip(lower=0)
+    df["fare"] = 200 + df["est_distance_km"] * 0.5 - df["lead_time_days"] * 0.5 + rng.normal(scale=10, size=n)
+    return df
+
+
+@pytest.fixture(scope="module")
+def artifact_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("artifacts"))
+    df = _bookings(np.random.default_rng(7), 2000)
+    preprocessor = ColumnTransformer([
+        ("cat", OneHotEncoder(handle_unknown="ignore"), CATEGORICAL_COLS),
+        ("num", "passthrough", NUMERIC_COLS),
+    ])
+    X = preprocessor.fit_transform(df[FEATURE_COLS])
+    joblib.dump(preprocessor, os.path.join(path, PREPROCESSOR_FILE))
+    for name, model, target in [
+        (SEAT_MODEL_FILE, RandomForestClassifier(n_estimators=20, random_state=42), "booked"),
+        (SEATLEFT_MODEL_FILE, RandomForestRegressor(n_estimators=20, random_state=42), "seats_left"),
+        (FARE_MODEL_FILE, RandomForestRegressor(n_estimators=20, random_state=42), "fare"),
+    ]:
+        joblib.dump(model.fit(X, df[target]), os.path.join(path, name))
+    compile_artifact_dir(path)
+    return path
+
+
+@pytest.fixture
+def sample():
+    # Fresh draws, so the sample includes unseen routes and lead times
+    return _bookings(np.random.default_rng(11), SAMPLE_ROWS)[FEATURE_COLS]
+
+
+def test_compiled_predictions_match_sklearn(artifact_dir, sample):
+    models = ModelRegistry(artifact_dir).models()
+    rows = list(sample.itertuples(index=False, name=None))
+
+    compiled = models.compiled.predict_rows(rows)
+    expected = predict_frame(sample, models)
+
+    assert len(compiled) == SAMPLE_ROWS
+    mismatches = [i for i, (e, c) in enumerate(zip(expected, compiled)) if e != c]
+    assert not mismatches, f"row {mismatches[0]}: sklearn={expected[mismatches[0]]} compiled={compiled[mismatches[0]]}"
+
+
+def test_registry_does_not_load_sklearn_when_compiled(artifact_dir, sample):
+    registry = ModelRegistry(artifact_dir)
+    models = registry.warm()
+    models.compiled.predict_rows(list(sample.itertuples(index=False, name=None)))
+
+    assert models.compiled is not None
+    assert not any(a.loaded for a in sklearn_artifacts(models))
+    assert registry.info()["sklearn_loaded"] is False
+
+
+def test_registry_falls_back_to_sklearn_without_compiled(artifact_dir, tmp_path, sample):
+    for name in (PREPROCESSOR_FILE, SEAT_MODEL_FILE, SEATLEFT_MODEL_FILE, FARE_MODEL_FILE):
+        os.link(os.path.join(artifact_dir, name), tmp_path / name)
+    assert not (tmp_path / COMPILED_MODELS_FILE).exists()
+
+    models = ModelRegistry(str(tmp_path)).warm()
+
+    assert models.compiled is None
+    assert all(a.loaded for a in sklearn_artifacts(models))
+    reference = ModelRegistry(artifact_dir).models()
+    rows = list(sample.itertuples(index=False, name=None))
+    assert predict_frame(sample, models) == reference.compiled.predict_rows(rows)
@@ -0,0 +1,79 @@
+"""
+fare_rollup maintenance. add_bookings' upsert is PostgreSQL-only, so its
+per-group parameters are checked directly; the remove_bookings UPDATE,
+with its min/max recompute, runs against SQLite.
+"""
+
+from collections import namedtuple
+from datetime import date
+
+import sqlalchemy as sa
+
+from app import fare_rollup
+from app.models import Base, Booking, BookingStatus, FareDailyRollup
+
+GROUP = {
+    "train_id": "12951", "class_name": "3A", "booking_date": date(2026, 10, 17),
+    "origin": "NDLS", "destination": "BCT",
+}
+Cancelled = namedtuple("Cancelled", [*fare_rollup.GROUP_COLUMNS, "fare"])
+
+
+def _booking(fare, **overrides):
+    return {
+        **GROUP, "user_id": 1, "travel_date": date(2026, 10, 30), "seats_booked": 1,
+        "fare": fare, "status": BookingStatus.CONFIRMED, **overrides,
+    }
+
+
+def _database(fares):
+    engine = sa.create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Booking.__table__, FareDailyRollup.__table__])
+    with engine.begin() as conn:
+        conn.execute(sa.insert(Booking), [_booking(fare) for fare in fares])
+        conn.execute(sa.insert(FareDailyRollup), [{
+            **GROUP, "fare_sum": sum(fares), "fare_count": len(fares), "fare_min": min(fares), "fare_max": max(fares),
+        }])
+    return engine
+
+
+def _cancel(engine, fares):
+    """Flip the bookings with these fares to CANCELLED, then take them out of the rollup."""
+    with engine.begin() as conn:
+        ids = conn.execute(sa.select(Booking.id).where(Booking.fare.in_(fares))).scalars().all()
+        conn.execute(sa.update(Booking).where(Booking.id.in_(ids)).values(status=BookingStatus.CANCELLED))
+        conn.execute(*fare_rollup.remove_bookings([Cancelled(**GROUP, fare=fare) for fare in fares]))
+        row = conn.execute(sa.select(FareDailyRollup)).one()
+    return float(row.fare_sum), row.fare_count, row.fare_min, row.fare_max
+
+
+def test_removing_the_minimum_recomputes_it():
+    engine = _database([100.0, 200.0, 300.0])
+    assert _cancel(engine, [100.0]) == (500.0, 2, 200.0, 300.0)
+
+
+def test_removing_the_maximum_recomputes_it():
+    engine = _database([100.0, 200.0, 300.0])
+    assert _cancel(engine, [300.0]) == (300.0, 2, 100.0, 200.0)
+
+
+def test_removing_an_inner_fare_keeps_the_bounds():
+    engine = _database([100.0, 200.0, 300.0])
+    assert _cancel(engine, [200.0]) == (400.0, 2, 100.0, 300.0)
+
+
+def test_removing_every_fare_empties_the_group():
+    engine = _database([100.0, 300.0])
+    assert _cancel(engine, [100.0, 300.0]) == (0.0, 0, None, None)
+
+
+def test_add_bookings_aggregates_one_row_per_group():
+    other = {**GROUP, "class_name": "SL"}
+    bookings = [{**GROUP, "fare": 300.0}, {**other, "fare": 90.0}, {**GROUP, "fare": 100.0}, {**GROUP, "fare": 200.0}]
+
+    _, params = fare_rollup.add_bookings(bookings)
+
+    assert params == [
+        {**GROUP, "fare_sum": 600.0, "fare_count": 3, "fare_min": 100.0, "fare_max": 300.0},
+        {**other, "fare_sum": 90.0, "fare_count": 1, "fare_min": 90.0, "fare_max": 90.0},
+    ]
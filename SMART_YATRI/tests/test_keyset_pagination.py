@@ -0,0 +1,85 @@
+"""
+Keyset pagination in crud: walking every page returns each row exactly
+once and in order, including when a page boundary falls inside a run of
+bookings with the same travel_date.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+import sqlalchemy as sa
+
+from app import crud
+from app.models import Base, Booking, BookingStatus
+
+USER = 7
+
+
+@pytest.fixture(scope="module")
+def conn():
+    engine = sa.create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Booking.__table__])
+    base = date(2026, 11, 1)
+    rows = []
+    for n in range(40):
+        rows.append({
+            # Runs of 6 bookings share each travel date, so pages of 4 split them
+            "user_id": USER if n % 5 else USER + 1,
+            "train_id": "12951", "origin": "NDLS", "destination": "BCT",
+            "travel_date": base + timedelta(days=n // 6), "booking_date": date(2026, 10, 17),
+            "class_name": "3A", "seats_booked": 1, "fare": 500.0 + n, "status": BookingStatus.CONFIRMED,
+        })
+    with engine.begin() as c:
+        c.execute(sa.insert(Booking), rows)
+    with engine.connect() as c:
+        yield c
+    engine.dispose()
+
+
+def _walk(conn, build, cursor_of, limit):
+    pages, cursor = [], None
+    while True:
+        records, cursor = crud.keyset_page(conn.execute(build(cursor, limit)).all(), limit, cursor_of)
+        pages.append(records)
+        if cursor is None:
+            return pages
+
+
+def test_user_pages_cover_every_booking_once_newest_first(conn):
+    expected = conn.execute(
+        sa.select(Booking.id, Booking.travel_date).where(Booking.user_id == USER)
+        .order_by(Booking.travel_date.desc(), Booking.id.desc())
+    ).all()
+
+    pages = _walk(conn, lambda cursor, limit: crud.user_bookings_before(USER, cursor, limit), crud.travel_cursor, 4)
+    seen = [(r["id"], r["travel_date"]) for page in pages for r in page]
+
+    assert seen == [tuple(row) for row in expected]
+    assert all(len(page) == 4 for page in pages[:-1])
+    assert all(r["user_id"] == USER for page in pages for r in page)
+
+
+def test_cursor_inside_a_run_of_equal_travel_dates(conn):
+    first, cursor = crud.keyset_page(conn.execute(crud.user_bookings_before(USER, None, 2)).all(), 2, crud.travel_cursor)
+    second, _ = crud.keyset_page(conn.execute(crud.user_bookings_before(USER, cursor, 2)).all(), 2, crud.travel_cursor)
+
+    assert first[-1]["travel_date"] == second[0]["travel_date"]
+    assert second[0]["id"] < first[-1]["id"]
+
+
+def test_all_bookings_pages_in_id_order(conn):
+    pages = _walk(conn, crud.bookings_after, lambda row: row.id, 7)
+    ids = [r["id"] for page in pages for r in page]
+    assert ids == list(range(1, 41))
+
+
+def test_last_page_has_no_cursor(conn):
+    records, cursor = crud.keyset_page(conn.execute(crud.bookings_after(None, 40)).all(), 40, lambda row: row.id)
+    assert len(records) == 40
+    assert cursor is None
+
+
+@pytest.mark.parametrize("cursor", ["2026-11-01", "not-a-date:3", "2026-11-01:x"])
+def test_malformed_travel_cursor_raises(cursor):
+    with pytest.raises(ValueError):
+        crud.user_bookings_before(USER, cursor, 10)
@@ -0,0 +1,84 @@
+"""
+The Alembic revisions against SQLite: a database `alembic upgrade head`
+meets first, and one the API's create_all has already set up. The
+status normalization revision alters a column type, which SQLite cannot
+do, so only the first two revisions run here.
+"""
+
+import importlib.util
+from pathlib import Path
+
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from app.models import Base, Booking
+
+VERSIONS = Path(__file__).resolve().parent.parent / "Alembic" / "versions"
+REVISIONS = ["3f1c2a9d7b10_booking_query_indexes", "8c4e61b0a2f5_fare_daily_rollup"]
+INDEXES = {"ix_bookings_user_travel_date", "ix_bookings_user_booking_date", "ix_bookings_train_run", "ix_bookings_created_at"}
+
+
+def _revision(name):
+    spec = importlib.util.spec_from_file_location(name, VERSIONS / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _upgrade(conn):
+    # The index revision uses autocommit_block, which needs a migration transaction
+    conn.commit()
+    context = MigrationContext.configure(conn, opts={"transactional_ddl": True})
+    for name in REVISIONS:
+        with Operations.context(context), context.begin_transaction():
+            _revision(name).upgrade()
+    conn.commit()
+
+
+def _schema(conn):
+    inspector = sa.inspect(conn)
+    return (
+        {column["name"] for column in inspector.get_columns("bookings")},
+        {index["name"] for index in inspector.get_indexes("bookings")},
+        inspector.has_table("fare_daily_rollup"),
+    )
+
+
+def test_upgrade_on_empty_database_creates_baseline():
+    engine = sa.create_engine("sqlite://")
+    with engine.connect() as conn:
+        _upgrade(conn)
+        columns, indexes, rollup = _schema(conn)
+    assert "created_at" in columns
+    assert INDEXES <= indexes
+    assert rollup
+
+
+def test_upgrade_after_create_all_is_a_no_op_on_schema():
+    engine = sa.create_engine("sqlite://")
+    with engine.connect() as conn:
+        Base.metadata.create_all(conn, tables=[Booking.__table__])
+        conn.commit()
+        before = _schema(conn)
+        _upgrade(conn)
+        after = _schema(conn)
+    assert after[:2] == before[:2]
+    assert after[2]
+
+
+def test_upgrade_twice_keeps_rollup_backfill():
+    engine = sa.create_engine("sqlite://")
+    with engine.connect() as conn:
+        _upgrade(conn)
+        conn.exec_driver_sql(
+            "INSERT INTO bookings (user_id, train_id, origin, destination, travel_date, booking_date,"
+            " class_name, seats_booked, fare, status) VALUES"
+            " (1, 'T1', 'A', 'B', '2026-10-20', '2026-10-17', '3A', 1, 100, 'CONFIRMED'),"
+            " (2, 'T1', 'A', 'B', '2026-10-20', '2026-10-17', '3A', 1, 300, 'CONFIRMED')"
+        )
+        conn.commit()
+        _upgrade(conn)
+        _upgrade(conn)
+        rows = conn.exec_driver_sql("SELECT fare_sum, fare_count, fare_min, fare_max FROM fare_daily_rollup").all()
+    assert rows == [(400, 2, 100.0, 300.0)]
@@ -0,0 +1,54 @@
+"""
+PNR codes: every booking id round-trips, distinct ids get distinct PNRs,
+and malformed or mistyped PNRs decode to None.
+"""
+
+from app.pnr import ALPHABET, MASK, PNR_LENGTH, decode_pnr, encode_pnr
+
+SAMPLE_IDS = list(range(1, 20001)) + [MASK - 1, MASK, 123456789012]
+
+
+def test_round_trip():
+    for booking_id in SAMPLE_IDS:
+        pnr = encode_pnr(booking_id)
+        assert len(pnr) == PNR_LENGTH
+        assert decode_pnr(pnr) == booking_id
+
+
+def test_distinct_ids_get_distinct_pnrs():
+    pnrs = [encode_pnr(booking_id) for booking_id in SAMPLE_IDS]
+    assert len(set(pnrs)) == len(pnrs)
+
+
+def test_consecutive_ids_do_not_share_a_prefix():
+    assert encode_pnr(1000)[:4] != encode_pnr(1001)[:4]
+
+
+def test_lenient_input_forms_decode():
+    pnr = encode_pnr(42)
+    assert decode_pnr(f"  {pnr.lower()} ") == 42
+    # Crockford: O reads as 0, I and L as 1
+    assert decode_pnr(pnr.replace("0", "O").replace("1", "I")) == 42
+
+
+def test_most_single_character_typos_are_rejected():
+    typos = rejected = 0
+    for booking_id in range(1, 501):
+        pnr = encode_pnr(booking_id)
+        for position in range(PNR_LENGTH):
+            for ch in ALPHABET:
+                if ch != pnr[position]:
+                    decoded = decode_pnr(pnr[:position] + ch + pnr[position + 1:])
+                    assert decoded != booking_id
+                    typos += 1
+                    rejected += decoded is None
+    # The weighted check character misses only the few substitutions whose weight wraps mod 32
+    assert rejected / typos > 0.95
+
+
+def test_bad_shapes_are_rejected():
+    pnr = encode_pnr(42)
+    assert decode_pnr(pnr[:-1]) is None
+    assert decode_pnr(pnr + "0") is None
+    assert decode_pnr("U" + pnr[1:]) is None
+    assert decode_pnr("") is None
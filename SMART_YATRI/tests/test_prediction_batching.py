@@ -0,0 +1,47 @@
+"""
+PredictionCoalescer: concurrent submits are merged into batches of at most
+max_batch, each caller gets its own row back, and a failed batch fails its
+callers instead of leaving them waiting.
+"""
+
+import asyncio
+
+import pytest
+
+from app.batching import PredictionCoalescer
+
+
+def _gather(coalescer, records):
+    async def run():
+        return await asyncio.gather(*(coalescer.submit(record) for record in records), return_exceptions=True)
+    return asyncio.run(run())
+
+
+def test_concurrent_submits_share_batches():
+    batches = []
+
+    def predict(records):
+        batches.append(list(records))
+        return [record * 10 for record in records]
+
+    coalescer = PredictionCoalescer(predict, window_ms=50, max_batch=4)
+    assert _gather(coalescer, list(range(10))) == [n * 10 for n in range(10)]
+    assert sorted(len(batch) for batch in batches) == [2, 4, 4]
+    assert coalescer.stats()["batch_size"]["count"] == 3
+    assert coalescer.stats()["in_flight"] == 0
+
+
+def test_window_flushes_a_partial_batch():
+    coalescer = PredictionCoalescer(lambda records: records, window_ms=1, max_batch=64)
+    assert _gather(coalescer, ["a", "b"]) == ["a", "b"]
+
+
+@pytest.mark.parametrize("predict", [
+    lambda records: 1 / 0,
+    lambda records: records[:-1],          # one result short
+])
+def test_failed_batch_fails_every_caller(predict):
+    coalescer = PredictionCoalescer(predict, window_ms=5, max_batch=64)
+    results = _gather(coalescer, [1, 2, 3])
+    assert all(isinstance(result, Exception) for result in results)
+    assert coalescer.task_errors == 1
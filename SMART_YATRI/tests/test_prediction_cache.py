@@ -0,0 +1,38 @@
+"""
+PredictionCache across a model swap: a request still predicting with
+the old version must not read or write the new version's entries.
+"""
+
+from app.prediction_cache import PredictionCache
+
+
+def test_write_from_old_version_is_dropped_after_swap():
+    cache = PredictionCache()
+    cache.bind_version("v1")
+    assert cache.get("row", "v1") is None    # request A misses and starts predicting on v1
+
+    cache.bind_version("v2")                 # request B is served by the new version
+
+    assert cache.put("row", "v1 result", "v1") is False
+    assert cache.get("row", "v2") is None
+    assert cache.stats()["stale_writes"] == 1
+
+
+def test_reads_are_scoped_to_the_bound_version():
+    cache = PredictionCache()
+    cache.bind_version("v2")
+    assert cache.put("row", "v2 result", "v2") is True
+
+    assert cache.get("row", "v2") == "v2 result"
+    assert cache.get("row", "v1") is None
+
+
+def test_expired_entries_miss():
+    now = [0.0]
+    cache = PredictionCache(ttl=10, clock=lambda: now[0])
+    cache.bind_version("v1")
+    cache.put("row", "result", "v1")
+    now[0] = 11.0
+
+    assert cache.get("row", "v1") is None
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,197 @@
+"""
+ReplicaRouter against real engines: a primary and two replicas, each a
+SQLite file holding a one-row "node" table with its own name, so every
+read shows which database served it. Time is a fake clock.
+"""
+
+import asyncio
+import sqlite3
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.requests import Request
+
+from app import database
+from app.database import ReplicaRouter
+
+STICKY_SECONDS = 5
+RETRY_SECONDS = 10
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _node_db(path, name):
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE node (name TEXT)")
+        conn.execute("INSERT INTO node VALUES (?)", (name,))
+    return f"sqlite+aiosqlite:///{path}"
+
+
+def _router(tmp_path, replica_b=None):
+    clock = FakeClock()
+    primary = create_async_engine(_node_db(tmp_path / "primary.db", "primary"))
+    urls = [_node_db(tmp_path / "a.db", "a"), replica_b or _node_db(tmp_path / "b.db", "b")]
+    router = ReplicaRouter(primary, urls=urls, sticky_seconds=STICKY_SECONDS, retry_seconds=RETRY_SECONDS, clock=clock)
+    return router, clock
+
+
+async def _node(engine):
+    async with engine.connect() as conn:
+        return (await conn.execute(text("SELECT name FROM node"))).scalar_one()
+
+
+async def _read(router, user_id=None):
+    _, engine = router.pick(user_id)
+    return await _node(engine)
+
+
+async def _dispose(router):
+    for engine in [router.primary, *router.replicas]:
+        await engine.dispose()
+
+
+def test_reads_round_robin_over_replicas(tmp_path):
+    async def scenario():
+        router, _ = _router(tmp_path)
+        try:
+            return [await _read(router) for _ in range(4)]
+        finally:
+            await _dispose(router)
+
+    assert asyncio.run(scenario()) == ["a", "b", "a", "b"]
+
+
+def test_writer_reads_primary_until_window_ends(tmp_path):
+    async def scenario():
+        router, clock = _router(tmp_path)
+        try:
+            router.note_write(7)
+            during = [await _read(router, 7), await _read(router, 8)]
+            clock.now += STICKY_SECONDS + 1
+            after = await _read(router, 7)
+            return during, after, router.stats()
+        finally:
+            await _dispose(router)
+
+    during, after, stats = asyncio.run(scenario())
+    assert during == ["primary", "a"]
+    assert after in ("a", "b")
+    assert stats["sticky_reads"] == 1
+    assert stats["sticky_users"] == 0
+
+
+def test_failed_replica_is_skipped_then_retried(tmp_path):
+    # A path in a missing directory: every connect raises OperationalError
+    dead = f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'b.db'}"
+
+    async def scenario():
+        router, clock = _router(tmp_path, replica_b=dead)
+        try:
+            await router.check()
+            healthy = router.stats()["healthy"]
+            reads = [await _read(router) for _ in range(3)]
+            (tmp_path / "missing").mkdir()
+            _node_db(tmp_path / "missing" / "b.db", "b")
+            clock.now += RETRY_SECONDS + 1
+            await router.check()
+            recovered = [await _read(router) for _ in range(2)]
+            return healthy, reads, recovered
+        finally:
+            await _dispose(router)
+
+    healthy, reads, recovered = asyncio.run(scenario())
+    assert healthy == 1
+    assert reads == ["a", "a", "a"]
+    assert sorted(recovered) == ["a", "b"]
+
+
+def test_all_replicas_down_falls_back_to_primary(tmp_path):
+    async def scenario():
+        router, _ = _router(tmp_path)
+        try:
+            router.mark_down(0)
+            router.mark_down(1)
+            return await _read(router), router.stats()
+        finally:
+            await _dispose(router)
+
+    node, stats = asyncio.run(scenario())
+    assert node == "primary"
+    assert stats["primary_reads"] == 1
+
+
+def test_get_read_db_fails_over_on_connect_error(tmp_path, monkeypatch):
+    dead = f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'b.db'}"
+    request = Request({"type": "http", "path_params": {}, "query_string": b"", "headers": []})
+
+    async def scenario():
+        router, _ = _router(tmp_path, replica_b=dead)
+        monkeypatch.setattr(database, "read_router", router)
+        try:
+            nodes = []
+            for _ in range(3):
+                dependency = database.get_read_db(request)
+                db = await anext(dependency)
+                nodes.append((await db.execute(text("SELECT name FROM node"))).scalar_one())
+                await dependency.aclose()
+            return nodes, router.stats()
+        finally:
+            await _dispose(router)
+
+    nodes, stats = asyncio.run(scenario())
+    # a, then b fails on connect and the read goes to the primary, then a again
+    assert nodes == ["a", "primary", "a"]
+    assert stats["failovers"] == 1
+    assert stats["healthy"] == 1
+
+
+def test_health_loop_survives_unexpected_errors(tmp_path, monkeypatch):
+    calls = []
+
+    async def flaky_check():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+
+    async def scenario():
+        router, _ = _router(tmp_path)
+        monkeypatch.setattr(router, "check", flaky_check)
+        task = asyncio.create_task(router.run_health_checks(interval=0))
+        try:
+            for _ in range(100):
+                if len(calls) >= 3:
+                    break
+                await asyncio.sleep(0)
+            return task.done()
+        finally:
+            task.cancel()
+            await _dispose(router)
+
+    assert asyncio.run(scenario()) is False
+    assert len(calls) >= 3
+
+
+def test_check_marks_down_replica_that_raises_anything(tmp_path):
+    class Broken:
+        def connect(self):
+            raise RuntimeError("driver bug")
+
+    async def scenario():
+        router, _ = _router(tmp_path)
+        try:
+            broken, router.replicas[1] = router.replicas[1], Broken()
+            await router.check()
+            router.replicas[1] = broken
+            return router.stats()["healthy"], [await _read(router) for _ in range(2)]
+        finally:
+            await _dispose(router)
+
+    healthy, reads = asyncio.run(scenario())
+    assert healthy == 1
+    assert reads == ["a", "a"]
@@ -0,0 +1,78 @@
+"""
+SeatInventory: reserve never takes a run below zero, release never lifts it
+above capacity, and flush writes the counts back only when they changed.
+"""
+
+import csv
+import os
+
+import pytest
+
+from app.owner_lock import OwnerLockError
+from app.seat_inventory import SeatInventory, SeatsUnavailable
+
+RUN = ("12951", "2026-11-01", "3A")
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    path = tmp_path / "live_seats.csv"
+    path.write_text("train_id,travel_date,class,seats_left\n12951,2026-11-01,3A,5\n12951,2026-11-01,SL,40\n")
+    inv = SeatInventory(path, interval=60).open()
+    yield inv
+    os.close(inv._owner_fd)
+
+
+def _rows(path):
+    with open(path, newline="") as f:
+        return {(r["train_id"], r["travel_date"], r["class"]): r for r in csv.DictReader(f)}
+
+
+def test_reserve_stops_at_zero(inventory):
+    assert inventory.reserve(*RUN, 3) == 2
+    with pytest.raises(SeatsUnavailable) as exc:
+        inventory.reserve(*RUN, 3)
+    assert exc.value.seats_left == 2
+    assert inventory.seats_left(*RUN) == 2
+    assert inventory.stats()["rejected"] == 1
+
+
+def test_release_is_capped_at_capacity(inventory):
+    inventory.reserve(*RUN, 2)
+    assert inventory.release(*RUN, 10) == 5
+    assert inventory.stats()["released"] == 2
+
+
+def test_untracked_run_returns_none(inventory):
+    assert inventory.reserve("99999", "2026-11-01", "3A", 1) is None
+    assert inventory.release("99999", "2026-11-01", "3A", 1) is None
+
+
+def test_flush_writes_only_changes(inventory):
+    assert inventory.flush() is False
+
+    inventory.reserve(*RUN, 4)
+    assert inventory.stats()["unflushed_changes"] == 1
+    assert inventory.flush() is True
+    assert inventory.flush() is False
+
+    rows = _rows(inventory.path)
+    assert rows[RUN]["seats_left"] == "1" and rows[RUN]["capacity"] == "5"
+    assert rows[("12951", "2026-11-01", "SL")]["seats_left"] == "40"
+    assert inventory.stats()["flushes"] == 1
+
+
+def test_capacity_survives_a_reload(inventory):
+    inventory.reserve(*RUN, 4)
+    inventory.flush()
+    os.close(inventory._owner_fd)
+
+    reloaded = SeatInventory(inventory.path, interval=60).open()
+    inventory._owner_fd = reloaded._owner_fd
+    assert reloaded.seats_left(*RUN) == 1
+    assert reloaded.release(*RUN, 10) == 5
+
+
+def test_second_owner_is_refused(inventory):
+    with pytest.raises(OwnerLockError):
+        SeatInventory(inventory.path, interval=60).open()
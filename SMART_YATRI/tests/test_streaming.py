@@ -0,0 +1,66 @@
+"""
+Paginated and streamed exports: pages chain by cursor over every booking
+once, and the encoders emit one chunk per page with a single CSV header.
+"""
+
+import csv
+import io
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import routers.bookings as bookings
+from app.archive_store import ArchiveStore
+from app.booking_store import BookingStore
+from app.streaming import csv_chunks, ndjson_chunks
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = BookingStore(tmp_path / "bookings.jsonl", legacy_csv=None, fsync=False, group_commit_ms=0).open()
+    store.insert_many([{"train_id": f"T{n}", "fare": 100.0 + n, "status": "confirmed"} for n in range(25)])
+    monkeypatch.setattr(bookings, "booking_store", store)
+    monkeypatch.setattr(bookings, "STREAM_CHUNK_SIZE", 10)
+    yield store
+    store.close()
+
+
+def test_json_pages_chain_by_cursor(store):
+    ids, cursor = [], None
+    while True:
+        page = bookings._get_all_bookings(cursor, limit=7)
+        ids.extend(record["booking_id"] for record in page["records"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert ids == list(range(1, 26))
+
+
+def test_stream_pages_cover_every_booking(store):
+    pages = list(bookings._booking_pages())
+    assert [len(page) for page in pages] == [10, 10, 5]
+
+    chunks = list(ndjson_chunks(pages))
+    assert len(chunks) == 3
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert [row["booking_id"] for row in rows] == list(range(1, 26))
+    assert rows[0]["pnr"] == bookings.encode_pnr(1)
+
+
+def test_csv_has_one_header():
+    pages = [[{"a": 1, "b": 2}], [], [{"a": 3, "b": 4, "extra": 5}]]
+    text = "".join(csv_chunks(pages, ["a", "b"]))
+    assert list(csv.reader(io.StringIO(text))) == [["a", "b"], ["1", "2"], ["3", "4"]]
+
+
+def test_bad_archive_cursor_is_a_400(tmp_path, monkeypatch):
+    archive = ArchiveStore(tmp_path / "archive")
+    archive.append([{"booking_id": 1, "train_id": "T1", "travel_date": "2026-11-01"}], archived_on="20261017")
+    monkeypatch.setattr(bookings, "archive_store", archive)
+    filters = {"archived_on": None, "travel_date_from": None, "travel_date_to": None, "train_id": None, "status": None}
+
+    assert bookings._view_archived_bookings(filters)["records"][0]["booking_id"] == 1
+    with pytest.raises(HTTPException) as exc:
+        bookings._view_archived_bookings(filters, cursor="not-a-cursor")
+    assert exc.value.status_code == 400
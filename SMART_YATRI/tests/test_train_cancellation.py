@@ -0,0 +1,80 @@
+"""
+Cancelling a train run refunds each confirmed booking on that run once,
+at the tiered rate, and gives its seats back per class.
+"""
+
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+import routers.bookings as bookings
+from app.archive_store import ArchiveStore
+from app.booking_archiver import BookingArchiver
+from app.booking_index import BookingIndex
+from app.booking_store import BookingStore
+from app.seat_inventory import SeatInventory
+
+RUN_DATE = (date.today() + timedelta(days=30)).isoformat()
+
+
+def _booking(fare, class_name="3A", seats=1, train_id="12951", travel_date=RUN_DATE, status="confirmed"):
+    return {"train_id": train_id, "origin": "NDLS", "destination": "BCT", "travel_date": travel_date,
+            "class": class_name, "seats_requested": seats, "fare": fare, "status": status}
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    store = BookingStore(tmp_path / "bookings.jsonl", legacy_csv=None, fsync=False, group_commit_ms=0).open()
+    seats = tmp_path / "live_seats.csv"
+    seats.write_text(
+        f"train_id,travel_date,class,seats_left,capacity\n12951,{RUN_DATE},3A,2,10\n12951,{RUN_DATE},SL,0,10\n"
+    )
+    inventory = SeatInventory(seats, interval=60).open()
+    monkeypatch.setattr(bookings, "booking_store", store)
+    monkeypatch.setattr(bookings, "booking_index", BookingIndex(store))
+    monkeypatch.setattr(bookings, "booking_archiver", BookingArchiver(store, ArchiveStore(tmp_path / "archive")))
+    monkeypatch.setattr(bookings, "seat_inventory", inventory)
+    yield store, inventory
+    store.close()
+    os.close(inventory._owner_fd)
+
+
+def test_refund_tiers():
+    assert bookings._refund_rates(np.array([10, 5, 4, 1, 0, -1])).tolist() == [0.9, 0.9, 0.5, 0.5, 0.1, 0.1]
+
+
+def test_only_the_runs_confirmed_bookings_are_refunded(service):
+    store, inventory = service
+    ids = store.insert_many([
+        _booking(1000.0, seats=2), _booking(500.0, class_name="SL", seats=3), _booking(800.0, seats=1),
+        _booking(700.0, status="cancelled"),
+        _booking(900.0, train_id="12952"),
+        _booking(600.0, travel_date=(date.today() + timedelta(days=31)).isoformat()),
+    ])
+
+    result = bookings._cancel_train_run("12951", RUN_DATE, None, full_refund=False)
+
+    assert result["cancelled"] == 3
+    assert [r["refund_amount"] for r in result["refunds"]] == [900.0, 450.0, 720.0]
+    assert result["refund_total"] == 2070.0
+    assert store.ids() == ids[3:]
+    assert inventory.seats_left("12951", RUN_DATE, "3A") == 5
+    assert inventory.seats_left("12951", RUN_DATE, "SL") == 3
+
+    with pytest.raises(HTTPException) as exc:
+        bookings._cancel_train_run("12951", RUN_DATE, None, full_refund=False)
+    assert exc.value.status_code == 404
+    assert inventory.seats_left("12951", RUN_DATE, "3A") == 5
+
+
+def test_class_filter_and_full_refund(service):
+    store, _ = service
+    store.insert_many([_booking(1000.0), _booking(500.0, class_name="SL")])
+
+    result = bookings._cancel_train_run("12951", RUN_DATE, "sl", full_refund=True)
+    assert result["cancelled"] == 1
+    assert result["refunds"][0]["class"] == "SL" and result["refund_total"] == 500.0
+    assert len(store) == 1
@@ -6,13 +6,22 @@ from datetime import datetime
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.metrics import accuracy_score, mean_squared_error
 
+from app.inference import (
+    CATEGORICAL_COLS, NUMERIC_COLS, FEATURE_COLS,
+    PREPROCESSOR_FILE, SEAT_MODEL_FILE, SEATLEFT_MODEL_FILE, FARE_MODEL_FILE, ModelSet, est_distance,
+)
+from app.compiled_forest import compile_artifact_dir
+from app.model_registry import new_version_dir, publish_version
+from app.prediction_table import build_prediction_table
+
 # ✅ CSV is in the same folder as the script
 DATA_PATH = "train bookings.csv"
-ARTIFACT_DIR = "ml/model_artifacts"
+ARTIFACT_DIR = os.getenv("MODEL_ARTIFACT_DIR", "ml/model_artifacts")
+# Precompute the lookup table for every observed (train, route, class) before publishing
+BUILD_PREDICTION_TABLE = os.getenv("BUILD_PREDICTION_TABLE", "1") == "1"
 
 os.makedirs(ARTIFACT_DIR, exist_ok=True)
 
@@ -47,11 +56,6 @@ def add_engineered_features(df):
     else:
         df["seats_requested"] = 1
 
-    def est_distance(o, d):
-        if pd.isna(o) or pd.isna(d):
-            return 100
-        return abs(sum(map(ord, str(o))) - sum(map(ord, str(d)))) % 1200 + 50
-
     df["est_distance_km"] = df.apply(
         lambda r: est_distance(r.get("origin"), r.get("destination")), axis=1
     )
@@ -78,124 +82,104 @@ def add_engineered_features(df):
     return df
 
 
-def build_and_train_classification(df):
-    features = [
-        "train_id", "origin", "destination", "class",
-        "lead_time_days", "travel_dow", "seats_requested"
-    ]
-    X = df[features]
-    y = df["booked"].fillna(0).astype(int)
-
-    categorical_cols = ["train_id", "origin", "destination", "class"]
-    numeric_cols = ["lead_time_days", "travel_dow", "seats_requested"]
-
+def build_shared_preprocessor(X_train, artifact_dir=ARTIFACT_DIR):
+    """One-hot encode categoricals once; all three estimators share the output."""
     preprocessor = ColumnTransformer(
         transformers=[
-            ("cat", OneHotEncoder(handle_unknown="ignore"), categorical_cols),
-            ("num", "passthrough", numeric_cols)
+            ("cat", OneHotEncoder(handle_unknown="ignore"), CATEGORICAL_COLS),
+            ("num", "passthrough", NUMERIC_COLS),
         ]
     )
+    preprocessor.fit(X_train)
 
-    clf = Pipeline([
-        ("preprocessor", preprocessor),
-        ("model", RandomForestClassifier(random_state=RANDOM_STATE))
-    ])
+    joblib.dump(preprocessor, os.path.join(artifact_dir, PREPROCESSOR_FILE))
+    print("✅ Shared preprocessor saved")
+    return preprocessor
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE
-    )
 
+def build_and_train_classification(X_train, X_test, train_df, test_df, artifact_dir=ARTIFACT_DIR):
+    y_train = train_df["booked"].fillna(0).astype(int)
+    y_test = test_df["booked"].fillna(0).astype(int)
+
+    clf = RandomForestClassifier(random_state=RANDOM_STATE)
     clf.fit(X_train, y_train)
     preds = clf.predict(X_test)
     acc = accuracy_score(y_test, preds)
 
-    joblib.dump(clf, os.path.join(ARTIFACT_DIR, "seat_model.joblib"))
+    joblib.dump(clf, os.path.join(artifact_dir, SEAT_MODEL_FILE))
     print(f"✅ Seat availability model saved (Accuracy: {acc:.3f})")
 
 
-def build_and_train_seatleft(df):
-    features = [
-        "train_id", "origin", "destination", "class",
-        "lead_time_days", "travel_dow", "seats_requested"
-    ]
-    X = df[features]
-    y = df["seats_left"]
-
-    categorical_cols = ["train_id", "origin", "destination", "class"]
-    numeric_cols = ["lead_time_days", "travel_dow", "seats_requested"]
-
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ("cat", OneHotEncoder(handle_unknown="ignore"), categorical_cols),
-            ("num", "passthrough", numeric_cols),
-        ]
-    )
-
-    reg = Pipeline([
-        ("preprocessor", preprocessor),
-        ("model", RandomForestRegressor(random_state=RANDOM_STATE))
-    ])
-
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE
-    )
+def build_and_train_seatleft(X_train, X_test, train_df, test_df, artifact_dir=ARTIFACT_DIR):
+    y_train = train_df["seats_left"]
+    y_test = test_df["seats_left"]
 
+    reg = RandomForestRegressor(random_state=RANDOM_STATE)
     reg.fit(X_train, y_train)
     preds = reg.predict(X_test)
     mse = mean_squared_error(y_test, preds)
 
-    joblib.dump(reg, os.path.join(ARTIFACT_DIR, "seatleft_model.joblib"))
+    joblib.dump(reg, os.path.join(artifact_dir, SEATLEFT_MODEL_FILE))
     print(f"✅ Seats-left model saved (MSE: {mse:.3f})")
 
 
-def build_and_train_fare(df):
-    features = [
-        "train_id", "origin", "destination", "class",
-        "lead_time_days", "travel_dow", "seats_requested", "est_distance_km"
-    ]
-    X = df[features]
-    y = df["fare_synthetic"]
-
-    categorical_cols = ["train_id", "origin", "destination", "class"]
-    numeric_cols = ["lead_time_days", "travel_dow", "seats_requested", "est_distance_km"]
-
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ("cat", OneHotEncoder(handle_unknown="ignore"), categorical_cols),
-            ("num", "passthrough", numeric_cols),
-        ]
-    )
-
-    reg = Pipeline([
-        ("preprocessor", preprocessor),
-        ("model", RandomForestRegressor(random_state=RANDOM_STATE))
-    ])
-
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE
-    )
+def build_and_train_fare(X_train, X_test, train_df, test_df, artifact_dir=ARTIFACT_DIR):
+    y_train = train_df["fare_synthetic"]
+    y_test = test_df["fare_synthetic"]
 
+    reg = RandomForestRegressor(random_state=RANDOM_STATE)
     reg.fit(X_train, y_train)
     preds = reg.predict(X_test)
     mse = mean_squared_error(y_test, preds)
 
-    joblib.dump(reg, os.path.join(ARTIFACT_DIR, "fare_model.joblib"))
+    joblib.dump(reg, os.path.join(artifact_dir, FARE_MODEL_FILE))
     print(f"✅ Fare model saved (MSE: {mse:.3f})")
 
 
-def main():
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError(f"❌ Dataset not found at: {DATA_PATH}")
+def train_version(data_path=DATA_PATH, artifact_root=ARTIFACT_DIR):
+    """
+    Train all three models into a fresh versioned directory and publish it
+    as CURRENT. Serving workers pick the new version up without a restart.
+    """
+    if not os.path.exists(data_path):
+        raise FileNotFoundError(f"❌ Dataset not found at: {data_path}")
 
-    df = pd.read_csv(DATA_PATH)
+    df = pd.read_csv(data_path)
     df = parse_dates(df)
     df = add_engineered_features(df)
 
-    build_and_train_classification(df)
-    build_and_train_seatleft(df)
-    build_and_train_fare(df)
+    version, version_dir = new_version_dir(artifact_root)
+
+    train_df, test_df = train_test_split(df, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    preprocessor = build_shared_preprocessor(train_df[FEATURE_COLS], version_dir)
+    X_train = preprocessor.transform(train_df[FEATURE_COLS])
+    X_test = preprocessor.transform(test_df[FEATURE_COLS])
+
+    build_and_train_classification(X_train, X_test, train_df, test_df, version_dir)
+    build_and_train_seatleft(X_train, X_test, train_df, test_df, version_dir)
+    build_and_train_fare(X_train, X_test, train_df, test_df, version_dir)
+
+    # Refuses to publish if the compiled forests disagree with sklearn on the test split
+    compile_artifact_dir(version_dir, parity_frame=test_df)
+    print("✅ Compiled forests saved (parity with sklearn verified)")
 
-    print("\n🎉 All models trained and saved to:", ARTIFACT_DIR)
+    if BUILD_PREDICTION_TABLE:
+        models = ModelSet(
+            preprocessor=preprocessor,
+            seat=joblib.load(os.path.join(version_dir, SEAT_MODEL_FILE)),
+            seatleft=joblib.load(os.path.join(version_dir, SEATLEFT_MODEL_FILE)),
+            fare=joblib.load(os.path.join(version_dir, FARE_MODEL_FILE)),
+        )
+        shape = build_prediction_table(df, models, version_dir)
+        print(f"✅ Prediction lookup table saved {shape}")
+
+    publish_version(version, artifact_root)
+    return version
+
+
+def main():
+    version = train_version()
+    print("\n🎉 All models trained and saved to:", os.path.join(ARTIFACT_DIR, version))
 
 
 if __name__ == "__main__":